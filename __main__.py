@@ -1,82 +1,344 @@
-import os
-import time
-
-from tqdm import tqdm
-
-import gan.dcgan_keras3 as dcgan_keras3
-from config.parametros_main import ParametrosMain
-from formatador.formatador_imagem import FormatadorImagem
-from gan.dcgan import DCGAN
-from gerador_azulejo_api import levantar_api
-
-
-# Usa a classe FormatadorImagem para ler um diretório e transformar todas as imagens conforme os parâmetros passados na
-# construção do objeto. Os valores defauts do FormatadorImagem já foram configurados para os dados utilizados neste
-# projeto
-def preparar_imagens(diretorio_origem: str, diretorio_destino: str, tamanho_imagem: int):
-    inicio = time.time()
-    print('Validando o diretório de origem...')
-
-    if not os.path.exists(diretorio_origem) or len(os.listdir(diretorio_origem)) == 0:
-        print('Não existe diretório de origem ou arquivos na pasta, não é possível preparar as imagens.')
-        return
-
-    print('Validando o diretório de destino...')
-
-    if not os.path.exists(diretorio_destino):
-        os.mkdir(diretorio_destino)
-        print('O diretório de destino não existia e foi criado.')
-    else:
-        print('O diretório de destino já existe.')
-
-    print('Inciando a preparação das imagens...')
-    print('Diretório de origem: ', diretorio_origem)
-    print('Diretório de destino: ', diretorio_destino)
-
-    lista_arquivos = os.listdir(diretorio_origem)
-    lista_arquivos.sort()
-
-    for arquivo in tqdm(lista_arquivos):
-        formatador_imagem = FormatadorImagem(
-            caminho_imagem=os.path.join(diretorio_origem, arquivo),
-            nova_altura=tamanho_imagem,
-            nova_largura=tamanho_imagem,
-        )
-        formatador_imagem.salvar(diretorio_destino)
-
-    fim = time.time()
-    duracao = fim - inicio
-    print(f'Imagens preparadas em {duracao:.2f} segundos.')
-
-
-if __name__ == "__main__":
-    parametros_aplicacao = ParametrosMain().recuperar_parametros()
-
-    if parametros_aplicacao.acao == 'redimensionar':
-        diretorio_origem = parametros_aplicacao.diretorio_origem
-        diretorio_destino = parametros_aplicacao.diretorio_destino
-        tamanho_imagem = parametros_aplicacao.tam
-        preparar_imagens(diretorio_origem, diretorio_destino, tamanho_imagem)
-    elif parametros_aplicacao.acao == 'treinar':
-        diretorio_dataset = parametros_aplicacao.diretorio_dataset
-        diretorio_resultado = parametros_aplicacao.diretorio_resultado
-        epocas = parametros_aplicacao.epocas
-        implementacao_dcgan = parametros_aplicacao.dcgan
-
-        if implementacao_dcgan == 'KERAS3':
-            dcgan_keras3.funcao_principal(
-                diretorio_dataset=diretorio_dataset,
-                diretorio_resultado=diretorio_resultado,
-                epocas=epocas
-            )
-        else:
-            dcgan = DCGAN()
-            dcgan.construir_dcgan(
-                treinar=True,
-                caminho_imagens_dataset=diretorio_dataset,
-                caminho_resultado=diretorio_resultado,
-                epocas=epocas,
-            )
-    else: # api
-        caminho_arquivo_modelo = parametros_aplicacao.caminho_arquivo_modelo
-        levantar_api(caminho_arquivo_modelo).run(debug=True)
\ No newline at end of file
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+
+from tqdm import tqdm
+
+import gan.dcgan_keras3 as dcgan_keras3
+from api.catalogo_modelos import interpretar_pesos
+from config.parametros_main import ParametrosMain
+from formatador.dataset_empacotado import EscritorDatasetEmpacotado
+from formatador.formatador_imagem import iniciar_processo_preparacao, preparar_imagem, transformar_imagem
+from formatador.indice_duplicatas import IndiceDuplicatas, calcular_hash_arquivo_imagem
+from formatador.manifesto_preparacao import (
+    carregar_manifesto, remover_arquivos_derivados, salvar_manifesto, separar_pendentes
+)
+from gan.checkpoints import carregar_parametros_treinamento
+from gan.dcgan import DCGAN
+from gan.exportacao import exportar_arquivo_modelo
+from gerador_azulejo_api import levantar_api
+
+
+# Usa a classe FormatadorImagem para ler um diretório e transformar todas as imagens conforme os parâmetros passados na
+# construção do objeto. Os valores defauts do FormatadorImagem já foram configurados para os dados utilizados neste
+# projeto. Com mais de um worker os arquivos são distribuídos em blocos (chunks) entre processos, cada um usando um
+# núcleo; os nomes dos arquivos gerados dependem apenas do arquivo de origem, então o resultado é o mesmo da execução
+# sequencial.
+#
+# Com mais de um tamanho cada imagem de origem é lida uma única vez e redimensionada para todos os tamanhos, do maior
+# para o menor (ver FormatadorImagem.gerar_piramide). Cada tamanho é gravado em um subdiretório do destino com o nome do
+# tamanho (ex.: destino/64, destino/128), com um único tamanho as imagens são gravadas no próprio destino.
+#
+# A preparação é incremental: o manifesto no destino de cada tamanho guarda, para cada imagem de origem, o hash, o
+# tamanho e a data de modificação do arquivo, o tamanho usado e os arquivos derivados. Apenas as imagens novas ou
+# alteradas (ou preparadas com outro tamanho) são processadas, apenas nos tamanhos em que estão pendentes, e os arquivos
+# derivados de imagens que não existem mais são removidos.
+#
+# No formato "empacotado" as imagens não são gravadas uma a uma: todas as transformações vão para fragmentos .npy lidos
+# com mmap pelos treinamentos (ver formatador/dataset_empacotado.py). O pacote é sempre gravado por inteiro.
+#
+# Com variantes "base" apenas a imagem redimensionada é gravada, sem as rotações e espelhamentos: o treinamento com
+# -aumento_d4 aplica as simetrias no tf.data, a cada lote.
+#
+# Com duplicatas "relatar" ou "pular" as imagens de origem quase idênticas (hash perceptual a até distancia_duplicatas
+# bits de uma imagem anterior) são listadas e, com "pular", ficam fora do dataset (ver formatador/indice_duplicatas.py).
+def preparar_imagens(diretorio_origem: str, diretorio_destino: str, tamanhos_imagem, workers: int = 1,
+                     formato: str = 'arquivos', variantes: str = 'todas', duplicatas: str = 'ignorar',
+                     distancia_duplicatas: int = 8):
+    inicio = time.time()
+    print('Validando o diretório de origem...')
+
+    if not os.path.exists(diretorio_origem) or len(os.listdir(diretorio_origem)) == 0:
+        print('Não existe diretório de origem ou arquivos na pasta, não é possível preparar as imagens.')
+        return
+
+    print('Validando o diretório de destino...')
+
+    if not os.path.exists(diretorio_destino):
+        os.mkdir(diretorio_destino)
+        print('O diretório de destino não existia e foi criado.')
+    else:
+        print('O diretório de destino já existe.')
+
+    destinos = montar_destinos(diretorio_destino, tamanhos_imagem)
+
+    print('Inciando a preparação das imagens...')
+    print('Diretório de origem: ', diretorio_origem)
+
+    for tamanho_imagem, destino in destinos.items():
+        os.makedirs(destino, exist_ok=True)
+        print(f'Diretório de destino ({tamanho_imagem}x{tamanho_imagem}): ', destino)
+
+    lista_arquivos = os.listdir(diretorio_origem)
+    lista_arquivos.sort()
+
+    if duplicatas != 'ignorar':
+        unicas = separar_duplicatas(
+            diretorio_origem, diretorio_destino, lista_arquivos, distancia_duplicatas, workers
+        )
+
+        if duplicatas == 'pular':
+            lista_arquivos = unicas
+
+    if formato == 'empacotado':
+        empacotar_imagens(diretorio_origem, destinos, lista_arquivos, workers, variantes)
+        print(f'Imagens preparadas em {time.time() - inicio:.2f} segundos.')
+        return
+
+    # Manifesto e imagens pendentes de cada tamanho
+    origens = {}
+    tamanhos_pendentes = {}
+
+    for tamanho_imagem, destino in destinos.items():
+        origens[tamanho_imagem] = carregar_manifesto(destino)
+        quantidade_removidas = len(set(origens[tamanho_imagem]) - set(lista_arquivos))
+        pendentes = separar_pendentes(
+            diretorio_origem, destino, lista_arquivos, tamanho_imagem, origens[tamanho_imagem], variantes
+        )
+        print(
+            f'{tamanho_imagem}x{tamanho_imagem} - imagens de origem: {len(lista_arquivos)}, a preparar: '
+            f'{len(pendentes)}, inalteradas: {len(lista_arquivos) - len(pendentes)}, removidas: {quantidade_removidas}'
+        )
+
+        for arquivo in pendentes:
+            tamanhos_pendentes.setdefault(arquivo, []).append(tamanho_imagem)
+
+    # Cada imagem pendente é lida uma vez e preparada apenas nos tamanhos em que está pendente
+    pendentes = sorted(tamanhos_pendentes)
+    caminhos_imagens = [os.path.join(diretorio_origem, arquivo) for arquivo in pendentes]
+    destinos_imagens = [
+        {tamanho_imagem: destinos[tamanho_imagem] for tamanho_imagem in tamanhos_pendentes[arquivo]}
+        for arquivo in pendentes
+    ]
+    preparar = partial(preparar_imagem, variantes=variantes)
+    workers = workers if workers > 0 else os.cpu_count()
+    inicio_preparacao = time.time()
+    arquivos_gerados = 0
+
+    # Registra a imagem preparada no manifesto de cada tamanho e remove os derivados antigos que não foram regravados
+    # (outro tamanho ou outras variantes)
+    def registrar(arquivo, registros):
+        quantidade_arquivos = 0
+
+        for tamanho_imagem, registro in registros.items():
+            registro_anterior = origens[tamanho_imagem].get(arquivo)
+
+            if registro_anterior is not None:
+                remover_arquivos_derivados(
+                    destinos[tamanho_imagem], set(registro_anterior['arquivos']) - set(registro['arquivos'])
+                )
+
+            origens[tamanho_imagem][arquivo] = registro
+            quantidade_arquivos += len(registro['arquivos'])
+
+        return quantidade_arquivos
+
+    # Os manifestos são gravados mesmo se a preparação for interrompida, com as imagens concluídas até então
+    try:
+        if workers == 1:
+            for arquivo, caminho_imagem, destinos_imagem in zip(pendentes, tqdm(caminhos_imagens), destinos_imagens):
+                arquivos_gerados += registrar(arquivo, preparar(caminho_imagem, destinos_imagem))
+        else:
+            print('Quantidade de processos: ', workers)
+            # Blocos pequenos o bastante para equilibrar a carga entre os processos e grandes o bastante para diluir o
+            # custo de comunicação com cada processo
+            tamanho_bloco = max(1, min(64, len(caminhos_imagens) // (workers * 4)))
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_processo_preparacao) as executor:
+                registros = executor.map(preparar, caminhos_imagens, destinos_imagens, chunksize=tamanho_bloco)
+
+                for arquivo, registro in zip(pendentes, tqdm(registros, total=len(caminhos_imagens))):
+                    arquivos_gerados += registrar(arquivo, registro)
+    finally:
+        for tamanho_imagem, destino in destinos.items():
+            salvar_manifesto(destino, origens[tamanho_imagem])
+
+    fim = time.time()
+    duracao = fim - inicio
+    duracao_preparacao = max(fim - inicio_preparacao, 1e-6)
+    print(f'Imagens preparadas em {duracao:.2f} segundos.')
+    print(
+        f'{len(caminhos_imagens) / duracao_preparacao:.2f} imagens de origem preparadas por segundo, '
+        f'{arquivos_gerados / duracao_preparacao:.2f} imagens geradas por segundo.'
+    )
+
+
+# Calcula o hash perceptual apenas das imagens de origem novas ou alteradas desde a última execução, classifica todas
+# pelo índice de duplicatas gravado no destino e relata as duplicatas encontradas. Retorna as imagens únicas.
+def separar_duplicatas(diretorio_origem: str, diretorio_destino: str, lista_arquivos, distancia_maxima: int,
+                       workers: int):
+    indice = IndiceDuplicatas(diretorio_destino, distancia_maxima)
+    pendentes = indice.separar_pendentes(diretorio_origem, lista_arquivos)
+    caminhos_imagens = [os.path.join(diretorio_origem, arquivo) for arquivo in pendentes]
+    workers = workers if workers > 0 else os.cpu_count()
+    print(
+        f'Verificando duplicatas, hashes a calcular: {len(pendentes)}, '
+        f'já calculados: {len(lista_arquivos) - len(pendentes)}'
+    )
+
+    try:
+        if workers == 1:
+            for arquivo, caminho_imagem in zip(pendentes, tqdm(caminhos_imagens)):
+                indice.registrar(diretorio_origem, arquivo, calcular_hash_arquivo_imagem(caminho_imagem))
+        else:
+            tamanho_bloco = max(1, min(64, len(caminhos_imagens) // (workers * 4)))
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_processo_preparacao) as executor:
+                valores_hash = executor.map(calcular_hash_arquivo_imagem, caminhos_imagens, chunksize=tamanho_bloco)
+
+                for arquivo, valor_hash in zip(pendentes, tqdm(valores_hash, total=len(caminhos_imagens))):
+                    indice.registrar(diretorio_origem, arquivo, valor_hash)
+
+        unicas, duplicatas = indice.classificar(lista_arquivos)
+    finally:
+        indice.salvar()
+
+    print(f'Imagens únicas: {len(unicas)}, duplicatas (distância até {distancia_maxima} bits): {len(duplicatas)}')
+
+    for arquivo, (semelhante, distancia) in sorted(duplicatas.items()):
+        print(f'Duplicata: {arquivo} -> {semelhante} (distância {distancia})')
+
+    return unicas
+
+
+# Diretório de destino de cada tamanho: o próprio destino para um único tamanho ou um subdiretório por tamanho
+def montar_destinos(diretorio_destino: str, tamanhos_imagem):
+    if isinstance(tamanhos_imagem, int):
+        tamanhos_imagem = [tamanhos_imagem]
+
+    tamanhos_imagem = sorted(set(tamanhos_imagem), reverse=True)
+
+    if len(tamanhos_imagem) == 1:
+        return {tamanhos_imagem[0]: diretorio_destino}
+
+    return {
+        tamanho_imagem: os.path.join(diretorio_destino, str(tamanho_imagem))
+        for tamanho_imagem in tamanhos_imagem
+    }
+
+
+def empacotar_imagens(diretorio_origem: str, destinos, lista_arquivos, workers: int, variantes: str = 'todas'):
+    caminhos_imagens = [os.path.join(diretorio_origem, arquivo) for arquivo in lista_arquivos]
+    transformar = partial(transformar_imagem, tamanhos=list(destinos), variantes=variantes)
+    workers = workers if workers > 0 else os.cpu_count()
+    inicio = time.time()
+
+    # Um pacote por tamanho. A ordem das imagens no pacote é a ordem dos arquivos de origem, também com vários processos
+    with ExitStack() as pilha:
+        escritores = {
+            tamanho_imagem: pilha.enter_context(EscritorDatasetEmpacotado(destino, tamanho_imagem, variantes=variantes))
+            for tamanho_imagem, destino in destinos.items()
+        }
+
+        def adicionar(imagens_por_tamanho):
+            for tamanho_imagem, imagens in imagens_por_tamanho.items():
+                escritores[tamanho_imagem].adicionar(imagens)
+
+        if workers == 1:
+            for caminho_imagem in tqdm(caminhos_imagens):
+                adicionar(transformar(caminho_imagem))
+        else:
+            print('Quantidade de processos: ', workers)
+            tamanho_bloco = max(1, min(64, len(caminhos_imagens) // (workers * 4)))
+
+            with ProcessPoolExecutor(max_workers=workers, initializer=iniciar_processo_preparacao) as executor:
+                for imagens_por_tamanho in tqdm(
+                        executor.map(transformar, caminhos_imagens, chunksize=tamanho_bloco),
+                        total=len(caminhos_imagens),
+                ):
+                    adicionar(imagens_por_tamanho)
+
+    duracao = max(time.time() - inicio, 1e-6)
+    quantidade_imagens = sum(escritor.quantidade for escritor in escritores.values())
+
+    for tamanho_imagem, escritor in escritores.items():
+        print(
+            f'Dataset empacotado {tamanho_imagem}x{tamanho_imagem}: {escritor.quantidade} imagens em '
+            f'{len(escritor.fragmentos)} fragmentos.'
+        )
+
+    print(
+        f'{len(caminhos_imagens) / duracao:.2f} imagens de origem preparadas por segundo, '
+        f'{quantidade_imagens / duracao:.2f} imagens geradas por segundo.'
+    )
+
+
+if __name__ == "__main__":
+    parametros_aplicacao = ParametrosMain().recuperar_parametros()
+
+    if parametros_aplicacao.acao == 'redimensionar':
+        diretorio_origem = parametros_aplicacao.diretorio_origem
+        diretorio_destino = parametros_aplicacao.diretorio_destino
+        tamanhos_imagem = parametros_aplicacao.tam
+        preparar_imagens(
+            diretorio_origem,
+            diretorio_destino,
+            tamanhos_imagem,
+            parametros_aplicacao.workers,
+            parametros_aplicacao.formato,
+            parametros_aplicacao.variantes,
+            parametros_aplicacao.duplicatas,
+            parametros_aplicacao.distancia_duplicatas,
+        )
+    elif parametros_aplicacao.acao == 'treinar':
+        diretorio_dataset = parametros_aplicacao.diretorio_dataset
+        diretorio_resultado = parametros_aplicacao.diretorio_resultado
+        epocas = parametros_aplicacao.epocas
+        implementacao_dcgan = parametros_aplicacao.dcgan
+        diretorio_retomar = parametros_aplicacao.retomar
+
+        # Um treinamento retomado continua com a implementação gravada nos seus parâmetros
+        if diretorio_retomar is not None:
+            implementacao_dcgan = carregar_parametros_treinamento(diretorio_retomar).get('dcgan', implementacao_dcgan)
+
+        if implementacao_dcgan == 'KERAS3':
+            dcgan_keras3.funcao_principal(
+                diretorio_dataset=diretorio_dataset,
+                diretorio_resultado=diretorio_resultado,
+                epocas=epocas,
+                aumento_d4=parametros_aplicacao.aumento_d4,
+                semente=parametros_aplicacao.semente,
+                diretorio_retomar=diretorio_retomar,
+                intervalo_checkpoint=parametros_aplicacao.intervalo_checkpoint,
+                checkpoints_mantidos=parametros_aplicacao.checkpoints_mantidos,
+            )
+        else:
+            dcgan = DCGAN()
+            dcgan.construir_dcgan(
+                treinar=True,
+                caminho_imagens_dataset=diretorio_dataset,
+                caminho_resultado=diretorio_resultado,
+                epocas=epocas,
+                aumento_d4=parametros_aplicacao.aumento_d4,
+                cache_dataset=parametros_aplicacao.cache_dataset,
+                semente=parametros_aplicacao.semente,
+                diretorio_retomar=diretorio_retomar,
+                intervalo_checkpoint=parametros_aplicacao.intervalo_checkpoint,
+                checkpoints_mantidos=parametros_aplicacao.checkpoints_mantidos,
+            )
+    elif parametros_aplicacao.acao == 'exportar':
+        exportar_arquivo_modelo(parametros_aplicacao.caminho_arquivo_modelo, parametros_aplicacao.destino)
+    else: # api
+        caminho_arquivo_modelo = parametros_aplicacao.caminho_arquivo_modelo
+        levantar_api(
+            caminho_arquivo_modelo,
+            tamanho_cache_modelos=parametros_aplicacao.cache_modelos,
+            limite_memoria_modelos=parametros_aplicacao.memoria_modelos,
+            maximo_lote=parametros_aplicacao.maximo_lote,
+            janela_agendador=parametros_aplicacao.janela_agendador,
+            maximo_lote_agendador=parametros_aplicacao.maximo_lote_agendador,
+            tamanho_pool=parametros_aplicacao.pool,
+            lote_pool=parametros_aplicacao.lote_pool,
+            aguardar_pool=parametros_aplicacao.pool_vazio == 'aguardar',
+            limite_cache_respostas=parametros_aplicacao.cache_respostas,
+            diretorio_cache_respostas=parametros_aplicacao.diretorio_cache,
+            maximo_painel=parametros_aplicacao.maximo_painel,
+            threads_codificacao=parametros_aplicacao.threads_codificacao,
+            maximo_quadros=parametros_aplicacao.maximo_quadros,
+            compilar_inferencia=parametros_aplicacao.compilar,
+            xla=parametros_aplicacao.xla,
+            intervalo_catalogo=parametros_aplicacao.intervalo_catalogo,
+            pesos_modelos=interpretar_pesos(parametros_aplicacao.pesos_modelos),
+        ).run(debug=True)
\ No newline at end of file
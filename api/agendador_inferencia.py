@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+from collections import Counter
+
+
+# Representa uma requisição aguardando a sua parte do lote. O evento é sinalizado pela thread do agendador quando o
+# resultado (ou o erro) estiver disponível.
+class PedidoInferencia:
+    def __init__(self, quantidade: int):
+        self.quantidade = quantidade
+        self.instante_criacao = time.monotonic()
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+# Agrupa requisições concorrentes para o mesmo modelo em um único lote. A primeira requisição que chega abre uma janela
+# de espera (em milissegundos); as que chegarem dentro da janela, ou até atingir o tamanho máximo do lote, são somadas
+# e o gerador é executado uma única vez. Cada requisição recebe apenas a sua fatia do resultado. Existe uma fila e uma
+# thread por modelo, criadas na primeira requisição.
+#
+# A função de inferência recebe a chave do modelo e a quantidade total de imagens e deve devolver um array com essa
+# quantidade de imagens no primeiro eixo.
+class AgendadorInferencia:
+    def __init__(self, funcao_inferencia, janela_ms: float = 5, tamanho_maximo_lote: int = 32):
+        self.funcao_inferencia = funcao_inferencia
+        self.janela = janela_ms / 1000
+        self.tamanho_maximo_lote = max(tamanho_maximo_lote, 1)
+
+        self.filas = {}
+        self.pid_filas = os.getpid()
+        self.lock = threading.Lock()
+
+        # Estatísticas usadas para ajustar a janela e o tamanho do lote
+        self.distribuicao_lotes = Counter()
+        self.pedidos_atendidos = 0
+        self.tempo_total_espera = 0.0
+        self.tempo_maximo_espera = 0.0
+
+    def __recuperar_fila(self, chave):
+        with self.lock:
+            # As threads das filas não sobrevivem ao fork dos workers do gunicorn, cada processo cria as suas
+            if self.pid_filas != os.getpid():
+                self.filas = {}
+                self.pid_filas = os.getpid()
+
+            if chave not in self.filas:
+                fila = queue.Queue()
+                self.filas[chave] = fila
+                threading.Thread(
+                    target=self.__processar_fila, args=(chave, fila), name=f'agendador-{chave}', daemon=True
+                ).start()
+
+            return self.filas[chave]
+
+    # Bloqueia a requisição até que o lote em que ela foi incluída seja processado
+    def solicitar(self, chave, quantidade: int = 1):
+        pedido = PedidoInferencia(quantidade)
+        self.__recuperar_fila(chave).put(pedido)
+        pedido.evento.wait()
+
+        if pedido.erro is not None:
+            raise pedido.erro
+
+        return pedido.resultado
+
+    def __processar_fila(self, chave, fila):
+        while True:
+            pedidos = [fila.get()]
+            total = pedidos[0].quantidade
+            prazo = time.monotonic() + self.janela
+
+            while total < self.tamanho_maximo_lote:
+                restante = prazo - time.monotonic()
+
+                if restante <= 0:
+                    break
+
+                try:
+                    pedido = fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+
+                pedidos.append(pedido)
+                total += pedido.quantidade
+
+            self.__registrar_lote(pedidos, total)
+
+            try:
+                resultado = self.funcao_inferencia(chave, total)
+                inicio = 0
+
+                for pedido in pedidos:
+                    pedido.resultado = resultado[inicio:inicio + pedido.quantidade]
+                    inicio += pedido.quantidade
+            except Exception as erro:
+                for pedido in pedidos:
+                    pedido.erro = erro
+            finally:
+                for pedido in pedidos:
+                    pedido.evento.set()
+
+    def __registrar_lote(self, pedidos, total):
+        agora = time.monotonic()
+
+        with self.lock:
+            self.distribuicao_lotes[total] += 1
+
+            for pedido in pedidos:
+                espera = agora - pedido.instante_criacao
+                self.pedidos_atendidos += 1
+                self.tempo_total_espera += espera
+                self.tempo_maximo_espera = max(self.tempo_maximo_espera, espera)
+
+    def profundidade_fila(self):
+        with self.lock:
+            return sum(fila.qsize() for fila in self.filas.values())
+
+    def recuperar_estatisticas(self):
+        profundidade = self.profundidade_fila()
+
+        with self.lock:
+            tempo_medio = self.tempo_total_espera / self.pedidos_atendidos if self.pedidos_atendidos else 0.0
+
+            return {
+                'janela_ms': self.janela * 1000,
+                'tamanho_maximo_lote': self.tamanho_maximo_lote,
+                'profundidade_fila': profundidade,
+                'pedidos_atendidos': self.pedidos_atendidos,
+                'lotes_executados': sum(self.distribuicao_lotes.values()),
+                'distribuicao_lotes': dict(sorted(self.distribuicao_lotes.items())),
+                'tempo_medio_espera_ms': tempo_medio * 1000,
+                'tempo_maximo_espera_ms': self.tempo_maximo_espera * 1000,
+            }
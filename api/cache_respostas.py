@@ -0,0 +1,134 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+# Cache de respostas endereçado pelo conteúdo. A chave é o hash das partes que determinam a resposta (hash do modelo,
+# semente, tamanho e formato de saída), por isso também serve como ETag. Guarda os bytes em memória com descarte LRU
+# limitado em MB e, opcionalmente, em um diretório em disco que sobrevive ao reinício da aplicação e é compartilhado
+# entre os workers. A camada em disco também é limitada e descarta os arquivos mais antigos.
+class CacheRespostas:
+    def __init__(self, limite_memoria_mb: float = 64, diretorio: str = None, limite_disco_mb: float = 1024):
+        self.limite_memoria_bytes = int(limite_memoria_mb * 1024 * 1024)
+        self.limite_disco_bytes = int(limite_disco_mb * 1024 * 1024)
+        self.diretorio = diretorio
+
+        self.memoria = OrderedDict()
+        self.memoria_utilizada = 0
+        self.disco = OrderedDict()
+        self.disco_utilizado = 0
+        self.lock = threading.Lock()
+
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.faltas = 0
+
+        if self.diretorio is not None:
+            os.makedirs(self.diretorio, exist_ok=True)
+            self.__indexar_disco()
+
+    @staticmethod
+    def gerar_chave(*partes):
+        return hashlib.sha256('|'.join(str(parte) for parte in partes).encode('utf-8')).hexdigest()
+
+    # Os arquivos já existentes no diretório entram no índice do mais antigo para o mais recente
+    def __indexar_disco(self):
+        arquivos = []
+
+        for nome_arquivo in os.listdir(self.diretorio):
+            if nome_arquivo.endswith('.bin'):
+                estado = os.stat(os.path.join(self.diretorio, nome_arquivo))
+                arquivos.append((estado.st_mtime, nome_arquivo[:-4], estado.st_size))
+
+        for _, chave, tamanho in sorted(arquivos):
+            self.disco[chave] = tamanho
+            self.disco_utilizado += tamanho
+
+    def __caminho_disco(self, chave):
+        return os.path.join(self.diretorio, chave + '.bin')
+
+    def recuperar(self, chave):
+        with self.lock:
+            if chave in self.memoria:
+                self.memoria.move_to_end(chave)
+                self.acertos_memoria += 1
+                return self.memoria[chave]
+
+            em_disco = chave in self.disco
+
+        if em_disco:
+            try:
+                with open(self.__caminho_disco(chave), 'rb') as arquivo:
+                    dados = arquivo.read()
+            except FileNotFoundError: # Descartado por outro worker
+                dados = None
+
+            if dados is not None:
+                with self.lock:
+                    self.acertos_disco += 1
+                    self.__guardar_memoria(chave, dados)
+
+                return dados
+
+        with self.lock:
+            self.faltas += 1
+
+        return None
+
+    def guardar(self, chave, dados: bytes):
+        with self.lock:
+            self.__guardar_memoria(chave, dados)
+
+            if self.diretorio is None or chave in self.disco or len(dados) > self.limite_disco_bytes:
+                return
+
+        # Grava em um arquivo temporário e renomeia para que outro worker nunca leia um arquivo pela metade
+        caminho_arquivo = self.__caminho_disco(chave)
+        caminho_temporario = f'{caminho_arquivo}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+        with open(caminho_temporario, 'wb') as arquivo:
+            arquivo.write(dados)
+
+        os.replace(caminho_temporario, caminho_arquivo)
+
+        with self.lock:
+            if chave not in self.disco:
+                self.disco[chave] = len(dados)
+                self.disco_utilizado += len(dados)
+
+            while self.disco_utilizado > self.limite_disco_bytes:
+                chave_antiga, tamanho = self.disco.popitem(last=False)
+                self.disco_utilizado -= tamanho
+
+                try:
+                    os.remove(self.__caminho_disco(chave_antiga))
+                except FileNotFoundError:
+                    pass
+
+    def __guardar_memoria(self, chave, dados):
+        if len(dados) > self.limite_memoria_bytes:
+            return
+
+        if chave in self.memoria:
+            self.memoria.move_to_end(chave)
+            return
+
+        self.memoria[chave] = dados
+        self.memoria_utilizada += len(dados)
+
+        while self.memoria_utilizada > self.limite_memoria_bytes:
+            _, dados_antigos = self.memoria.popitem(last=False)
+            self.memoria_utilizada -= len(dados_antigos)
+
+    def recuperar_estatisticas(self):
+        with self.lock:
+            return {
+                'itens_memoria': len(self.memoria),
+                'memoria_utilizada_mb': self.memoria_utilizada / (1024 * 1024),
+                'itens_disco': len(self.disco),
+                'disco_utilizado_mb': self.disco_utilizado / (1024 * 1024),
+                'acertos_memoria': self.acertos_memoria,
+                'acertos_disco': self.acertos_disco,
+                'faltas': self.faltas,
+            }
@@ -0,0 +1,229 @@
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from api.registro_modelos import RegistroModelos, carregar_modelo, eh_artefato_servico
+from gan.pos_processamento import gerar_azulejos_uint8, recuperar_faixa_saida
+
+# Extensões dos arquivos de modelo Keras aceitos no catálogo, os artefatos de serviço são diretórios
+extensoes_modelo = ('.h5', '.keras')
+
+
+# Um item da pasta é candidato a modelo quando é um arquivo Keras ou um artefato de serviço. Os demais (arquivos
+# temporários, anotações, pastas comuns) são ignorados.
+def eh_candidato_modelo(caminho_arquivo: Path):
+    if caminho_arquivo.name.startswith('.'):
+        return False
+
+    if caminho_arquivo.is_dir():
+        return eh_artefato_servico(caminho_arquivo)
+
+    return caminho_arquivo.suffix.lower() in extensoes_modelo
+
+
+# Pesos da escolha aleatória no formato "modelo=peso,modelo=peso". Os modelos não indicados têm peso 1.
+def interpretar_pesos(texto_pesos: str):
+    pesos = {}
+
+    for item in (texto_pesos or '').split(','):
+        if item.strip() == '':
+            continue
+
+        nome_modelo, _, peso = item.rpartition('=')
+
+        if nome_modelo.strip() == '' or float(peso) < 0:
+            raise ValueError(f'Peso de modelo inválido: {item}')
+
+        pesos[nome_modelo.strip()] = float(peso)
+
+    return pesos
+
+
+# Catálogo dos modelos servidos pela API. O caminho configurado (um arquivo, um artefato de serviço ou uma pasta com
+# vários modelos) é lido uma única vez na criação e cada modelo é validado antes de poder ser escolhido: precisa
+# carregar, receber um ruído [lote, dimensão] e devolver imagens quadradas com 3 canais. O modelo validado é guardado
+# no registro de modelos (e aquecido, com a inferência compilada) enquanto couber nele sem descartar outro modelo,
+# limitado por -cache_modelos e -memoria_modelos. Os que não cabem são carregados apenas para a validação e de novo,
+# pelo registro, na primeira requisição.
+#
+# Uma thread observa o caminho a cada intervalo de verificação: modelos novos ou alterados são validados e carregados
+# em segundo plano e só então entram no catálogo, modelos removidos saem do catálogo e do registro. As requisições
+# apenas consultam o catálogo em memória, sem acesso ao disco. A escolha sem modelo indicado é aleatória, ponderada
+# pelos pesos de cada modelo, e determinística quando há semente.
+class CatalogoModelos:
+    def __init__(
+            self,
+            caminho_modelo: str,
+            registro_modelos: RegistroModelos,
+            intervalo_verificacao: float = 5.0,
+            pesos: dict = None,
+    ):
+        self.caminho_modelo = Path(caminho_modelo)
+        self.registro_modelos = registro_modelos
+        self.intervalo_verificacao = intervalo_verificacao
+        self.pesos = pesos or {}
+
+        # Nome do modelo -> informações do modelo válido; nome do modelo -> (mtime, erro) dos inválidos
+        self.modelos = {}
+        self.invalidos = {}
+        self.lock = threading.Lock()
+        self.verificacoes = 0
+
+        # Assim como a reserva de azulejos, a thread de observação é criada no primeiro uso de cada processo
+        self.pid_observacao = None
+
+        self.atualizar()
+
+    def __len__(self):
+        return len(self.modelos)
+
+    def __listar_candidatos(self):
+        if self.caminho_modelo.is_dir() and not eh_artefato_servico(self.caminho_modelo):
+            return {
+                caminho.name: caminho
+                for caminho in sorted(self.caminho_modelo.iterdir())
+                if eh_candidato_modelo(caminho)
+            }
+
+        if self.caminho_modelo.exists():
+            return {self.caminho_modelo.name: self.caminho_modelo}
+
+        return {}
+
+    def validar(self, nome_modelo: str, caminho_arquivo: Path):
+        modelo = carregar_modelo(caminho_arquivo)
+        formato_entrada = tuple(modelo.input_shape)
+
+        if len(formato_entrada) != 2 or not formato_entrada[1]:
+            raise ValueError(f'Entrada {formato_entrada} não é um ruído [lote, dimensão].')
+
+        imagens = gerar_azulejos_uint8(modelo, np.zeros((1, formato_entrada[1]), dtype=np.float32)).numpy()
+
+        if imagens.ndim != 4 or imagens.shape[1] != imagens.shape[2] or imagens.shape[3] != 3:
+            raise ValueError(f'Saída {imagens.shape[1:]} não é uma imagem quadrada com 3 canais.')
+
+        if self.registro_modelos.comporta(RegistroModelos.calcular_memoria(modelo), caminho_arquivo):
+            self.registro_modelos.adicionar(caminho_arquivo, modelo)
+
+        return {
+            'nome': nome_modelo,
+            'caminho': caminho_arquivo,
+            'mtime': RegistroModelos.gerar_chave(caminho_arquivo)[1],
+            'tipo': 'servico' if eh_artefato_servico(caminho_arquivo) else 'keras',
+            'dimensao_ruido': int(formato_entrada[1]),
+            'tamanho_imagem': int(imagens.shape[1]),
+            'faixa_saida': recuperar_faixa_saida(modelo),
+            'peso': self.pesos.get(nome_modelo, 1.0),
+        }
+
+    # Compara o caminho com o catálogo e valida apenas o que foi adicionado ou alterado desde a última verificação
+    def atualizar(self):
+        candidatos = self.__listar_candidatos()
+
+        for nome_modelo in set(self.modelos) - set(candidatos):
+            with self.lock:
+                modelo = self.modelos.pop(nome_modelo)
+
+            self.registro_modelos.descartar(modelo['caminho'])
+            print(f'Modelo removido do catálogo: {nome_modelo}')
+
+        for nome_modelo in set(self.invalidos) - set(candidatos):
+            with self.lock:
+                del self.invalidos[nome_modelo]
+
+        for nome_modelo, caminho_arquivo in candidatos.items():
+            try:
+                mtime = RegistroModelos.gerar_chave(caminho_arquivo)[1]
+            except OSError: # Removido durante a verificação
+                continue
+
+            atual = self.modelos.get(nome_modelo)
+
+            if atual is not None and atual['mtime'] == mtime:
+                continue
+
+            if nome_modelo in self.invalidos and self.invalidos[nome_modelo][0] == mtime:
+                continue
+
+            try:
+                modelo = self.validar(nome_modelo, caminho_arquivo)
+            except Exception as erro: # Qualquer falha ao carregar ou executar o modelo o torna inválido
+                with self.lock:
+                    self.modelos.pop(nome_modelo, None)
+                    self.invalidos[nome_modelo] = (mtime, f'{type(erro).__name__}: {erro}')
+
+                print(f'Modelo inválido ignorado: {nome_modelo} ({type(erro).__name__}: {erro})')
+                continue
+
+            with self.lock:
+                self.invalidos.pop(nome_modelo, None)
+                self.modelos[nome_modelo] = modelo
+
+            print(f'Modelo disponível no catálogo: {nome_modelo}')
+
+        self.verificacoes += 1
+
+    def __garantir_observacao(self):
+        if self.intervalo_verificacao > 0 and self.pid_observacao != os.getpid():
+            self.pid_observacao = os.getpid()
+            threading.Thread(target=self.__observar, name='catalogo-modelos', daemon=True).start()
+
+    def __observar(self):
+        while True:
+            time.sleep(self.intervalo_verificacao)
+
+            try:
+                self.atualizar()
+            except OSError as erro:
+                print(f'Falha ao verificar os modelos: {erro}')
+
+    # Caminho do modelo pedido pelo nome ou escolhido pelos pesos. Retorna None quando o modelo não existe no catálogo
+    # ou quando não há modelo disponível.
+    def escolher(self, nome_modelo: str = None, semente: int = None):
+        self.__garantir_observacao()
+
+        with self.lock:
+            if nome_modelo is not None:
+                modelo = self.modelos.get(nome_modelo)
+
+                return None if modelo is None else modelo['caminho']
+
+            nomes = sorted(nome for nome, modelo in self.modelos.items() if modelo['peso'] > 0)
+            caminhos = [self.modelos[nome]['caminho'] for nome in nomes]
+            pesos = [self.modelos[nome]['peso'] for nome in nomes]
+
+        if not nomes:
+            return None
+
+        gerador_aleatorio = random if semente is None else random.Random(semente)
+
+        return gerador_aleatorio.choices(caminhos, weights=pesos)[0]
+
+    # Chave do registro de modelos, (caminho, mtime), com o mtime da última validação do modelo, sem acesso ao disco.
+    # Retorna None quando o modelo saiu do catálogo.
+    def recuperar_chave(self, caminho_arquivo: Path):
+        with self.lock:
+            for modelo in self.modelos.values():
+                if modelo['caminho'] == caminho_arquivo:
+                    return str(caminho_arquivo), modelo['mtime']
+
+        return None
+
+    def listar(self):
+        with self.lock:
+            return {
+                'modelos': [
+                    {**modelo, 'caminho': str(modelo['caminho'])}
+                    for _, modelo in sorted(self.modelos.items())
+                ],
+                'invalidos': [
+                    {'nome': nome_modelo, 'erro': erro}
+                    for nome_modelo, (_, erro) in sorted(self.invalidos.items())
+                ],
+                'intervalo_verificacao': self.intervalo_verificacao,
+                'verificacoes': self.verificacoes,
+            }
@@ -0,0 +1,119 @@
+import io
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+
+# Formatos de saída aceitos pela API: extensão usada pelo OpenCV e o mimetype da resposta. O formato "raw" devolve os
+# bytes RGB da imagem sem compressão, as dimensões vão nos cabeçalhos da resposta.
+formatos_saida = {
+    'png': ('.png', 'image/png'),
+    'webp': ('.webp', 'image/webp'),
+    'jpeg': ('.jpg', 'image/jpeg'),
+    'raw': (None, 'application/octet-stream'),
+}
+
+
+# Redimensiona e codifica as imagens geradas em um conjunto limitado de threads, fora da thread da requisição e da
+# thread do agendador, para que a codificação de um lote aconteça ao mesmo tempo que a inferência do próximo. O OpenCV
+# libera o GIL durante o resize e a codificação, então as threads usam núcleos diferentes de fato. O tempo gasto em
+# cada formato é acumulado para a instrumentação da API.
+class CodificadorImagens:
+    def __init__(self, maximo_threads: int = 4, metricas=None):
+        self.metricas = metricas
+        self.executor = ThreadPoolExecutor(max_workers=max(maximo_threads, 1), thread_name_prefix='codificador')
+        self.lock = threading.Lock()
+        self.quantidade_por_formato = defaultdict(int)
+        self.tempo_por_formato = defaultdict(float)
+        self.bytes_por_formato = defaultdict(int)
+
+    @staticmethod
+    def recuperar_mimetype(formato: str):
+        return formatos_saida[formato][1]
+
+    # Parâmetros do OpenCV: nível de compressão (0 a 9) para PNG e qualidade (1 a 100) para WebP e JPEG. Sem valor
+    # indicado o OpenCV usa o seu padrão.
+    @staticmethod
+    def recuperar_parametros_opencv(formato: str, compressao: int = None, qualidade: int = None):
+        if formato == 'png' and compressao is not None:
+            return [cv2.IMWRITE_PNG_COMPRESSION, compressao]
+
+        if formato == 'webp' and qualidade is not None:
+            return [cv2.IMWRITE_WEBP_QUALITY, qualidade]
+
+        if formato == 'jpeg' and qualidade is not None:
+            return [cv2.IMWRITE_JPEG_QUALITY, qualidade]
+
+        return []
+
+    def codificar(self, imagem, formato: str = 'png', compressao: int = None, qualidade: int = None):
+        inicio = time.perf_counter()
+        extensao, _ = formatos_saida[formato]
+
+        if extensao is None:
+            dados = cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB).tobytes()
+        else:
+            resultado, buffer = cv2.imencode(
+                extensao, imagem, self.recuperar_parametros_opencv(formato, compressao, qualidade)
+            )
+            dados = buffer.tobytes()
+
+        self.__registrar_tempo(formato, time.perf_counter() - inicio, len(dados))
+
+        return dados
+
+    # Codifica os quadros como uma animação (webp ou gif) em loop, com a duração de cada quadro em milissegundos. O
+    # OpenCV não grava imagens animadas, então é usado o Pillow.
+    def codificar_animacao(self, imagens, formato: str = 'webp', duracao_quadro: int = 80, qualidade: int = None):
+        from PIL import Image
+
+        inicio = time.perf_counter()
+        quadros = [Image.fromarray(cv2.cvtColor(imagem, cv2.COLOR_BGR2RGB)) for imagem in imagens]
+        parametros = {'save_all': True, 'append_images': quadros[1:], 'duration': duracao_quadro, 'loop': 0}
+
+        if formato == 'webp' and qualidade is not None:
+            parametros['quality'] = qualidade
+
+        arquivo = io.BytesIO()
+        quadros[0].save(arquivo, format=formato.upper(), **parametros)
+        dados = arquivo.getvalue()
+        self.__registrar_tempo(f'animacao_{formato}', time.perf_counter() - inicio, len(dados))
+
+        return dados
+
+    def __registrar_tempo(self, formato: str, duracao: float, tamanho: int):
+        with self.lock:
+            self.quantidade_por_formato[formato] += 1
+            self.tempo_por_formato[formato] += duracao
+            self.bytes_por_formato[formato] += tamanho
+
+        if self.metricas is not None:
+            self.metricas.observar('etapa_segundos', duracao, etapa=f'codificacao_{formato}')
+
+    # Aplica a função de preparação (resize, texto) e codifica a imagem em uma das threads do codificador
+    def submeter(self, funcao_preparacao, imagem, formato: str = 'png', compressao: int = None, qualidade: int = None):
+        def preparar_codificar():
+            return self.codificar(funcao_preparacao(imagem), formato, compressao, qualidade)
+
+        return self.executor.submit(preparar_codificar)
+
+    def codificar_lote(self, funcao_preparacao, imagens, formato: str = 'png', compressao: int = None,
+                       qualidade: int = None):
+        futuros = [self.submeter(funcao_preparacao, imagem, formato, compressao, qualidade) for imagem in imagens]
+
+        return [futuro.result() for futuro in futuros]
+
+    def recuperar_estatisticas(self):
+        with self.lock:
+            return {
+                formato: {
+                    'quantidade': quantidade,
+                    'tempo_total_ms': self.tempo_por_formato[formato] * 1000,
+                    'tempo_medio_ms': self.tempo_por_formato[formato] * 1000 / quantidade,
+                    'tamanho_medio_bytes': self.bytes_por_formato[formato] / quantidade,
+                }
+                for formato, quantidade in self.quantidade_por_formato.items()
+            }
@@ -0,0 +1,105 @@
+import statistics
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from gan.pos_processamento import pos_processar_imagens, recuperar_faixa_saida
+
+
+# Tamanhos de lote (buckets) para os quais a inferência é compilada: potências de 2 até o maior lote usado pela API
+def gerar_tamanhos_lote(maximo_lote: int):
+    tamanhos_lote = [1]
+
+    while tamanhos_lote[-1] < maximo_lote:
+        tamanhos_lote.append(min(tamanhos_lote[-1] * 2, maximo_lote))
+
+    return tuple(tamanhos_lote)
+
+
+# Envolve o gerador e o pós-processamento (faixa da ativação para uint8 e redimensionamento) em uma tf.function com
+# assinatura de entrada fixa: ruído [lote, dimensão do ruído] em float32 e o tamanho de saída. Assim o grafo é traçado
+# uma única vez em vez de a cada novo formato de lote da chamada eager. O ruído é completado com zeros até o menor
+# tamanho de lote (bucket) que o comporta e lotes maiores que o último bucket são divididos, então apenas os formatos
+# aquecidos chegam ao gerador; com o XLA (jit_compile) cada bucket é compilado uma vez no aquecimento. Mantém a
+# interface usada pela API e pelo registro de modelos: input_shape, gerar e variables.
+#
+# O XLA não tem kernel para o redimensionamento bicúbico (ResizeBicubic), então com o XLA apenas o gerador é compilado
+# com o jit_compile, em uma função chamada de dentro da tf.function do pós-processamento, que continua no grafo comum do
+# TensorFlow. O resultado é o mesmo da inferência sem o XLA: o redimensionamento acontece sobre a saída float do
+# gerador, antes da conversão para uint8.
+class InferenciaCompilada:
+    def __init__(self, modelo, tamanhos_lote=(1, 2, 4, 8, 16, 32, 64), xla: bool = False):
+        self.modelo = modelo
+        self.input_shape = tuple(modelo.input_shape)
+        self.faixa_saida = recuperar_faixa_saida(modelo)
+        self.tamanhos_lote = tuple(sorted(set(tamanhos_lote)))
+        self.xla = xla
+        self.latencias_aquecimento = {}
+
+        especificacao_ruido = tf.TensorSpec([None, self.input_shape[1]], tf.float32)
+        funcao_gerador = lambda ruido: modelo(ruido, training=False)
+
+        if xla:
+            funcao_gerador = tf.function(
+                funcao_gerador, input_signature=[especificacao_ruido], jit_compile=True, reduce_retracing=True
+            )
+
+        self.funcao_geracao = tf.function(
+            lambda ruido, tamanho: pos_processar_imagens(funcao_gerador(ruido), self.faixa_saida, tamanho),
+            input_signature=[especificacao_ruido, tf.TensorSpec([], tf.int32)],
+            reduce_retracing=True,
+        )
+
+    # Tamanho None mantém o tamanho do modelo
+    def gerar(self, ruido, tamanho: int = None):
+        ruido = tf.convert_to_tensor(ruido, dtype=tf.float32)
+        quantidade = int(ruido.shape[0])
+        maior_lote = self.tamanhos_lote[-1]
+
+        if quantidade > maior_lote:
+            return tf.concat(
+                [self.gerar(ruido[inicio:inicio + maior_lote], tamanho) for inicio in range(0, quantidade, maior_lote)],
+                axis=0,
+            )
+
+        tamanho_lote = next(tamanho_bucket for tamanho_bucket in self.tamanhos_lote if tamanho_bucket >= quantidade)
+
+        if tamanho_lote > quantidade:
+            ruido = tf.pad(ruido, [[0, tamanho_lote - quantidade], [0, 0]])
+
+        return self.funcao_geracao(ruido, tamanho or 0)[:quantidade]
+
+    @property
+    def variables(self):
+        return self.modelo.variables
+
+    # Executa cada bucket algumas vezes: a primeira chamada paga o traçado (e a compilação do XLA) e as seguintes dão a
+    # latência estável. Retorna, por tamanho de lote, a latência da primeira chamada e a mediana das demais, em ms.
+    def aquecer(self, tamanho: int = None, repeticoes: int = 3):
+        for tamanho_lote in self.tamanhos_lote:
+            ruido = np.zeros((tamanho_lote, self.input_shape[1]), dtype=np.float32)
+            latencias = []
+
+            for _ in range(repeticoes + 1):
+                inicio = time.perf_counter()
+                self.gerar(ruido, tamanho).numpy()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+            self.latencias_aquecimento[tamanho_lote] = {
+                'primeira_ms': latencias[0],
+                'estavel_ms': statistics.median(latencias[1:]),
+            }
+
+        return self.latencias_aquecimento
+
+    def __str__(self):
+        linhas = [f'Inferência compilada{" (XLA)" if self.xla else ""}, latências por tamanho de lote:']
+
+        for tamanho_lote, latencias in self.latencias_aquecimento.items():
+            linhas.append(
+                f'  lote {tamanho_lote:>4}: primeira {latencias["primeira_ms"]:9.2f} ms, '
+                f'estável {latencias["estavel_ms"]:9.2f} ms'
+            )
+
+        return '\n'.join(linhas) + '\n'
@@ -0,0 +1,43 @@
+import numpy as np
+
+
+# Métodos de interpolação aceitos: linear (segmento de reta entre os ruídos) e esférica (slerp, percorre o arco entre os
+# ruídos e mantém a norma típica de um vetor gaussiano, o que costuma gerar quadros intermediários mais nítidos).
+metodos_interpolacao = ('linear', 'esferica')
+
+
+def interpolar_linear(inicio, fim, t):
+    return (1 - t) * inicio + t * fim
+
+
+def interpolar_esferica(inicio, fim, t):
+    produto = np.dot(inicio / np.linalg.norm(inicio), fim / np.linalg.norm(fim))
+    angulo = np.arccos(np.clip(produto, -1.0, 1.0))
+    seno = np.sin(angulo)
+
+    # Vetores (quase) paralelos: o slerp degenera na interpolação linear
+    if seno < 1e-6:
+        return interpolar_linear(inicio, fim, t)
+
+    return (np.sin((1 - t) * angulo) / seno) * inicio + (np.sin(t * angulo) / seno) * fim
+
+
+# Ruído de uma semente, o mesmo usado pela API para gerar o azulejo com essa semente
+def gerar_ruido_semente(semente: int, dimensao_ruido: int):
+    return np.random.default_rng(semente).standard_normal((1, dimensao_ruido), dtype=np.float32)[0]
+
+
+# Monta um único lote [quadros, dimensão do ruído] que passa por todas as sementes, na ordem indicada. Os quadros são
+# distribuídos igualmente entre os trechos; o primeiro quadro é a primeira semente e o último é a última semente.
+def montar_ruido_interpolado(sementes, quadros: int, dimensao_ruido: int, metodo: str = 'esferica'):
+    funcao_interpolacao = interpolar_esferica if metodo == 'esferica' else interpolar_linear
+    ruidos = [gerar_ruido_semente(semente, dimensao_ruido) for semente in sementes]
+    trechos = len(ruidos) - 1
+    ruido_interpolado = np.empty((quadros, dimensao_ruido), dtype=np.float32)
+
+    for quadro in range(quadros):
+        posicao = quadro / max(quadros - 1, 1) * trechos
+        trecho = min(int(posicao), trechos - 1)
+        ruido_interpolado[quadro] = funcao_interpolacao(ruidos[trecho], ruidos[trecho + 1], posicao - trecho)
+
+    return ruido_interpolado
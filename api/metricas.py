@@ -0,0 +1,138 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+# Limites, em segundos, dos intervalos (buckets) dos histogramas de latência
+limites_histograma = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def formatar_rotulos(rotulos):
+    if not rotulos:
+        return ''
+
+    itens = []
+
+    for nome, valor in rotulos:
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        itens.append(f'{nome}="{valor}"')
+
+    return '{' + ','.join(itens) + '}'
+
+
+def recuperar_rss_bytes():
+    try:
+        with open('/proc/self/status') as arquivo:
+            for linha in arquivo:
+                if linha.startswith('VmRSS'):
+                    return int(linha.split()[1]) * 1024
+    except OSError: # Sistemas sem /proc usam o pico de memória do processo
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    return 0
+
+
+# Coleta contadores, histogramas e medidores (gauges) da API e os exporta no formato texto do Prometheus. Contadores e
+# histogramas são atualizados pelo código da API; os medidores são funções chamadas no momento da coleta e devolvem um
+# número ou um dicionário {(rótulos...): valor}. Não depende de bibliotecas externas.
+class Metricas:
+    def __init__(self, prefixo: str = 'azulejos'):
+        self.prefixo = prefixo
+        self.lock = threading.Lock()
+        self.descricoes = {}
+        self.contadores = defaultdict(float)
+        self.histogramas = {}
+        self.medidores = {}
+
+    def __nome(self, nome):
+        return f'{self.prefixo}_{nome}'
+
+    def descrever(self, nome: str, tipo: str, descricao: str):
+        self.descricoes[self.__nome(nome)] = (tipo, descricao)
+
+    def incrementar(self, nome: str, valor: float = 1, **rotulos):
+        chave = (self.__nome(nome), tuple(sorted(rotulos.items())))
+
+        with self.lock:
+            self.contadores[chave] += valor
+
+    def observar(self, nome: str, valor: float, **rotulos):
+        chave = (self.__nome(nome), tuple(sorted(rotulos.items())))
+        indice = bisect.bisect_left(limites_histograma, valor)
+
+        with self.lock:
+            if chave not in self.histogramas:
+                self.histogramas[chave] = [[0] * (len(limites_histograma) + 1), 0.0, 0]
+
+            intervalos, soma, quantidade = self.histogramas[chave]
+            intervalos[indice] += 1
+            self.histogramas[chave][1] = soma + valor
+            self.histogramas[chave][2] = quantidade + 1
+
+    # Mede o tempo do bloco e registra no histograma indicado
+    @contextmanager
+    def medir(self, nome: str, **rotulos):
+        inicio = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio, **rotulos)
+
+    def registrar_medidor(self, nome: str, funcao, nome_rotulo: str = None):
+        self.medidores[self.__nome(nome)] = (funcao, nome_rotulo)
+
+    def __cabecalho(self, nome, tipo_padrao, linhas):
+        tipo, descricao = self.descricoes.get(nome, (tipo_padrao, ''))
+
+        if descricao:
+            linhas.append(f'# HELP {nome} {descricao}')
+
+        linhas.append(f'# TYPE {nome} {tipo}')
+
+    def gerar_texto(self):
+        linhas = []
+
+        with self.lock:
+            contadores = dict(self.contadores)
+            histogramas = {chave: (list(valor[0]), valor[1], valor[2]) for chave, valor in self.histogramas.items()}
+
+        for nome in sorted({nome for nome, _ in contadores}):
+            self.__cabecalho(nome, 'counter', linhas)
+
+            for (nome_contador, rotulos), valor in sorted(contadores.items()):
+                if nome_contador == nome:
+                    linhas.append(f'{nome}{formatar_rotulos(rotulos)} {valor}')
+
+        for nome in sorted({nome for nome, _ in histogramas}):
+            self.__cabecalho(nome, 'histogram', linhas)
+
+            for (nome_histograma, rotulos), (intervalos, soma, quantidade) in sorted(histogramas.items()):
+                if nome_histograma != nome:
+                    continue
+
+                acumulado = 0
+
+                for limite, valor in zip(limites_histograma, intervalos):
+                    acumulado += valor
+                    linhas.append(f'{nome}_bucket{formatar_rotulos(rotulos + (("le", limite),))} {acumulado}')
+
+                linhas.append(f'{nome}_bucket{formatar_rotulos(rotulos + (("le", "+Inf"),))} {quantidade}')
+                linhas.append(f'{nome}_sum{formatar_rotulos(rotulos)} {soma}')
+                linhas.append(f'{nome}_count{formatar_rotulos(rotulos)} {quantidade}')
+
+        for nome, (funcao, nome_rotulo) in sorted(self.medidores.items()):
+            self.__cabecalho(nome, 'gauge', linhas)
+            valor = funcao()
+
+            if isinstance(valor, dict):
+                for rotulo, valor_rotulo in sorted(valor.items()):
+                    linhas.append(f'{nome}{formatar_rotulos(((nome_rotulo, rotulo),))} {valor_rotulo}')
+            else:
+                linhas.append(f'{nome} {valor}')
+
+        return '\n'.join(linhas) + '\n'
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+
+
+# Padrões de repetição aceitos pelo painel:
+# - unico: o mesmo azulejo repetido em toda a superfície;
+# - rotacoes: bloco 2x2 com o azulejo girado 0, 90, 270 e 180 graus, simetria de rotação em torno do centro do bloco;
+# - espelhos: bloco 2x2 com o azulejo original e os seus reflexos horizontal, vertical e em ambos os eixos;
+# - aleatorio: cada posição do painel recebe um azulejo diferente.
+padroes_painel = ('unico', 'rotacoes', 'espelhos', 'aleatorio')
+
+
+# Monta o bloco 2x2 com as simetrias do grupo diedral (D4) usadas pelos padrões "rotacoes" e "espelhos"
+def montar_bloco_simetrias(azulejo, padrao: str):
+    if padrao == 'rotacoes':
+        return [
+            [azulejo, cv2.rotate(azulejo, cv2.ROTATE_90_CLOCKWISE)],
+            [cv2.rotate(azulejo, cv2.ROTATE_90_COUNTERCLOCKWISE), cv2.rotate(azulejo, cv2.ROTATE_180)],
+        ]
+
+    if padrao == 'espelhos':
+        return [
+            [azulejo, cv2.flip(azulejo, flipCode=1)],
+            [cv2.flip(azulejo, flipCode=0), cv2.flip(azulejo, flipCode=-1)],
+        ]
+
+    return [[azulejo]]
+
+
+# Gera o painel faixa por faixa, cada faixa com a altura de um azulejo e a largura do painel inteiro. Apenas uma faixa
+# existe em memória por vez, portanto o consumo não cresce com a quantidade de linhas. No padrão aleatório os azulejos
+# de cada faixa são gerados em um único lote, com o ruído derivado da semente e do número da linha.
+#
+# A função de geração recebe a quantidade de azulejos e a semente e devolve os azulejos (uint8), de preferência já no
+# tamanho do painel; azulejos em outro tamanho são redimensionados aqui.
+def gerar_faixas_painel(funcao_geracao, linhas: int, colunas: int, padrao: str, semente: int, tamanho: int):
+    def redimensionar(azulejo):
+        if azulejo.shape[:2] == (tamanho, tamanho):
+            return azulejo
+
+        return cv2.resize(azulejo, (tamanho, tamanho), interpolation=cv2.INTER_CUBIC)
+
+    bloco = None
+
+    if padrao != 'aleatorio':
+        bloco = montar_bloco_simetrias(redimensionar(funcao_geracao(1, semente)[0]), padrao)
+
+    for linha in range(linhas):
+        if bloco is None:
+            azulejos = [redimensionar(azulejo) for azulejo in funcao_geracao(colunas, [semente, linha])]
+        else:
+            linha_bloco = bloco[linha % len(bloco)]
+            azulejos = [linha_bloco[coluna % len(linha_bloco)] for coluna in range(colunas)]
+
+        yield np.concatenate(azulejos, axis=1)
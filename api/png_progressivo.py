@@ -0,0 +1,51 @@
+import struct
+import zlib
+
+import numpy as np
+
+
+# Codifica um PNG aos poucos, faixa de linhas por faixa de linhas, para que imagens grandes (painéis inteiros) possam
+# ser enviadas ao cliente sem nunca existirem completas em memória. O cabeçalho depende apenas das dimensões finais;
+# cada faixa vira um bloco IDAT com a continuação do mesmo fluxo zlib e o fechamento do fluxo vai no último IDAT.
+# As faixas são recebidas no formato do OpenCV (BGR, uint8) e convertidas para RGB.
+class CodificadorPngProgressivo:
+    assinatura = b'\x89PNG\r\n\x1a\n'
+
+    def __init__(self, largura: int, altura: int, nivel_compressao: int = 6):
+        self.largura = largura
+        self.altura = altura
+        self.linhas_codificadas = 0
+        self.compressor = zlib.compressobj(nivel_compressao)
+
+    @staticmethod
+    def __bloco(tipo: bytes, dados: bytes):
+        return struct.pack('>I', len(dados)) + tipo + dados + struct.pack('>I', zlib.crc32(tipo + dados) & 0xFFFFFFFF)
+
+    # Profundidade de 8 bits, tipo de cor 2 (RGB), sem entrelaçamento
+    def cabecalho(self):
+        return self.assinatura + self.__bloco(
+            b'IHDR', struct.pack('>IIBBBBB', self.largura, self.altura, 8, 2, 0, 0, 0)
+        )
+
+    def codificar_faixa(self, faixa):
+        altura_faixa, largura_faixa = faixa.shape[:2]
+
+        if largura_faixa != self.largura or self.linhas_codificadas + altura_faixa > self.altura:
+            raise ValueError('A faixa não corresponde às dimensões do PNG.')
+
+        # Cada linha do PNG começa com o byte do filtro, zero significa nenhum filtro
+        linhas = np.empty((altura_faixa, 1 + largura_faixa * 3), dtype=np.uint8)
+        linhas[:, 0] = 0
+        linhas[:, 1:] = faixa[:, :, ::-1].reshape(altura_faixa, -1)
+        self.linhas_codificadas += altura_faixa
+
+        dados = self.compressor.compress(linhas.tobytes())
+        dados += self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        return self.__bloco(b'IDAT', dados)
+
+    def finalizar(self):
+        if self.linhas_codificadas != self.altura:
+            raise ValueError('Nem todas as linhas do PNG foram codificadas.')
+
+        return self.__bloco(b'IDAT', self.compressor.flush()) + self.__bloco(b'IEND', b'')
@@ -0,0 +1,173 @@
+import os
+import threading
+import time
+from collections import deque
+
+
+# Mantém, para cada modelo, uma reserva de azulejos já gerados e codificados (bytes do PNG) prontos para serem
+# enviados. A requisição apenas retira um item da reserva; uma thread em segundo plano repõe a reserva em lotes grandes
+# sempre que ela fica abaixo do nível mínimo, até completar o tamanho configurado. Os modelos passam a ter reserva na
+# primeira vez em que são pedidos.
+#
+# A chave de cada reserva é (modelo, versão), como a chave do registro de modelos (caminho, mtime): quando uma nova
+# versão do modelo é pedida as reservas das versões anteriores são descartadas, para que os azulejos gerados com os
+# pesos antigos não continuem sendo enviados. Falhas seguidas na reposição de uma reserva (ex.: modelo removido)
+# adiam as novas tentativas por um tempo que dobra a cada falha e, depois de maximo_falhas, a reserva é descartada; ela
+# só volta a existir se o modelo for pedido novamente.
+#
+# A função de geração recebe a chave do modelo e a quantidade de azulejos e deve devolver uma lista de bytes.
+class PoolAzulejos:
+    def __init__(
+            self,
+            funcao_geracao,
+            tamanho: int = 256,
+            tamanho_lote: int = 64,
+            nivel_minimo: int = None,
+            # Com a reserva vazia: aguarda a reposição (True) ou devolve None para a geração ser feita na requisição
+            aguardar_quando_vazio: bool = False,
+            tempo_maximo_espera: float = 5.0,
+            maximo_falhas: int = 5,
+            espera_maxima_falha: float = 60.0,
+    ):
+        self.funcao_geracao = funcao_geracao
+        self.tamanho = max(tamanho, 1)
+        self.tamanho_lote = max(tamanho_lote, 1)
+        self.nivel_minimo = self.tamanho // 2 if nivel_minimo is None else min(nivel_minimo, self.tamanho - 1)
+        self.aguardar_quando_vazio = aguardar_quando_vazio
+        self.tempo_maximo_espera = tempo_maximo_espera
+        self.maximo_falhas = max(maximo_falhas, 1)
+        self.espera_maxima_falha = espera_maxima_falha
+
+        self.reservas = {}
+        # Chave -> (falhas seguidas, instante da próxima tentativa) das reservas cuja reposição falhou
+        self.falhas = {}
+        self.reservas_descartadas = 0
+        self.condicao = threading.Condition()
+        self.acertos = 0
+        self.faltas = 0
+        self.azulejos_gerados = 0
+
+        # A thread de reposição é criada no primeiro uso e recriada se o processo for outro. Com o gunicorn em modo
+        # preload a aplicação é criada no master e as threads não sobrevivem ao fork dos workers.
+        self.pid_reposicao = None
+
+    def __garantir_reposicao(self):
+        if self.pid_reposicao != os.getpid():
+            self.pid_reposicao = os.getpid()
+            threading.Thread(target=self.__repor_reservas, name='pool-azulejos', daemon=True).start()
+
+    # Retorna os bytes de um azulejo da reserva ou None quando não houver azulejo disponível
+    def retirar(self, chave):
+        with self.condicao:
+            self.__garantir_reposicao()
+
+            if chave not in self.reservas:
+                self.__descartar_versoes_anteriores(chave)
+
+            reserva = self.reservas.setdefault(chave, deque())
+
+            if len(reserva) <= self.nivel_minimo:
+                self.condicao.notify_all()
+
+            if not reserva and self.aguardar_quando_vazio:
+                self.condicao.wait_for(lambda: len(reserva) > 0, timeout=self.tempo_maximo_espera)
+
+            if reserva:
+                self.acertos += 1
+                return reserva.popleft()
+
+            self.faltas += 1
+            return None
+
+    def __descartar_versoes_anteriores(self, chave):
+        for chave_antiga in [c for c in self.reservas if c[0] == chave[0]]:
+            del self.reservas[chave_antiga]
+            self.falhas.pop(chave_antiga, None)
+            self.reservas_descartadas += 1
+
+    def __recuperar_chave_abaixo_minimo(self):
+        agora = time.monotonic()
+        chaves = [
+            chave for chave, reserva in self.reservas.items()
+            if len(reserva) <= self.nivel_minimo and self.falhas.get(chave, (0, agora))[1] <= agora
+        ]
+
+        if not chaves:
+            return None
+
+        # A reserva mais vazia é reposta primeiro
+        return min(chaves, key=lambda chave: len(self.reservas[chave]))
+
+    # Tempo até a próxima tentativa das reservas com falha, None quando não há reserva aguardando nova tentativa
+    def __recuperar_espera_falhas(self):
+        if not self.falhas:
+            return None
+
+        return max(min(instante for _, instante in self.falhas.values()) - time.monotonic(), 0)
+
+    def __registrar_falha(self, chave, erro):
+        falhas = self.falhas.get(chave, (0, 0))[0] + 1
+
+        if falhas >= self.maximo_falhas:
+            self.reservas.pop(chave, None)
+            self.falhas.pop(chave, None)
+            self.reservas_descartadas += 1
+            print(f'Reserva de azulejos do modelo {chave} descartada após {falhas} falhas seguidas: {erro}')
+            return
+
+        espera = min(2 ** (falhas - 1), self.espera_maxima_falha)
+        self.falhas[chave] = (falhas, time.monotonic() + espera)
+        print(f'Erro ao repor a reserva de azulejos do modelo {chave}, nova tentativa em {espera} s: {erro}')
+
+    def __repor_reservas(self):
+        while True:
+            with self.condicao:
+                chave = self.__recuperar_chave_abaixo_minimo()
+
+                while chave is None:
+                    self.condicao.wait(timeout=self.__recuperar_espera_falhas())
+                    chave = self.__recuperar_chave_abaixo_minimo()
+
+            # Ao atingir o nível mínimo a reserva é completada até o tamanho total. A reserva pode ser descartada
+            # durante a geração (nova versão do modelo), então é procurada novamente a cada lote.
+            while True:
+                with self.condicao:
+                    reserva = self.reservas.get(chave)
+                    quantidade = 0 if reserva is None else min(self.tamanho_lote, self.tamanho - len(reserva))
+
+                if quantidade <= 0:
+                    break
+
+                try:
+                    azulejos = self.funcao_geracao(chave, quantidade)
+                except Exception as erro:
+                    with self.condicao:
+                        self.__registrar_falha(chave, erro)
+
+                    break
+
+                with self.condicao:
+                    self.falhas.pop(chave, None)
+                    reserva = self.reservas.get(chave)
+
+                    if reserva is not None:
+                        reserva.extend(azulejos)
+                        self.azulejos_gerados += len(azulejos)
+
+                    self.condicao.notify_all()
+
+    def recuperar_estatisticas(self):
+        with self.condicao:
+            return {
+                'tamanho': self.tamanho,
+                'tamanho_lote': self.tamanho_lote,
+                'nivel_minimo': self.nivel_minimo,
+                'aguardar_quando_vazio': self.aguardar_quando_vazio,
+                # Apenas a versão mais recente de cada modelo tem reserva, então o modelo identifica a reserva
+                'reservas': {str(chave[0]): len(reserva) for chave, reserva in self.reservas.items()},
+                'acertos': self.acertos,
+                'faltas': self.faltas,
+                'azulejos_gerados': self.azulejos_gerados,
+                'reservas_com_falha': len(self.falhas),
+                'reservas_descartadas': self.reservas_descartadas,
+            }
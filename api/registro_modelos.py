@@ -0,0 +1,229 @@
+import hashlib
+import math
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import tensorflow as tf
+
+from gan.pos_processamento import nome_arquivo_faixa_saida
+
+
+# Um diretório com o arquivo saved_model.pb é um artefato de serviço exportado (SavedModel) e não uma pasta de modelos
+def eh_artefato_servico(caminho_arquivo):
+    return Path(caminho_arquivo).joinpath('saved_model.pb').is_file()
+
+
+# Adapta o SavedModel exportado para a mesma interface usada pela API com os modelos Keras: o atributo input_shape e a
+# chamada direta com o ruído. O carregamento usa apenas o runtime do TensorFlow, sem o desserializador do Keras. A
+# ativação final do gerador é lida do arquivo gravado na exportação; artefatos antigos, sem o arquivo, são do DCGAN.
+class ModeloServico:
+    def __init__(self, caminho_artefato: str):
+        self.modelo = tf.saved_model.load(caminho_artefato)
+        self.funcao_inferencia = self.modelo.serve
+        self.input_shape = tuple(self.funcao_inferencia.input_signature[0].shape)
+        self.faixa_saida = 'tanh'
+
+        caminho_faixa_saida = Path(caminho_artefato).joinpath(nome_arquivo_faixa_saida)
+
+        if caminho_faixa_saida.is_file():
+            self.faixa_saida = caminho_faixa_saida.read_text().strip()
+
+    def __call__(self, ruido, training=False):
+        return self.funcao_inferencia(ruido)
+
+    @property
+    def variables(self):
+        return self.modelo.variables
+
+
+# Arquivos que compõem o modelo: o próprio arquivo .h5 ou todos os arquivos do artefato de serviço
+def listar_arquivos_modelo(caminho_arquivo):
+    caminho_arquivo = Path(caminho_arquivo)
+
+    if not caminho_arquivo.is_dir():
+        return [caminho_arquivo]
+
+    return sorted(caminho for caminho in caminho_arquivo.rglob('*') if caminho.is_file())
+
+
+def carregar_modelo(caminho_arquivo: str):
+    if eh_artefato_servico(caminho_arquivo):
+        return ModeloServico(caminho_arquivo)
+
+    # O Keras só é importado quando há um modelo .h5 para carregar
+    import keras
+
+    return keras.models.load_model(caminho_arquivo)
+
+
+# Mantém em memória os geradores já carregados para que cada requisição não precise desserializar o arquivo .h5 (ou o
+# artefato de serviço) e reconstruir o grafo do modelo. Os modelos são identificados pelo caminho do arquivo e pela data
+# de modificação (mtime), assim um arquivo sobrescrito em disco é recarregado automaticamente na próxima requisição. A
+# política de descarte é LRU (o modelo usado há mais tempo sai primeiro), limitada pela quantidade de modelos e,
+# opcionalmente, por um orçamento de memória em MB calculado a partir do tamanho dos pesos. A função preparar_modelo,
+# quando indicada, é aplicada a cada modelo recém-carregado (ex.: compilação e aquecimento da inferência).
+class RegistroModelos:
+    def __init__(self, tamanho_maximo: int = 4, limite_memoria_mb: float = None, preparar_modelo=None):
+        self.tamanho_maximo = max(tamanho_maximo, 1)
+        self.preparar_modelo = preparar_modelo
+        self.limite_memoria_bytes = None if limite_memoria_mb is None else int(limite_memoria_mb * 1024 * 1024)
+
+        # Chave: (caminho absoluto, mtime) -> (modelo, tamanho em bytes dos pesos)
+        self.modelos = OrderedDict()
+        # Chave: (caminho absoluto, mtime) -> hash do conteúdo do arquivo, usado para endereçar o cache de respostas
+        self.hashes = {}
+        self.memoria_utilizada = 0
+
+        # Um lock geral protege o dicionário e um lock por arquivo evita que duas requisições simultâneas carreguem o
+        # mesmo modelo ao mesmo tempo.
+        self.lock = threading.Lock()
+        self.locks_carregamento = {}
+
+    def __str__(self):
+        return (
+            "Modelos carregados: {0}/{1}\n"
+            "Memória utilizada (MB): {2:.2f}\n"
+            .format(len(self.modelos), self.tamanho_maximo, self.memoria_utilizada / (1024 * 1024))
+        )
+
+    def __len__(self):
+        return len(self.modelos)
+
+    # Para o artefato de serviço a data de modificação considerada é a do saved_model.pb, reescrito a cada exportação
+    @staticmethod
+    def gerar_chave(caminho_arquivo):
+        caminho_arquivo = Path(caminho_arquivo).resolve()
+
+        if eh_artefato_servico(caminho_arquivo):
+            return str(caminho_arquivo), os.stat(caminho_arquivo.joinpath('saved_model.pb')).st_mtime_ns
+
+        return str(caminho_arquivo), os.stat(caminho_arquivo).st_mtime_ns
+
+    # Tamanho dos pesos calculado pelo formato e tipo de cada variável, sem copiar os valores. O formato e o tipo das
+    # variáveis do Keras 3 são uma tupla e um nome, os do TensorFlow um TensorShape e um DType, ambos aceitos aqui.
+    @staticmethod
+    def calcular_memoria(modelo):
+        return sum(math.prod(variavel.shape) * tf.as_dtype(variavel.dtype).size for variavel in modelo.variables)
+
+    # Retorna o modelo do arquivo indicado, carregando-o apenas se ainda não estiver em memória ou se o arquivo em disco
+    # tiver sido alterado desde o último carregamento.
+    def recuperar(self, caminho_arquivo):
+        chave = self.gerar_chave(caminho_arquivo)
+
+        with self.lock:
+            if chave in self.modelos:
+                self.modelos.move_to_end(chave)
+                return self.modelos[chave][0]
+
+            lock_carregamento = self.locks_carregamento.setdefault(chave[0], threading.Lock())
+
+        with lock_carregamento:
+            # Outra requisição pode ter carregado o modelo enquanto esta aguardava o lock
+            with self.lock:
+                if chave in self.modelos:
+                    self.modelos.move_to_end(chave)
+                    return self.modelos[chave][0]
+
+            modelo = carregar_modelo(chave[0])
+
+            if self.preparar_modelo is not None:
+                modelo = self.preparar_modelo(modelo)
+
+            self.__armazenar(chave, modelo)
+
+        return modelo
+
+    # Indica se um modelo com os pesos do tamanho indicado, em bytes, cabe no registro sem descartar nenhum modelo. As
+    # versões já carregadas do mesmo arquivo não contam, pois são substituídas pela nova.
+    def comporta(self, memoria: int = 0, caminho_arquivo=None):
+        with self.lock:
+            outros = [modelo for chave, modelo in self.modelos.items() if chave[0] != str(caminho_arquivo)]
+
+            if len(outros) >= self.tamanho_maximo:
+                return False
+
+            memoria_outros = sum(memoria_modelo for _, memoria_modelo in outros)
+
+            return self.limite_memoria_bytes is None or memoria_outros + memoria <= self.limite_memoria_bytes
+
+    # Guarda um modelo já carregado fora do registro (ex.: pela validação do catálogo), como se tivesse sido carregado
+    # pelo recuperar
+    def adicionar(self, caminho_arquivo, modelo):
+        if self.preparar_modelo is not None:
+            modelo = self.preparar_modelo(modelo)
+
+        self.__armazenar(self.gerar_chave(caminho_arquivo), modelo)
+
+        return modelo
+
+    def __armazenar(self, chave, modelo):
+        memoria = self.calcular_memoria(modelo)
+
+        with self.lock:
+            # Versões antigas do mesmo arquivo não serão mais usadas
+            for chave_antiga in [c for c in self.modelos if c[0] == chave[0]]:
+                self.__remover(chave_antiga)
+
+            self.modelos[chave] = (modelo, memoria)
+            self.memoria_utilizada += memoria
+            self.__descartar_excedentes()
+
+    # Hash SHA-256 do conteúdo do arquivo do modelo. É calculado uma única vez para cada versão (mtime) do arquivo.
+    def recuperar_hash(self, caminho_arquivo):
+        chave = self.gerar_chave(caminho_arquivo)
+
+        with self.lock:
+            if chave in self.hashes:
+                return self.hashes[chave]
+
+        hash_arquivo = hashlib.sha256()
+
+        for caminho in listar_arquivos_modelo(chave[0]):
+            with open(caminho, 'rb') as arquivo:
+                for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+                    hash_arquivo.update(bloco)
+
+        with self.lock:
+            for chave_antiga in [c for c in self.hashes if c[0] == chave[0]]:
+                del self.hashes[chave_antiga]
+
+            self.hashes[chave] = hash_arquivo.hexdigest()
+
+            return self.hashes[chave]
+
+    def carregados(self):
+        with self.lock:
+            return [(caminho, mtime, memoria) for (caminho, mtime), (_, memoria) in self.modelos.items()]
+
+    # Remove da memória todas as versões do arquivo indicado, usado quando o modelo sai do catálogo
+    def descartar(self, caminho_arquivo):
+        caminho_arquivo = str(Path(caminho_arquivo).resolve())
+
+        with self.lock:
+            for chave in [c for c in self.modelos if c[0] == caminho_arquivo]:
+                self.__remover(chave)
+
+    def limpar(self):
+        with self.lock:
+            self.modelos.clear()
+            self.memoria_utilizada = 0
+
+    def __remover(self, chave):
+        _, memoria = self.modelos.pop(chave)
+        self.memoria_utilizada -= memoria
+
+    # O modelo recém-carregado é sempre mantido, mesmo que sozinho ultrapasse o orçamento de memória, caso contrário a
+    # requisição que o carregou não teria o que usar.
+    def __descartar_excedentes(self):
+        while len(self.modelos) > 1:
+            excede_quantidade = len(self.modelos) > self.tamanho_maximo
+            excede_memoria = (
+                self.limite_memoria_bytes is not None and self.memoria_utilizada > self.limite_memoria_bytes
+            )
+
+            if not (excede_quantidade or excede_memoria):
+                break
+
+            self.__remover(next(iter(self.modelos)))
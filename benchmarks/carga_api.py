@@ -0,0 +1,215 @@
+# Teste de carga da API: sobe a aplicação de gerador_azulejo_api.levantar_api em um servidor HTTP local, com um gerador
+# pequeno de pesos aleatórios (semente fixa), portanto sem precisar de um modelo treinado nem de rede. Cada cenário
+# (mistura de requisições) é executado em cada nível de concorrência com a mesma quantidade de requisições e a mesma
+# sequência pseudoaleatória, para que execuções em commits diferentes sejam comparáveis. O resultado é impresso (ou
+# gravado) em JSON com a vazão e as latências p50/p95/p99 de cada combinação.
+#
+# Cenários: unico (GET /), lote (GET /lote), semente (GET / com poucas sementes, exercita o cache de respostas) e misto
+# (os três juntos). Outros parâmetros da API podem ser passados em JSON com -opcoes_api.
+#
+# Exemplos:
+# python benchmarks/carga_api.py
+# python benchmarks/carga_api.py -concorrencias 1,8,32 -cenarios unico,misto -opcoes_api '{"janela_agendador": 5}'
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, diretorio_projeto)
+
+# Peso de cada tipo de requisição em cada cenário
+cenarios = {
+    'unico': {'unico': 1},
+    'lote': {'lote': 1},
+    'semente': {'semente': 1},
+    'misto': {'unico': 6, 'lote': 1, 'semente': 3},
+}
+
+
+# Gerador no formato do DCGAN (ruído -> Dense -> Conv2DTranspose até o tamanho da imagem -> tanh), com menos filtros
+def criar_gerador_aleatorio(caminho_arquivo: str, tamanho_imagem: int, dimensao_ruido: int, semente: int):
+    import keras
+    from keras import layers
+
+    keras.utils.set_random_seed(semente)
+    filtros = 256
+    tamanho = 4
+    modelo = keras.Sequential(name='gerador')
+    modelo.add(layers.Input(shape=(dimensao_ruido,)))
+    modelo.add(layers.Dense(tamanho * tamanho * filtros, use_bias=False))
+    modelo.add(layers.BatchNormalization())
+    modelo.add(layers.LeakyReLU())
+    modelo.add(layers.Reshape((tamanho, tamanho, filtros)))
+
+    while tamanho < tamanho_imagem:
+        filtros = max(filtros // 2, 16)
+        tamanho *= 2
+        modelo.add(layers.Conv2DTranspose(filtros, kernel_size=4, strides=2, padding='same', use_bias=False))
+        modelo.add(layers.BatchNormalization())
+        modelo.add(layers.LeakyReLU(negative_slope=0.2))
+
+    modelo.add(layers.Conv2DTranspose(3, kernel_size=4, padding='same', use_bias=False, activation='tanh'))
+    modelo.save(caminho_arquivo)
+
+    return caminho_arquivo
+
+
+def montar_caminhos(cenario: str, quantidade: int, tamanho_lote: int, sementes: int, semente: int):
+    gerador_aleatorio = random.Random(semente)
+    tipos, pesos = zip(*cenarios[cenario].items())
+    caminhos = []
+
+    for tipo in gerador_aleatorio.choices(tipos, weights=pesos, k=quantidade):
+        if tipo == 'unico':
+            caminhos.append('/')
+        elif tipo == 'lote':
+            caminhos.append(f'/lote?n={tamanho_lote}')
+        else:
+            caminhos.append(f'/?seed={gerador_aleatorio.randrange(sementes)}')
+
+    return caminhos
+
+
+def requisitar(endereco: str, caminho: str):
+    inicio = time.perf_counter()
+
+    try:
+        with urllib.request.urlopen(f'http://{endereco}{caminho}', timeout=300) as resposta:
+            resposta.read()
+            sucesso = resposta.status == 200
+    except (urllib.error.URLError, OSError):
+        sucesso = False
+
+    return time.perf_counter() - inicio, sucesso
+
+
+def resumir_latencias(latencias):
+    percentis = statistics.quantiles(latencias, n=100, method='inclusive') if len(latencias) > 1 else latencias * 99
+
+    return {
+        'p50_ms': percentis[49] * 1000,
+        'p95_ms': percentis[94] * 1000,
+        'p99_ms': percentis[98] * 1000,
+        'media_ms': statistics.fmean(latencias) * 1000,
+        'maximo_ms': max(latencias) * 1000,
+    }
+
+
+def executar_cenario(endereco: str, caminhos, concorrencia: int):
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        inicio = time.perf_counter()
+        resultados = list(executor.map(lambda caminho: requisitar(endereco, caminho), caminhos))
+        duracao = time.perf_counter() - inicio
+
+    latencias = [latencia for latencia, sucesso in resultados if sucesso]
+
+    return {
+        'requisicoes': len(caminhos),
+        'erros': len(caminhos) - len(latencias),
+        'duracao_s': duracao,
+        'vazao_rps': len(latencias) / duracao,
+        **(resumir_latencias(latencias) if latencias else {}),
+    }
+
+
+def recuperar_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=diretorio_projeto, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parametros = argparse.ArgumentParser(description='Teste de carga e latência da API de azulejos.')
+    parametros.add_argument('-concorrencias', default='1,4,16', help='Níveis de concorrência separados por vírgula.')
+    parametros.add_argument('-cenarios', default=','.join(cenarios), help='Cenários separados por vírgula.')
+    parametros.add_argument('-requisicoes', type=int, default=200, help='Requisições por cenário e concorrência.')
+    parametros.add_argument('-aquecimento', type=int, default=20, help='Requisições descartadas antes de medir.')
+    parametros.add_argument('-tamanho_lote', type=int, default=16, help='Quantidade de azulejos do cenário lote.')
+    parametros.add_argument('-sementes', type=int, default=32, help='Sementes distintas do cenário semente.')
+    parametros.add_argument('-tamanho_imagem', type=int, default=64, help='Tamanho da imagem do gerador aleatório.')
+    parametros.add_argument('-dimensao_ruido', type=int, default=100, help='Dimensão do ruído do gerador aleatório.')
+    parametros.add_argument('-semente', type=int, default=42, help='Semente dos pesos e da sequência de requisições.')
+    parametros.add_argument('-opcoes_api', default='{}', help='Parâmetros extras de levantar_api, em JSON.')
+    parametros.add_argument('-saida', default=None, help='Arquivo JSON do resultado, por default imprime na tela.')
+    parametros = parametros.parse_args()
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+    # O log de cada requisição do servidor de desenvolvimento atrapalharia a leitura do progresso
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    import tensorflow as tf
+    from werkzeug.serving import make_server
+
+    from gerador_azulejo_api import levantar_api
+
+    opcoes_api = json.loads(parametros.opcoes_api)
+    concorrencias = [int(concorrencia) for concorrencia in parametros.concorrencias.split(',')]
+    nomes_cenarios = [cenario.strip() for cenario in parametros.cenarios.split(',')]
+
+    with tempfile.TemporaryDirectory() as diretorio_temporario:
+        caminho_modelo = criar_gerador_aleatorio(
+            os.path.join(diretorio_temporario, '20000101_gerador_azulejos.h5'),
+            parametros.tamanho_imagem,
+            parametros.dimensao_ruido,
+            parametros.semente,
+        )
+        app = levantar_api(caminho_modelo, intervalo_catalogo=0, **opcoes_api)
+        servidor = make_server('127.0.0.1', 0, app, threaded=True)
+        endereco = f'127.0.0.1:{servidor.server_port}'
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+        resultado = {
+            'commit': recuperar_commit(),
+            'python': platform.python_version(),
+            'tensorflow': tf.__version__,
+            'cpus': os.cpu_count(),
+            'parametros': {**vars(parametros), 'opcoes_api': opcoes_api},
+            'cenarios': {},
+        }
+
+        try:
+            for cenario in nomes_cenarios:
+                resultado['cenarios'][cenario] = {}
+
+                for concorrencia in concorrencias:
+                    aquecimento = montar_caminhos(
+                        cenario, parametros.aquecimento, parametros.tamanho_lote, parametros.sementes,
+                        parametros.semente,
+                    )
+                    executar_cenario(endereco, aquecimento, concorrencia)
+                    caminhos = montar_caminhos(
+                        cenario, parametros.requisicoes, parametros.tamanho_lote, parametros.sementes,
+                        parametros.semente + concorrencia,
+                    )
+                    medicao = executar_cenario(endereco, caminhos, concorrencia)
+                    resultado['cenarios'][cenario][str(concorrencia)] = medicao
+                    print(f'{cenario} x {concorrencia}: {medicao}', file=sys.stderr)
+        finally:
+            servidor.shutdown()
+
+    texto = json.dumps(resultado, indent=2)
+
+    if parametros.saida is None:
+        print(texto)
+    else:
+        with open(parametros.saida, 'w') as arquivo:
+            arquivo.write(texto)
+
+
+if __name__ == '__main__':
+    main()
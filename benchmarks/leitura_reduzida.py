@@ -0,0 +1,159 @@
+# Compara a preparação das imagens com a decodificação completa dos JPEGs e com a decodificação reduzida (1/2, 1/4 ou
+# 1/8, escolhida pelo tamanho pedido, ver formatador/formatador_imagem.py). Cada modo é medido em um processo próprio,
+# para que o pico de memória (RSS) de um não contamine o do outro: o tempo por imagem é o da leitura e do
+# redimensionamento (FormatadorImagem preguiçoso) e o pico de RSS é o do processo, descontada a memória antes da
+# primeira imagem (apenas Linux). Também informa a diferença média, em níveis de cinza, entre as imagens redimensionadas
+# dos dois modos. Sem diretório de imagens são gerados JPEGs sintéticos grandes (semente fixa). O resultado é impresso
+# em JSON.
+#
+# Exemplos:
+# python benchmarks/leitura_reduzida.py
+# python benchmarks/leitura_reduzida.py -diretorio imagens/originais -tam 128
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, diretorio_projeto)
+
+
+# Fotografia sintética de um painel: gradientes e padrões periódicos com um pouco de ruído, que comprimem como uma foto
+def gerar_jpegs(diretorio: str, quantidade: int, largura: int, altura: int, semente: int):
+    import cv2
+    import numpy as np
+
+    gerador_aleatorio = np.random.default_rng(semente)
+    linhas, colunas = np.mgrid[0:altura, 0:largura].astype(np.float32)
+    caminhos = []
+
+    for posicao in range(quantidade):
+        periodo = gerador_aleatorio.uniform(40, 200)
+        canais = [
+            127 + 60 * np.sin(colunas / periodo + deslocamento) * np.cos(linhas / periodo - deslocamento)
+            + 40 * (linhas / altura) + gerador_aleatorio.normal(0, 6, (altura, largura)).astype(np.float32)
+            for deslocamento in gerador_aleatorio.uniform(0, np.pi, 3)
+        ]
+        imagem = np.clip(np.dstack(canais), 0, 255).astype(np.uint8)
+        caminho_imagem = os.path.join(diretorio, f'painel_{posicao:03d}.jpg')
+        cv2.imwrite(caminho_imagem, imagem, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        caminhos.append(caminho_imagem)
+
+    return caminhos
+
+
+# RSS atual (VmRSS) ou pico de RSS (VmHWM) do processo, apenas Linux. O VmHWM, ao contrário do ru_maxrss, não herda o
+# pico do processo pai que gerou as imagens.
+def ler_memoria_mb(campo: str):
+    with open('/proc/self/status') as arquivo:
+        for linha in arquivo:
+            if linha.startswith(campo + ':'):
+                return int(linha.split()[1]) / 1024
+
+    return 0.0
+
+
+# Executado no processo filho: prepara cada imagem em um dos modos e devolve os tempos e o pico de memória
+def medir(caminhos, tamanho_imagem: int, leitura_reduzida: bool):
+    import cv2
+
+    from formatador.formatador_imagem import FormatadorImagem
+
+    cv2.setNumThreads(1)
+    rss_inicial_mb = ler_memoria_mb('VmRSS')
+    tempos = []
+
+    for caminho_imagem in caminhos:
+        inicio = time.perf_counter()
+        FormatadorImagem(
+            caminho_imagem, tamanho_imagem, tamanho_imagem, preguicoso=True, leitura_reduzida=leitura_reduzida
+        )
+        tempos.append(time.perf_counter() - inicio)
+
+    pico_rss_mb = ler_memoria_mb('VmHWM')
+
+    return {
+        'tempo_medio_ms': statistics.fmean(tempos) * 1000,
+        'tempo_mediano_ms': statistics.median(tempos) * 1000,
+        'pico_rss_mb': pico_rss_mb,
+        'pico_rss_acima_inicial_mb': pico_rss_mb - rss_inicial_mb,
+    }
+
+
+def medir_em_processo(caminhos, tamanho_imagem: int, leitura_reduzida: bool):
+    resultado = subprocess.run(
+        [
+            sys.executable, os.path.abspath(__file__), '-medir', 'reduzida' if leitura_reduzida else 'completa',
+            '-tam', str(tamanho_imagem), '-caminhos', json.dumps(caminhos),
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    return json.loads(resultado.stdout)
+
+
+def calcular_diferenca(caminhos, tamanho_imagem: int):
+    import numpy as np
+
+    from formatador.formatador_imagem import FormatadorImagem
+
+    diferencas = []
+
+    for caminho_imagem in caminhos:
+        completa, reduzida = (
+            FormatadorImagem(
+                caminho_imagem, tamanho_imagem, tamanho_imagem, preguicoso=True, leitura_reduzida=leitura_reduzida
+            ).imagem_redimensionada.astype(np.int16)
+            for leitura_reduzida in (False, True)
+        )
+        diferencas.append(float(np.abs(completa - reduzida).mean()))
+
+    return statistics.fmean(diferencas)
+
+
+def main():
+    parametros = argparse.ArgumentParser(description='Decodificação completa x reduzida dos JPEGs na preparação.')
+    parametros.add_argument('-diretorio', default=None, help='Diretório com as imagens, por default gera JPEGs.')
+    parametros.add_argument('-tam', type=int, default=128, help='Tamanho das imagens preparadas.')
+    parametros.add_argument('-quantidade', type=int, default=8, help='Quantidade de JPEGs sintéticos.')
+    parametros.add_argument('-largura', type=int, default=6000, help='Largura dos JPEGs sintéticos.')
+    parametros.add_argument('-altura', type=int, default=4000, help='Altura dos JPEGs sintéticos.')
+    parametros.add_argument('-semente', type=int, default=42, help='Semente dos JPEGs sintéticos.')
+    parametros.add_argument('-medir', choices=['completa', 'reduzida'], default=None, help=argparse.SUPPRESS)
+    parametros.add_argument('-caminhos', default=None, help=argparse.SUPPRESS)
+    parametros = parametros.parse_args()
+
+    if parametros.medir is not None:
+        print(json.dumps(medir(json.loads(parametros.caminhos), parametros.tam, parametros.medir == 'reduzida')))
+        return
+
+    with tempfile.TemporaryDirectory() as diretorio_temporario:
+        if parametros.diretorio is None:
+            caminhos = gerar_jpegs(
+                diretorio_temporario, parametros.quantidade, parametros.largura, parametros.altura, parametros.semente
+            )
+        else:
+            caminhos = [
+                os.path.join(parametros.diretorio, arquivo) for arquivo in sorted(os.listdir(parametros.diretorio))
+            ]
+
+        resultado = {
+            'imagens': len(caminhos),
+            'tam': parametros.tam,
+            'completa': medir_em_processo(caminhos, parametros.tam, False),
+            'reduzida': medir_em_processo(caminhos, parametros.tam, True),
+            'diferenca_media_niveis': calcular_diferenca(caminhos, parametros.tam),
+        }
+
+    resultado['aceleracao'] = resultado['completa']['tempo_medio_ms'] / resultado['reduzida']['tempo_medio_ms']
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
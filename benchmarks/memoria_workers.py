@@ -0,0 +1,117 @@
+# Mede a memória única (privada) e compartilhada de cada worker do gunicorn com e sem o preload dos modelos no master.
+# Sobe o gunicorn com o gunicorn.conf.py do projeto, aguarda os workers, envia requisições para que todos façam
+# inferências e lê o /proc/<pid>/smaps_rollup de cada worker (apenas Linux). O resultado é impresso em JSON.
+#
+# Exemplo:
+# python benchmarks/memoria_workers.py modelos/20250809_gerador_azulejos.h5 -workers 4
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def ler_memoria(pid: int):
+    memoria = {}
+
+    with open(f'/proc/{pid}/smaps_rollup') as arquivo:
+        for linha in arquivo:
+            partes = linha.split()
+
+            if len(partes) == 3 and partes[2] == 'kB':
+                memoria[partes[0].rstrip(':')] = int(partes[1]) / 1024
+
+    return {
+        'rss_mb': memoria['Rss'],
+        'pss_mb': memoria['Pss'],
+        'privada_mb': memoria['Private_Clean'] + memoria['Private_Dirty'],
+        'compartilhada_mb': memoria['Shared_Clean'] + memoria['Shared_Dirty'],
+    }
+
+
+def recuperar_workers(pid_master: int):
+    with open(f'/proc/{pid_master}/task/{pid_master}/children') as arquivo:
+        return [int(pid) for pid in arquivo.read().split()]
+
+
+def requisitar(endereco: str):
+    with urllib.request.urlopen(f'http://{endereco}/', timeout=120) as resposta:
+        return resposta.status
+
+
+def medir(caminho_modelo: str, workers: int, preload: bool, porta: int, requisicoes: int):
+    endereco = f'127.0.0.1:{porta}'
+    ambiente = dict(
+        os.environ,
+        AZULEJOS_MODELO=os.path.abspath(caminho_modelo),
+        GUNICORN_BIND=endereco,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_PRELOAD='1' if preload else '0',
+        TF_CPP_MIN_LOG_LEVEL='3',
+    )
+    # Sem preload cada worker carrega os modelos ao importar a aplicação, quando o catálogo os valida
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=diretorio_projeto,
+        env=ambiente,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        limite = time.time() + 300
+
+        while True:
+            try:
+                if len(recuperar_workers(processo.pid)) == workers and requisitar(endereco) == 200:
+                    break
+            except OSError:
+                pass
+
+            if time.time() > limite:
+                raise TimeoutError('O gunicorn não subiu a tempo.')
+
+            time.sleep(0.5)
+
+        with ThreadPoolExecutor(max_workers=workers * 2) as executor:
+            list(executor.map(requisitar, [endereco] * requisicoes))
+
+        memoria_workers = [ler_memoria(pid) for pid in recuperar_workers(processo.pid)]
+    finally:
+        processo.send_signal(signal.SIGTERM)
+        processo.wait(timeout=60)
+
+    return {
+        'workers': memoria_workers,
+        'soma_pss_workers_mb': sum(memoria['pss_mb'] for memoria in memoria_workers),
+        'media_privada_workers_mb': sum(memoria['privada_mb'] for memoria in memoria_workers) / workers,
+        'media_compartilhada_workers_mb': sum(memoria['compartilhada_mb'] for memoria in memoria_workers) / workers,
+    }
+
+
+def main():
+    parametros = argparse.ArgumentParser(description='Memória única e compartilhada dos workers do gunicorn.')
+    parametros.add_argument('caminho_modelo', help='Arquivo .h5, artefato de serviço ou pasta de modelos.')
+    parametros.add_argument('-workers', type=int, default=4, help='Quantidade de workers do gunicorn.')
+    parametros.add_argument('-porta', type=int, default=8765, help='Porta local usada durante a medição.')
+    parametros.add_argument('-requisicoes', type=int, default=64, help='Requisições enviadas antes da medição.')
+    parametros = parametros.parse_args()
+
+    resultado = {}
+
+    for preload in (False, True):
+        resultado['com_preload' if preload else 'sem_preload'] = medir(
+            parametros.caminho_modelo, parametros.workers, preload, parametros.porta, parametros.requisicoes
+        )
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
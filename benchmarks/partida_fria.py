@@ -0,0 +1,86 @@
+# Compara a partida a frio da API com o gerador em .h5 e com o artefato de serviço (SavedModel). Cada medição é feita
+# em um processo novo, como acontece com um worker recém-criado: tempo de import, tempo de criação da aplicação (que
+# inclui o carregamento do modelo pelo catálogo e, com -compilar, o aquecimento), latência da primeira e da segunda
+# requisição e memória residente (RSS) ao final. Com o modelo aquecido na subida as duas requisições têm latências
+# próximas. O resultado é impresso em JSON com a mediana das repetições.
+#
+# Exemplos:
+# python benchmarks/partida_fria.py modelos/20250809_gerador_azulejos.h5 modelos/20250809_gerador_azulejos_servico
+# python benchmarks/partida_fria.py modelos/20250809_gerador_azulejos.h5 -compilar
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+codigo_medicao = '''
+import json
+import resource
+import sys
+import time
+
+inicio = time.perf_counter()
+sys.path.insert(0, {diretorio_projeto!r})
+
+from gerador_azulejo_api import levantar_api
+
+fim_import = time.perf_counter()
+app = levantar_api({caminho_modelo!r}, compilar_inferencia={compilar!r})
+fim_aplicacao = time.perf_counter()
+resposta = app.test_client().get('/')
+fim_primeira_requisicao = time.perf_counter()
+app.test_client().get('/')
+fim_segunda_requisicao = time.perf_counter()
+
+with open('/proc/self/status') as arquivo:
+    rss = [int(linha.split()[1]) for linha in arquivo if linha.startswith('VmRSS')][0]
+
+print(json.dumps({{
+    'status': resposta.status_code,
+    'import_s': fim_import - inicio,
+    'aplicacao_s': fim_aplicacao - fim_import,
+    'primeira_requisicao_s': fim_primeira_requisicao - fim_aplicacao,
+    'segunda_requisicao_s': fim_segunda_requisicao - fim_primeira_requisicao,
+    'partida_total_s': fim_primeira_requisicao - inicio,
+    'rss_mb': rss / 1024,
+    'rss_maximo_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+'''
+
+
+def medir(caminho_modelo: str, compilar: bool = False):
+    codigo = codigo_medicao.format(
+        diretorio_projeto=diretorio_projeto, caminho_modelo=os.path.abspath(caminho_modelo), compilar=compilar
+    )
+    ambiente = dict(os.environ, TF_CPP_MIN_LOG_LEVEL='3')
+    processo = subprocess.run(
+        [sys.executable, '-c', codigo], capture_output=True, text=True, env=ambiente, check=True
+    )
+
+    return json.loads(processo.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parametros = argparse.ArgumentParser(description='Partida a frio da API por tipo de artefato do modelo.')
+    parametros.add_argument('caminhos_modelos', nargs='+', help='Arquivos .h5 e/ou diretórios de artefato de serviço.')
+    parametros.add_argument('-repeticoes', type=int, default=5, help='Quantidade de processos medidos por modelo.')
+    parametros.add_argument('-compilar', action='store_true', help='Criar a API com a inferência compilada.')
+    parametros = parametros.parse_args()
+
+    resultado = {}
+
+    for caminho_modelo in parametros.caminhos_modelos:
+        medicoes = [medir(caminho_modelo, parametros.compilar) for _ in range(parametros.repeticoes)]
+        resultado[caminho_modelo] = {
+            chave: statistics.median(medicao[chave] for medicao in medicoes)
+            for chave in medicoes[0] if chave != 'status'
+        }
+
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == '__main__':
+    main()
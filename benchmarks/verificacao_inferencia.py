@@ -0,0 +1,102 @@
+# Verificação rápida (smoke check) da inferência da API em cada modo: sem compilação, compilada (-compilar) e compilada
+# com o XLA (-xla). Em cada modo a aplicação é criada com o caminho de modelos indicado, o catálogo precisa aceitar
+# todos os modelos e as requisições com semente, em vários tamanhos (o do modelo, o padrão da API e outros), precisam
+# responder 200. As imagens, no formato raw, são comparadas com as do modo sem compilação: o XLA pode mudar a ordem das
+# operações em float, então é tolerada uma diferença de poucos níveis. Termina com código 1 quando alguma verificação
+# falha. O resultado é impresso em JSON.
+#
+# Exemplos:
+# python benchmarks/verificacao_inferencia.py modelos
+# python benchmarks/verificacao_inferencia.py modelos/20250809_gerador_azulejos.h5 -tamanhos 64 256 -tolerancia 2
+import argparse
+import json
+import os
+import sys
+import time
+
+diretorio_projeto = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, diretorio_projeto)
+
+# Modo -> parâmetros de levantar_api
+modos_inferencia = {
+    'padrao': {},
+    'compilada': {'compilar_inferencia': True},
+    'xla': {'xla': True},
+}
+
+
+def verificar_modo(caminho_modelo: str, parametros_modo: dict, tamanhos, sementes):
+    import numpy as np
+
+    from gerador_azulejo_api import levantar_api
+
+    inicio = time.perf_counter()
+    app = levantar_api(caminho_modelo, intervalo_catalogo=0, **parametros_modo)
+    cliente = app.test_client()
+    catalogo = cliente.get('/modelos').get_json()
+    resultado = {
+        'aplicacao_s': time.perf_counter() - inicio,
+        'modelos': [modelo['nome'] for modelo in catalogo['modelos']],
+        'invalidos': catalogo['invalidos'],
+        'falhas': [],
+    }
+    imagens = {}
+
+    for modelo in resultado['modelos']:
+        for tamanho in tamanhos:
+            for semente in sementes:
+                resposta = cliente.get(f'/?modelo={modelo}&seed={semente}&tamanho={tamanho}&formato=raw')
+
+                if resposta.status_code != 200:
+                    resultado['falhas'].append(f'{modelo} tamanho {tamanho} seed {semente}: {resposta.status_code}')
+                    continue
+
+                imagens[(modelo, tamanho, semente)] = np.frombuffer(resposta.data, dtype=np.uint8)
+
+    return resultado, imagens
+
+
+def main():
+    import numpy as np
+
+    parametros = argparse.ArgumentParser(description='Inferência da API sem compilação, compilada e com o XLA.')
+    parametros.add_argument('caminho_modelo', help='Arquivo .h5, artefato de serviço ou pasta de modelos.')
+    parametros.add_argument('-tamanhos', type=int, nargs='+', default=[64, 256, 300], help='Tamanhos pedidos.')
+    parametros.add_argument('-sementes', type=int, nargs='+', default=[0, 1], help='Sementes das requisições.')
+    parametros.add_argument('-tolerancia', type=int, default=2, help='Diferença máxima, em níveis, entre os modos.')
+    parametros = parametros.parse_args()
+
+    resultado = {}
+    imagens_referencia = None
+    sucesso = True
+
+    for modo, parametros_modo in modos_inferencia.items():
+        resultado_modo, imagens = verificar_modo(
+            parametros.caminho_modelo, parametros_modo, parametros.tamanhos, parametros.sementes
+        )
+
+        if imagens_referencia is None:
+            imagens_referencia = imagens
+        else:
+            diferencas = [
+                int(np.abs(imagem.astype(np.int16) - imagens_referencia[chave]).max())
+                for chave, imagem in imagens.items() if chave in imagens_referencia
+            ]
+            resultado_modo['diferenca_maxima_niveis'] = max(diferencas, default=0)
+
+            if resultado_modo['diferenca_maxima_niveis'] > parametros.tolerancia:
+                resultado_modo['falhas'].append(f'Diferença de {resultado_modo["diferenca_maxima_niveis"]} níveis')
+
+        if not resultado_modo['modelos'] or resultado_modo['invalidos']:
+            resultado_modo['falhas'].append('Catálogo sem todos os modelos válidos')
+
+        sucesso = sucesso and not resultado_modo['falhas']
+        resultado[modo] = resultado_modo
+
+    resultado['sucesso'] = sucesso
+    print(json.dumps(resultado, indent=2))
+    sys.exit(0 if sucesso else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,158 @@
-import argparse
-
-class ParametrosApi():
-    def __init__(self):
-        self.parametros = argparse.ArgumentParser(
-            prog="Gerador de Azulejos",
-            description = "Aplicação criada como parte do projeto de conclusão de curso do Mestrado em Media Digitais "
-                "Interativos",
-        )
-
-        self.parametros.add_argument(
-            "caminho_arquivo_modelo",
-            type=str,
-            help="Indicar o caminho para o arquivo que contém o modelo da DCGAN/IA treinado.",
-            nargs="?",
-        )
-
-    def recuperar_parametros(self):
+import argparse
+
+class ParametrosApi():
+    def __init__(self):
+        self.parametros = argparse.ArgumentParser(
+            prog="Gerador de Azulejos",
+            description = "Aplicação criada como parte do projeto de conclusão de curso do Mestrado em Media Digitais "
+                "Interativos",
+        )
+
+        self.parametros.add_argument(
+            "caminho_arquivo_modelo",
+            type=str,
+            help="Indicar o caminho para o arquivo que contém o modelo da DCGAN/IA treinado.",
+            nargs="?",
+        )
+
+        self.parametros.add_argument(
+            "-cache_modelos",
+            required=False,
+            type=int,
+            default=4,
+            help="Indicar a quantidade máxima de modelos mantidos em memória pela API, parâmetro opcional e por "
+                "default mantém 4 modelos. Quando o limite é atingido o modelo usado há mais tempo é descartado.",
+        )
+        self.parametros.add_argument(
+            "-memoria_modelos",
+            required=False,
+            type=float,
+            default=None,
+            help="Indicar o orçamento de memória, em MB, para os pesos dos modelos mantidos em memória pela API. "
+                "Parâmetro opcional, por default não há limite além da quantidade de modelos.",
+        )
+        self.parametros.add_argument(
+            "-maximo_lote",
+            required=False,
+            type=int,
+            default=64,
+            help="Indicar a quantidade máxima de imagens que podem ser geradas em uma única requisição ao /lote, "
+                "parâmetro opcional e por default permite 64 imagens.",
+        )
+        self.parametros.add_argument(
+            "-janela_agendador",
+            required=False,
+            type=float,
+            default=0,
+            help="Indicar a janela, em milissegundos, em que requisições concorrentes para o mesmo modelo são "
+                "agrupadas em uma única inferência (ex.: 5). Parâmetro opcional, por default 0 desativa o agendador.",
+        )
+        self.parametros.add_argument(
+            "-maximo_lote_agendador",
+            required=False,
+            type=int,
+            default=32,
+            help="Indicar a quantidade máxima de imagens em um lote montado pelo agendador, parâmetro opcional e por "
+                "default usa 32 imagens.",
+        )
+        self.parametros.add_argument(
+            "-pool",
+            required=False,
+            type=int,
+            default=0,
+            help="Indicar a quantidade de azulejos pré-gerados mantidos em memória para cada modelo. A reserva é "
+                "reposta em segundo plano quando fica abaixo da metade. Parâmetro opcional, por default 0 desativa a "
+                "reserva.",
+        )
+        self.parametros.add_argument(
+            "-lote_pool",
+            required=False,
+            type=int,
+            default=64,
+            help="Indicar a quantidade de azulejos gerados em cada lote de reposição da reserva, parâmetro opcional e "
+                "por default usa 64 azulejos.",
+        )
+        self.parametros.add_argument(
+            "-pool_vazio",
+            required=False,
+            type=str,
+            default='gerar',
+            help="Indicar o comportamento quando a reserva estiver vazia: GERAR o azulejo na própria requisição ou "
+                "AGUARDAR a reposição. Parâmetro opcional, por default gera na requisição.",
+            choices=['gerar', 'aguardar'],
+        )
+        self.parametros.add_argument(
+            "-cache_respostas",
+            required=False,
+            type=float,
+            default=64,
+            help="Indicar o limite, em MB, do cache em memória das imagens geradas com semente (parâmetro seed), "
+                "parâmetro opcional e por default usa 64 MB.",
+        )
+        self.parametros.add_argument(
+            "-diretorio_cache",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar um diretório para guardar em disco o cache das imagens geradas com semente. Parâmetro "
+                "opcional, por default o cache fica apenas em memória.",
+        )
+        self.parametros.add_argument(
+            "-maximo_painel",
+            required=False,
+            type=int,
+            default=100,
+            help="Indicar a quantidade máxima de linhas e de colunas de azulejos de um painel gerado pelo /painel, "
+                "parâmetro opcional e por default permite 100.",
+        )
+        self.parametros.add_argument(
+            "-threads_codificacao",
+            required=False,
+            type=int,
+            default=4,
+            help="Indicar a quantidade de threads usadas para redimensionar e codificar as imagens fora da thread da "
+                "requisição, parâmetro opcional e por default usa 4 threads.",
+        )
+        self.parametros.add_argument(
+            "-maximo_quadros",
+            required=False,
+            type=int,
+            default=120,
+            help="Indicar a quantidade máxima de quadros de uma animação gerada pelo /animacao, parâmetro opcional e "
+                "por default permite 120 quadros.",
+        )
+        self.parametros.add_argument(
+            "-compilar",
+            required=False,
+            action="store_true",
+            help="Executar a inferência em uma tf.function com assinatura fixa e lotes em buckets, aquecida na subida "
+                "da API para os modelos que cabem nos limites de -cache_modelos e -memoria_modelos (os demais no "
+                "primeiro carregamento). Parâmetro opcional.",
+        )
+        self.parametros.add_argument(
+            "-xla",
+            required=False,
+            action="store_true",
+            help="Compilar a inferência com o XLA, implica -compilar. Parâmetro opcional.",
+        )
+        self.parametros.add_argument(
+            "-intervalo_catalogo",
+            required=False,
+            type=float,
+            default=5,
+            help="Indicar o intervalo, em segundos, entre as verificações da pasta de modelos. Modelos novos são "
+                "validados e carregados em segundo plano, ficando no registro quando cabem nos limites de "
+                "-cache_modelos e -memoria_modelos, e os removidos deixam de ser usados. Parâmetro opcional, por "
+                "default 5 segundos e zero desativa a verificação.",
+        )
+        self.parametros.add_argument(
+            "-pesos_modelos",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar os pesos da escolha aleatória entre os modelos da pasta no formato "
+                "\"modelo.h5=3,outro.h5=1\". Parâmetro opcional, os modelos não indicados têm peso 1.",
+        )
+
+    def recuperar_parametros(self):
         return self.parametros.parse_args()
\ No newline at end of file
@@ -1,32 +1,75 @@
-import argparse
-
-class ParametrosDcganKeras3():
-    def __init__(self):
-        self.parametros = argparse.ArgumentParser(
-            prog="Gerador de Azulejos",
-            description = "Aplicação criada como parte do projeto de conclusão de curso do Mestrado em Media Digitais "
-                "Interativos",
-        )
-
-        # A chamada isolada do arquivo dcgan_keras3.py faz unica e exclusivamente o treinamento
-        self.parametros.add_argument(
-            "diretorio_dataset",
-            type=str,
-            help="Indicar o diretório das imagens já redimensionadas e tratadas para o dataset.",
-        )
-        self.parametros.add_argument(
-            "diretorio_resultado",
-            type=str,
-            help="Indicar o diretório onde serão salvas as imagens geradas pelas épocas e o log do treinamento.",
-        )
-        self.parametros.add_argument(
-            "-epocas",
-            required=False,
-            type=int,
-            default=100,
-            help="Indicar a quantidade de épocas de treinameto, parâmetro opcional e por default utliza 100 épocas.",
-        )
-
-
-    def recuperar_parametros(self):
+import argparse
+
+class ParametrosDcganKeras3():
+    def __init__(self):
+        self.parametros = argparse.ArgumentParser(
+            prog="Gerador de Azulejos",
+            description = "Aplicação criada como parte do projeto de conclusão de curso do Mestrado em Media Digitais "
+                "Interativos",
+        )
+
+        # A chamada isolada do arquivo dcgan_keras3.py faz unica e exclusivamente o treinamento
+        self.parametros.add_argument(
+            "diretorio_dataset",
+            type=str,
+            help="Indicar o diretório das imagens já redimensionadas e tratadas para o dataset.",
+        )
+        self.parametros.add_argument(
+            "diretorio_resultado",
+            type=str,
+            help="Indicar o diretório onde serão salvas as imagens geradas pelas épocas e o log do treinamento.",
+        )
+        self.parametros.add_argument(
+            "-epocas",
+            required=False,
+            type=int,
+            default=100,
+            help="Indicar a quantidade de épocas de treinameto, parâmetro opcional e por default utliza 100 épocas.",
+        )
+        self.parametros.add_argument(
+            "-aumento_d4",
+            required=False,
+            action="store_true",
+            help="Aplicar a cada imagem dos lotes uma simetria aleatória do quadrado (rotações, espelhamentos e "
+                "reflexões diagonais), para datasets preparados com -variantes base. Parâmetro opcional.",
+        )
+        self.parametros.add_argument(
+            "-semente",
+            required=False,
+            type=int,
+            default=None,
+            help="Indicar a semente dos pesos iniciais, do ruído, da ordem das imagens e do aumento, gravada junto "
+                "com os checkpoints. Com a semente as operações do TensorFlow ficam determinísticas (treinamento mais "
+                "lento) e o treinamento retomado chega ao mesmo resultado. Parâmetro opcional, por default sorteia "
+                "uma semente, sem operações determinísticas.",
+        )
+        self.parametros.add_argument(
+            "-retomar",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar o diretório de um treinamento anterior (resultado/<data e hora>) para continuar, no mesmo "
+                "diretório, a partir do último checkpoint, com a mesma semente e o mesmo aumento e com operações "
+                "determinísticas. As épocas indicam o total do treinamento e o diretório de resultado indicado não é "
+                "usado. Parâmetro opcional.",
+        )
+        self.parametros.add_argument(
+            "-intervalo_checkpoint",
+            required=False,
+            type=int,
+            default=1,
+            help="Indicar a cada quantas épocas é salvo um checkpoint do treinamento, a última época sempre é salva. "
+                "Parâmetro opcional e por default salva a cada época.",
+        )
+        self.parametros.add_argument(
+            "-checkpoints_mantidos",
+            required=False,
+            type=int,
+            default=3,
+            help="Indicar a quantidade de checkpoints mais recentes mantidos no diretório do treinamento, parâmetro "
+                "opcional e por default mantém 3.",
+        )
+
+
+    def recuperar_parametros(self):
         return self.parametros.parse_args()
\ No newline at end of file
@@ -1,95 +1,353 @@
-import argparse
-
-class ParametrosMain():
-    def __init__(self):
-        self.parametros = argparse.ArgumentParser(
-            prog="Gerador de Azulejos",
-            description = "Aplicação criada como parte do projeto de conclusão de curso do Mestrado em Media Digitais "
-                "Interativos",
-        )
-
-        acao = self.parametros.add_subparsers(
-            dest="acao",
-            help="Indica qual a ação a aplicação deve realizar: REDIMENSIONAR as imagens que compõe o dataset para o "
-                "treinamento; TREINAR o modelo propriamente dito e 'subir' uma API REST para usar o modelo treinado a "
-                "partir de requisição HTTP."
-        )
-        acao.required = True
-
-        # Tratamento para a função REDIMENSIONAR
-        redimensionar = acao.add_parser(
-            name="redimensionar",
-            help="Redimensiona um conjunto de imagens a partir de um diretório indicado. Cria imagens a partir da "
-                "rotação das imagens em diversos posicionamentos e o espelhamento das mesmas. Indicar também o "
-                "diretório de destino."
-        )
-        redimensionar.set_defaults(acao="redimensionar")
-        redimensionar.add_argument(
-            "diretorio_origem",
-            type=str,
-            help="Indicar o diretório das imagens que serão usadas para compor o dataset.",
-        )
-        redimensionar.add_argument(
-            "diretorio_destino",
-            type=str,
-            help="Indicar o diretório onde as novas imagens criadas para serem usadas pelo modelo serão salvas.",
-        )
-        redimensionar.add_argument(
-            "-tam",
-            required=False,
-            type=int,
-            default=128,
-            help="Indicar o tamanho da imagem, por padrão usa 128x128. As imagens são sempre quadradas. Parâmetro "
-                "opcional",
-
-        )
-
-        # Tratamento para a função TREINAR
-        treinar = acao.add_parser(
-            name="treinar",
-            help="Treina um modelo do tipo DCGAN a partir de um diretório de imagens, já redimensionadas."
-        )
-        treinar.set_defaults(acao="treinar")
-
-        treinar.add_argument(
-            "diretorio_dataset",
-            type=str,
-            help="Indicar o diretório das imagens já redimensionadas e tratadas para o dataset.",
-        )
-        treinar.add_argument(
-            "diretorio_resultado",
-            type=str,
-            help="Indicar o diretório onde serão salvas as imagens geradas pelas épocas e o log do treinamento.",
-        )
-        treinar.add_argument(
-            "-epocas",
-            required=False,
-            type=int,
-            default=100,
-            help="Indicar a quantidade de épocas de treinameto, parâmetro opcional e por default utliza 100 épocas.",
-        )
-
-        treinar.add_argument(
-            "-dcgan",
-            required=False,
-            type=str,
-            default='PADRAO',
-            help="Indicar a implementação utilizada, se PADRAO ou KERAS3",
-            choices=['PADRAO', 'KERAS3'],
-        )
-
-        # Tratamento para a função "levantar" API
-        api = acao.add_parser(
-            name="api",
-            help="'Levanta' API REST que usa modelo treinado para gerar uma imagem aleatória."
-        )
-        api.set_defaults(acao="api")
-        api.add_argument(
-            "caminho_arquivo_modelo",
-            type=str,
-            help="Indicar o caminho para o arquivo que contém o modelo da DCGAN/IA treinado.",
-        )
-
-
-    def recuperar_parametros(self):
+import argparse
+
+class ParametrosMain():
+    def __init__(self):
+        self.parametros = argparse.ArgumentParser(
+            prog="Gerador de Azulejos",
+            description = "Aplicação criada como parte do projeto de conclusão de curso do Mestrado em Media Digitais "
+                "Interativos",
+        )
+
+        acao = self.parametros.add_subparsers(
+            dest="acao",
+            help="Indica qual a ação a aplicação deve realizar: REDIMENSIONAR as imagens que compõe o dataset para o "
+                "treinamento; TREINAR o modelo propriamente dito; EXPORTAR um modelo treinado para o artefato de "
+                "serviço e 'subir' uma API REST para usar o modelo treinado a partir de requisição HTTP."
+        )
+        acao.required = True
+
+        # Tratamento para a função REDIMENSIONAR
+        redimensionar = acao.add_parser(
+            name="redimensionar",
+            help="Redimensiona um conjunto de imagens a partir de um diretório indicado. Cria imagens a partir da "
+                "rotação das imagens em diversos posicionamentos e o espelhamento das mesmas. Indicar também o "
+                "diretório de destino."
+        )
+        redimensionar.set_defaults(acao="redimensionar")
+        redimensionar.add_argument(
+            "diretorio_origem",
+            type=str,
+            help="Indicar o diretório das imagens que serão usadas para compor o dataset.",
+        )
+        redimensionar.add_argument(
+            "diretorio_destino",
+            type=str,
+            help="Indicar o diretório onde as novas imagens criadas para serem usadas pelo modelo serão salvas.",
+        )
+        redimensionar.add_argument(
+            "-tam",
+            required=False,
+            type=int,
+            nargs="+",
+            default=[128],
+            help="Indicar o tamanho da imagem, por padrão usa 128x128. As imagens são sempre quadradas. Com mais de um "
+                "tamanho (ex.: -tam 64 128 256) cada imagem é lida uma única vez e cada tamanho é gravado em um "
+                "subdiretório do destino com o nome do tamanho. Parâmetro opcional",
+
+        )
+        redimensionar.add_argument(
+            "-workers",
+            required=False,
+            type=int,
+            default=1,
+            help="Indicar a quantidade de processos usados para preparar as imagens em paralelo, zero usa um processo "
+                "por núcleo. Parâmetro opcional e por default usa 1 processo.",
+        )
+        redimensionar.add_argument(
+            "-formato",
+            required=False,
+            type=str,
+            choices=["arquivos", "empacotado"],
+            default="arquivos",
+            help="Indicar o formato de saída: um arquivo por imagem (arquivos) ou fragmentos .npy lidos com mmap pelos "
+                "treinamentos (empacotado). Parâmetro opcional e por default usa arquivos.",
+        )
+        redimensionar.add_argument(
+            "-variantes",
+            required=False,
+            type=str,
+            choices=["todas", "base"],
+            default="todas",
+            help="Indicar quais imagens gravar: a redimensionada com as rotações e espelhamentos (todas) ou apenas a "
+                "redimensionada (base), para treinar com -aumento_d4. Parâmetro opcional e por default usa todas.",
+        )
+        redimensionar.add_argument(
+            "-duplicatas",
+            required=False,
+            type=str,
+            choices=["ignorar", "relatar", "pular"],
+            default="ignorar",
+            help="Indicar o tratamento das imagens de origem quase idênticas, pelo hash perceptual guardado no "
+                "destino: não verificar (ignorar), listar (relatar) ou listar e deixar fora do dataset (pular). "
+                "Parâmetro opcional e por default ignora.",
+        )
+        redimensionar.add_argument(
+            "-distancia_duplicatas",
+            required=False,
+            type=int,
+            default=8,
+            help="Indicar a distância máxima, em bits dos 64 do hash perceptual, para duas imagens serem "
+                "consideradas duplicatas. Parâmetro opcional e por default usa 8 bits.",
+        )
+
+        # Tratamento para a função TREINAR
+        treinar = acao.add_parser(
+            name="treinar",
+            help="Treina um modelo do tipo DCGAN a partir de um diretório de imagens, já redimensionadas."
+        )
+        treinar.set_defaults(acao="treinar")
+
+        treinar.add_argument(
+            "diretorio_dataset",
+            type=str,
+            help="Indicar o diretório das imagens já redimensionadas e tratadas para o dataset.",
+        )
+        treinar.add_argument(
+            "diretorio_resultado",
+            type=str,
+            help="Indicar o diretório onde serão salvas as imagens geradas pelas épocas e o log do treinamento.",
+        )
+        treinar.add_argument(
+            "-epocas",
+            required=False,
+            type=int,
+            default=100,
+            help="Indicar a quantidade de épocas de treinameto, parâmetro opcional e por default utliza 100 épocas.",
+        )
+
+        treinar.add_argument(
+            "-dcgan",
+            required=False,
+            type=str,
+            default='PADRAO',
+            help="Indicar a implementação utilizada, se PADRAO ou KERAS3",
+            choices=['PADRAO', 'KERAS3'],
+        )
+        treinar.add_argument(
+            "-aumento_d4",
+            required=False,
+            action="store_true",
+            help="Aplicar a cada imagem dos lotes uma simetria aleatória do quadrado (rotações, espelhamentos e "
+                "reflexões diagonais), para datasets preparados com -variantes base. Parâmetro opcional.",
+        )
+        treinar.add_argument(
+            "-cache_dataset",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar onde guardar as imagens decodificadas do dataset de arquivos a partir da segunda época: "
+                "\"memoria\" ou o caminho de um arquivo de cache. Usado apenas pela implementação PADRAO. Parâmetro "
+                "opcional, por default as imagens são lidas dos arquivos a cada época.",
+        )
+        treinar.add_argument(
+            "-semente",
+            required=False,
+            type=int,
+            default=None,
+            help="Indicar a semente dos pesos iniciais, do ruído, da ordem das imagens e do aumento, gravada junto "
+                "com os checkpoints. Com a semente as operações do TensorFlow ficam determinísticas (treinamento mais "
+                "lento) e o treinamento retomado chega ao mesmo resultado. Parâmetro opcional, por default sorteia "
+                "uma semente, sem operações determinísticas.",
+        )
+        treinar.add_argument(
+            "-retomar",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar o diretório de um treinamento anterior (resultado/<data e hora>) para continuar, no mesmo "
+                "diretório, a partir do último checkpoint, com a mesma semente e o mesmo aumento e com operações "
+                "determinísticas. As épocas indicam o total do treinamento e o diretório de resultado indicado não é "
+                "usado. Parâmetro opcional.",
+        )
+        treinar.add_argument(
+            "-intervalo_checkpoint",
+            required=False,
+            type=int,
+            default=1,
+            help="Indicar a cada quantas épocas é salvo um checkpoint do treinamento, a última época sempre é salva. "
+                "Parâmetro opcional e por default salva a cada época.",
+        )
+        treinar.add_argument(
+            "-checkpoints_mantidos",
+            required=False,
+            type=int,
+            default=3,
+            help="Indicar a quantidade de checkpoints mais recentes mantidos no diretório do treinamento, parâmetro "
+                "opcional e por default mantém 3.",
+        )
+
+        # Tratamento para a função EXPORTAR
+        exportar = acao.add_parser(
+            name="exportar",
+            help="Exporta um gerador treinado (.h5) para o artefato de serviço (SavedModel) usado pela API, que "
+                "dispensa o desserializador do Keras e sobe mais rápido."
+        )
+        exportar.set_defaults(acao="exportar")
+        exportar.add_argument(
+            "caminho_arquivo_modelo",
+            type=str,
+            help="Indicar o caminho para o arquivo .h5 que contém o gerador treinado.",
+        )
+        exportar.add_argument(
+            "-destino",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar o diretório do artefato de serviço. Parâmetro opcional, por default cria o diretório ao "
+                "lado do arquivo do modelo com o sufixo _servico.",
+        )
+
+        # Tratamento para a função "levantar" API
+        api = acao.add_parser(
+            name="api",
+            help="'Levanta' API REST que usa modelo treinado para gerar uma imagem aleatória."
+        )
+        api.set_defaults(acao="api")
+        api.add_argument(
+            "caminho_arquivo_modelo",
+            type=str,
+            help="Indicar o caminho para o arquivo que contém o modelo da DCGAN/IA treinado.",
+        )
+
+        api.add_argument(
+            "-cache_modelos",
+            required=False,
+            type=int,
+            default=4,
+            help="Indicar a quantidade máxima de modelos mantidos em memória pela API, parâmetro opcional e por "
+                "default mantém 4 modelos. Quando o limite é atingido o modelo usado há mais tempo é descartado.",
+        )
+        api.add_argument(
+            "-memoria_modelos",
+            required=False,
+            type=float,
+            default=None,
+            help="Indicar o orçamento de memória, em MB, para os pesos dos modelos mantidos em memória pela API. "
+                "Parâmetro opcional, por default não há limite além da quantidade de modelos.",
+        )
+        api.add_argument(
+            "-maximo_lote",
+            required=False,
+            type=int,
+            default=64,
+            help="Indicar a quantidade máxima de imagens que podem ser geradas em uma única requisição ao /lote, "
+                "parâmetro opcional e por default permite 64 imagens.",
+        )
+        api.add_argument(
+            "-janela_agendador",
+            required=False,
+            type=float,
+            default=0,
+            help="Indicar a janela, em milissegundos, em que requisições concorrentes para o mesmo modelo são "
+                "agrupadas em uma única inferência (ex.: 5). Parâmetro opcional, por default 0 desativa o agendador.",
+        )
+        api.add_argument(
+            "-maximo_lote_agendador",
+            required=False,
+            type=int,
+            default=32,
+            help="Indicar a quantidade máxima de imagens em um lote montado pelo agendador, parâmetro opcional e por "
+                "default usa 32 imagens.",
+        )
+        api.add_argument(
+            "-pool",
+            required=False,
+            type=int,
+            default=0,
+            help="Indicar a quantidade de azulejos pré-gerados mantidos em memória para cada modelo. A reserva é "
+                "reposta em segundo plano quando fica abaixo da metade. Parâmetro opcional, por default 0 desativa a "
+                "reserva.",
+        )
+        api.add_argument(
+            "-lote_pool",
+            required=False,
+            type=int,
+            default=64,
+            help="Indicar a quantidade de azulejos gerados em cada lote de reposição da reserva, parâmetro opcional e "
+                "por default usa 64 azulejos.",
+        )
+        api.add_argument(
+            "-pool_vazio",
+            required=False,
+            type=str,
+            default='gerar',
+            help="Indicar o comportamento quando a reserva estiver vazia: GERAR o azulejo na própria requisição ou "
+                "AGUARDAR a reposição. Parâmetro opcional, por default gera na requisição.",
+            choices=['gerar', 'aguardar'],
+        )
+        api.add_argument(
+            "-cache_respostas",
+            required=False,
+            type=float,
+            default=64,
+            help="Indicar o limite, em MB, do cache em memória das imagens geradas com semente (parâmetro seed), "
+                "parâmetro opcional e por default usa 64 MB.",
+        )
+        api.add_argument(
+            "-diretorio_cache",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar um diretório para guardar em disco o cache das imagens geradas com semente. Parâmetro "
+                "opcional, por default o cache fica apenas em memória.",
+        )
+        api.add_argument(
+            "-maximo_painel",
+            required=False,
+            type=int,
+            default=100,
+            help="Indicar a quantidade máxima de linhas e de colunas de azulejos de um painel gerado pelo /painel, "
+                "parâmetro opcional e por default permite 100.",
+        )
+        api.add_argument(
+            "-threads_codificacao",
+            required=False,
+            type=int,
+            default=4,
+            help="Indicar a quantidade de threads usadas para redimensionar e codificar as imagens fora da thread da "
+                "requisição, parâmetro opcional e por default usa 4 threads.",
+        )
+        api.add_argument(
+            "-maximo_quadros",
+            required=False,
+            type=int,
+            default=120,
+            help="Indicar a quantidade máxima de quadros de uma animação gerada pelo /animacao, parâmetro opcional e "
+                "por default permite 120 quadros.",
+        )
+        api.add_argument(
+            "-compilar",
+            required=False,
+            action="store_true",
+            help="Executar a inferência em uma tf.function com assinatura fixa e lotes em buckets, aquecida na subida "
+                "da API para os modelos que cabem nos limites de -cache_modelos e -memoria_modelos (os demais no "
+                "primeiro carregamento). Parâmetro opcional.",
+        )
+        api.add_argument(
+            "-xla",
+            required=False,
+            action="store_true",
+            help="Compilar a inferência com o XLA, implica -compilar. Parâmetro opcional.",
+        )
+        api.add_argument(
+            "-intervalo_catalogo",
+            required=False,
+            type=float,
+            default=5,
+            help="Indicar o intervalo, em segundos, entre as verificações da pasta de modelos. Modelos novos são "
+                "validados e carregados em segundo plano, ficando no registro quando cabem nos limites de "
+                "-cache_modelos e -memoria_modelos, e os removidos deixam de ser usados. Parâmetro opcional, por "
+                "default 5 segundos e zero desativa a verificação.",
+        )
+        api.add_argument(
+            "-pesos_modelos",
+            required=False,
+            type=str,
+            default=None,
+            help="Indicar os pesos da escolha aleatória entre os modelos da pasta no formato "
+                "\"modelo.h5=3,outro.h5=1\". Parâmetro opcional, os modelos não indicados têm peso 1.",
+        )
+
+
+    def recuperar_parametros(self):
         return self.parametros.parse_args()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import tensorflow as tf
+
+
+# Semente dos sorteios stateless de uma época, [semente, época]. A época pode ser um tf.Variable atualizado pelo laço de
+# treinamento antes de cada época, lido pelo tf.data quando a iteração começa. Sem época todas as épocas usam a mesma.
+def montar_semente_epoca(semente: int, epoca=None):
+    epoca = tf.constant(0, tf.int64) if epoca is None else tf.cast(tf.convert_to_tensor(epoca), tf.int64)
+
+    return tf.stack([tf.constant(semente, tf.int64), epoca])
+
+
+# Dataset com os índices de 0 a quantidade - 1 em uma ordem embaralhada que depende apenas da semente e da época
+# (tf.random.experimental.index_shuffle). Diferente do Dataset.shuffle, a ordem de uma época não depende das épocas
+# anteriores, então um treinamento retomado do checkpoint de uma época lê as imagens na mesma ordem do treinamento
+# sem interrupção. Também dispensa o buffer de embaralhamento.
+def embaralhar_indices(quantidade: int, semente: int, epoca=None):
+    def permutar(indice):
+        return tf.random.experimental.index_shuffle(indice, montar_semente_epoca(semente, epoca), quantidade - 1)
+
+    return tf.data.Dataset.range(quantidade).map(permutar, num_parallel_calls=tf.data.AUTOTUNE)
+
+
+# Aplica a cada imagem de um lote [lote, altura, largura, canais] um elemento aleatório do grupo diedral D4, as 8
+# simetrias do quadrado: identidade, rotações de 90, 180 e 270 graus, espelhamentos horizontal e vertical e as duas
+# reflexões nas diagonais. Cada simetria é a composição de três escolhas independentes, com probabilidade 1/2 cada
+# (transpor, espelhar na horizontal e espelhar na vertical), então os 8 elementos são igualmente prováveis. As imagens
+# precisam ser quadradas, como os azulejos. Tudo acontece no grafo, sobre o lote inteiro, sem laço por imagem.
+#
+# Com semente (tensor [2], ver montar_semente_epoca) os sorteios são stateless e se repetem para a mesma semente.
+def aplicar_simetria_d4(imagens, semente=None):
+    quantidade = tf.shape(imagens)[0]
+
+    def sortear(escolha):
+        if semente is None:
+            return tf.random.uniform([quantidade, 1, 1, 1]) < 0.5
+
+        semente_escolha = tf.random.experimental.stateless_fold_in(semente, escolha)
+
+        return tf.random.stateless_uniform([quantidade, 1, 1, 1], seed=semente_escolha) < 0.5
+
+    imagens = tf.where(sortear(0), tf.transpose(imagens, [0, 2, 1, 3]), imagens)
+    imagens = tf.where(sortear(1), tf.reverse(imagens, axis=[2]), imagens)
+
+    return tf.where(sortear(2), tf.reverse(imagens, axis=[1]), imagens)
+
+
+# Acrescenta a simetria aleatória a um dataset de lotes. Substitui as rotações e espelhamentos gravados em disco pela
+# preparação das imagens (redimensionar -variantes base), com as duas reflexões diagonais que a preparação não grava.
+# Com semente a simetria de cada lote depende apenas da semente, da época e da posição do lote na época.
+def aumentar_dataset(dataset, semente: int = None, epoca=None):
+    if semente is None:
+        return dataset.map(aplicar_simetria_d4, num_parallel_calls=tf.data.AUTOTUNE)
+
+    def aplicar_simetria_lote(indice_lote, imagens):
+        semente_lote = tf.random.experimental.stateless_fold_in(montar_semente_epoca(semente, epoca), indice_lote)
+
+        return aplicar_simetria_d4(imagens, semente_lote)
+
+    return dataset.enumerate().map(aplicar_simetria_lote, num_parallel_calls=tf.data.AUTOTUNE)
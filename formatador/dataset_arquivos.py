@@ -0,0 +1,97 @@
+import os
+
+import tensorflow as tf
+
+from formatador.aumento_dados import aumentar_dataset, embaralhar_indices
+
+# Formatos decodificados pelo tf.io.decode_image. Os demais arquivos do diretório (manifesto, índice de duplicatas,
+# anotações) ficam fora do dataset.
+extensoes_imagem = ('.jpg', '.jpeg', '.png', '.bmp', '.gif')
+
+
+def listar_imagens(diretorio: str):
+    return sorted(
+        os.path.join(diretorio, arquivo)
+        for arquivo in os.listdir(diretorio)
+        if not arquivo.startswith('.') and os.path.splitext(arquivo)[1].lower() in extensoes_imagem
+    )
+
+
+# Dataset do TensorFlow lido direto dos arquivos de imagem do diretório, sem montar o dataset em memória. Apenas os
+# caminhos são embaralhados (todos, a cada época); as imagens são lidas e decodificadas em paralelo e guardadas em
+# uint8, na ordem de canais do OpenCV (BGR) por padrão, como as imagens lidas com cv2.imread. A conversão para float,
+# a normalização (tanh para [-1, 1] ou sigmoid para [0, 1]) e, com aumento_d4, a simetria aleatória são feitas por lote.
+# Imagens com outro tamanho são redimensionadas (area) na leitura.
+#
+# O cache ("memoria" ou o caminho de um arquivo) guarda as imagens decodificadas, em uint8, a partir da segunda época.
+# Como as imagens saem do cache sempre na mesma ordem, elas são embaralhadas depois dele em um buffer limitado a
+# tamanho_buffer imagens. Sem cache a memória usada não depende da quantidade de imagens do dataset.
+#
+# Com semente a ordem das imagens e a simetria do aumento_d4 dependem apenas da semente e da época (tf.Variable
+# atualizado pelo treinamento antes de cada época, ver formatador/aumento_dados.py), o que permite retomar um
+# treinamento de um checkpoint com o mesmo resultado. Com cache a ordem depois da primeira época vem do buffer de
+# embaralhamento e não se repete ao retomar.
+def criar_dataset_arquivos_tf(diretorio: str, tamanho_lote: int, faixa_saida: str = 'tanh', ordem_canais: str = 'BGR',
+                              tamanho_imagem: int = 128, embaralhar: bool = True, cache: str = None,
+                              tamanho_buffer: int = 1024, aumento_d4: bool = False, semente: int = None, epoca=None):
+    caminhos = listar_imagens(diretorio)
+    ordem_reprodutivel = embaralhar and semente is not None and cache is None
+
+    def ler_imagem(caminho):
+        conteudo = tf.io.read_file(caminho)
+        # O JPEG é decodificado com a DCT exata, que dá os mesmos valores do cv2.imread usado na preparação
+        imagem = tf.cond(
+            tf.io.is_jpeg(conteudo),
+            lambda: tf.io.decode_jpeg(conteudo, channels=3, dct_method='INTEGER_ACCURATE'),
+            lambda: tf.io.decode_image(conteudo, channels=3, expand_animations=False),
+        )
+
+        if ordem_canais == 'BGR':
+            imagem = tf.reverse(imagem, axis=[-1])
+
+        imagem = tf.cond(
+            tf.reduce_all(tf.shape(imagem)[:2] == tamanho_imagem),
+            lambda: imagem,
+            lambda: tf.cast(
+                tf.round(tf.image.resize(imagem, [tamanho_imagem, tamanho_imagem], method='area')), tf.uint8
+            ),
+        )
+        imagem.set_shape([tamanho_imagem, tamanho_imagem, 3])
+
+        return imagem
+
+    def normalizar(imagens):
+        imagens = tf.cast(imagens, tf.float32)
+
+        if faixa_saida == 'tanh':
+            return (imagens - 127.5) / 127.5
+
+        return imagens / 255.0
+
+    if ordem_reprodutivel:
+        tensor_caminhos = tf.constant(caminhos)
+        dataset = embaralhar_indices(len(caminhos), semente, epoca).map(
+            lambda indice: tf.gather(tensor_caminhos, indice)
+        )
+    else:
+        dataset = tf.data.Dataset.from_tensor_slices(caminhos)
+
+        if embaralhar and cache is None:
+            dataset = dataset.shuffle(len(caminhos), reshuffle_each_iteration=True)
+
+    dataset = dataset.map(
+        ler_imagem, num_parallel_calls=tf.data.AUTOTUNE, deterministic=ordem_reprodutivel or not embaralhar
+    )
+
+    if cache is not None:
+        dataset = dataset.cache('' if cache == 'memoria' else cache)
+
+        if embaralhar:
+            dataset = dataset.shuffle(min(tamanho_buffer, len(caminhos)), seed=semente, reshuffle_each_iteration=True)
+
+    dataset = dataset.batch(tamanho_lote).map(normalizar, num_parallel_calls=tf.data.AUTOTUNE)
+
+    if aumento_d4:
+        dataset = aumentar_dataset(dataset, semente, epoca)
+
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,167 @@
+import json
+import os
+
+import numpy as np
+
+# Arquivo com a descrição do dataset empacotado: formato das imagens, quantidade total e os fragmentos (shards)
+nome_arquivo_indice = 'dataset.json'
+versao_dataset = 1
+
+
+def eh_dataset_empacotado(diretorio: str):
+    return diretorio is not None and os.path.isfile(os.path.join(diretorio, nome_arquivo_indice))
+
+
+# Grava as imagens preparadas (uint8, altura x largura x 3, na ordem de canais do OpenCV, BGR) em fragmentos .npy, cada
+# um com até imagens_por_fragmento imagens, em vez de um arquivo de imagem por transformação. O cabeçalho do .npy traz o
+# formato de cada fragmento e o índice (dataset.json) traz o formato das imagens e as quantidades, assim a leitura é
+# apenas um np.load com mmap, sem decodificar nenhuma imagem.
+class EscritorDatasetEmpacotado:
+    def __init__(self, diretorio: str, tamanho_imagem: int, imagens_por_fragmento: int = 2048,
+                 variantes: str = 'todas'):
+        self.diretorio = diretorio
+        self.variantes = variantes
+        self.formato_imagem = (tamanho_imagem, tamanho_imagem, 3)
+        self.imagens_por_fragmento = imagens_por_fragmento
+        self.buffer = np.empty((imagens_por_fragmento, *self.formato_imagem), dtype=np.uint8)
+        self.quantidade_buffer = 0
+        self.fragmentos = []
+        self.quantidade = 0
+
+        os.makedirs(diretorio, exist_ok=True)
+
+        # Fragmentos de uma gravação anterior seriam misturados aos novos
+        for nome_arquivo in os.listdir(diretorio):
+            if nome_arquivo.startswith('fragmento_') and nome_arquivo.endswith('.npy'):
+                os.remove(os.path.join(diretorio, nome_arquivo))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo_erro, erro, rastreamento):
+        if tipo_erro is None:
+            self.finalizar()
+
+    def adicionar(self, imagens):
+        for imagem in imagens:
+            self.buffer[self.quantidade_buffer] = imagem
+            self.quantidade_buffer += 1
+
+            if self.quantidade_buffer == self.imagens_por_fragmento:
+                self.__gravar_fragmento()
+
+    def __gravar_fragmento(self):
+        if self.quantidade_buffer == 0:
+            return
+
+        nome_arquivo = f'fragmento_{len(self.fragmentos):05d}.npy'
+        np.save(os.path.join(self.diretorio, nome_arquivo), self.buffer[:self.quantidade_buffer])
+        self.fragmentos.append({'arquivo': nome_arquivo, 'quantidade': self.quantidade_buffer})
+        self.quantidade += self.quantidade_buffer
+        self.quantidade_buffer = 0
+
+    # O índice é gravado por último, um dataset sem índice não é reconhecido como empacotado
+    def finalizar(self):
+        self.__gravar_fragmento()
+        caminho_indice = os.path.join(self.diretorio, nome_arquivo_indice)
+
+        with open(caminho_indice + '.tmp', 'w') as arquivo:
+            json.dump(
+                {
+                    'versao': versao_dataset,
+                    'tipo': 'uint8',
+                    'ordem_canais': 'BGR',
+                    'formato_imagem': list(self.formato_imagem),
+                    'variantes': self.variantes,
+                    'quantidade': self.quantidade,
+                    'fragmentos': self.fragmentos,
+                },
+                arquivo,
+                indent=1,
+            )
+
+        os.replace(caminho_indice + '.tmp', caminho_indice)
+
+
+# Abre os fragmentos com mmap (somente leitura): nenhuma imagem é copiada para a memória na abertura, as páginas são
+# lidas do disco (ou do cache do sistema) conforme os lotes são montados.
+class DatasetEmpacotado:
+    def __init__(self, diretorio: str):
+        with open(os.path.join(diretorio, nome_arquivo_indice)) as arquivo:
+            self.indice = json.load(arquivo)
+
+        if self.indice.get('versao') != versao_dataset:
+            raise ValueError(f'Versão do dataset empacotado não suportada: {self.indice.get("versao")}')
+
+        self.formato_imagem = tuple(self.indice['formato_imagem'])
+        self.fragmentos = [
+            np.load(os.path.join(diretorio, fragmento['arquivo']), mmap_mode='r')
+            for fragmento in self.indice['fragmentos']
+        ]
+        # Posição da primeira imagem de cada fragmento no dataset
+        self.inicios = np.cumsum([0] + [len(fragmento) for fragmento in self.fragmentos])
+
+    def __len__(self):
+        return int(self.inicios[-1])
+
+    # Imagens das posições indicadas, em qualquer ordem e de qualquer fragmento
+    def recuperar_imagens(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        imagens = np.empty((len(indices), *self.formato_imagem), dtype=np.uint8)
+        posicoes_fragmento = np.searchsorted(self.inicios, indices, side='right') - 1
+
+        for posicao_fragmento in np.unique(posicoes_fragmento):
+            selecao = posicoes_fragmento == posicao_fragmento
+            imagens[selecao] = self.fragmentos[posicao_fragmento][indices[selecao] - self.inicios[posicao_fragmento]]
+
+        return imagens
+
+    # Dataset do TensorFlow que embaralha apenas os índices e lê cada lote direto dos fragmentos. A normalização (tanh
+    # para [-1, 1] ou sigmoid para [0, 1]), a troca de BGR para RGB, o redimensionamento e, com aumento_d4, a simetria
+    # aleatória de cada imagem acontecem no grafo. Com semente a ordem dos índices e a simetria dependem apenas da
+    # semente e da época (ver formatador/aumento_dados.py), para que um treinamento retomado leia os mesmos lotes.
+    def criar_dataset_tf(self, tamanho_lote: int, faixa_saida: str = 'tanh', ordem_canais: str = 'BGR',
+                         tamanho_imagem: int = None, embaralhar: bool = True, aumento_d4: bool = False,
+                         semente: int = None, epoca=None):
+        import tensorflow as tf
+
+        from formatador.aumento_dados import aumentar_dataset, embaralhar_indices
+
+        def ler_lote(indices):
+            imagens = tf.numpy_function(self.recuperar_imagens, [indices], tf.uint8)
+            imagens.set_shape([None, *self.formato_imagem])
+
+            return imagens
+
+        def normalizar(imagens):
+            if ordem_canais != self.indice['ordem_canais']:
+                imagens = tf.reverse(imagens, axis=[-1])
+
+            imagens = tf.cast(imagens, tf.float32)
+
+            if tamanho_imagem is not None and tamanho_imagem != self.formato_imagem[0]:
+                imagens = tf.image.resize(imagens, [tamanho_imagem, tamanho_imagem], method='area')
+
+            if faixa_saida == 'tanh':
+                return (imagens - 127.5) / 127.5
+
+            return imagens / 255.0
+
+        if embaralhar and semente is not None:
+            dataset = embaralhar_indices(len(self), semente, epoca)
+        else:
+            dataset = tf.data.Dataset.range(len(self))
+
+            if embaralhar:
+                dataset = dataset.shuffle(len(self), reshuffle_each_iteration=True)
+
+        dataset = (
+            dataset.batch(tamanho_lote)
+            .map(ler_lote, num_parallel_calls=tf.data.AUTOTUNE)
+            .map(normalizar, num_parallel_calls=tf.data.AUTOTUNE)
+        )
+
+        if aumento_d4:
+            dataset = aumentar_dataset(dataset, semente, epoca)
+
+        return dataset.prefetch(tf.data.AUTOTUNE)
@@ -1,129 +1,316 @@
-import os
-
-import cv2
-
-
-# Recebe o caminho de uma imagem para formatá-la conforme o esperado pela rede neural. Guarda em memória a imagem origi-
-# nal e também as várias transformações feitas na imagem. O construtor já converte a imagem automaticamente, então não
-# há a necesidade de chamar os métodos. Contudo, é possível utilizar os métodos com novas dimensões que não aquelas que
-# representam as propriedades do objeto.
-class FormatadorImagem:
-    def __init__(self, caminho_imagem: str, nova_altura: int = 128, nova_largura: int = 128):
-        self.imagem_original = cv2.imread(caminho_imagem)
-        self.nome_imagem = os.path.basename(caminho_imagem)
-        self.altura_original = self.imagem_original.shape[0]
-        self.largura_original = self.imagem_original.shape[1]
-        self.nova_altura = nova_altura
-        self.nova_largura = nova_largura
-        self.imagem_redimensionada = self.redimensionar()
-        self.imagem_rotacionada_90 = self.rotacionar_90()
-        self.imagem_rotacionada_180 = self.rotacionar_180()
-        self.imagem_rotacionada_270 = self.rotacionar_270()
-        self.imagem_espelhada_horizontal = self.espelhar_horizontal()
-        self.imagem_espelhada_vertical = self.espelhar_vertical()
-
-    # Ao utilizar a função print() para o objeto, imprime os dados e shapes das imagens que compões aquele objeto.
-    def __str__(self):
-        return (
-            "Nome: {0}\n"
-            "Altura original: {1}\n"
-            "Largura original: {2}\n"
-            "Nova altura: {3}\n"
-            "Nova largura: {4}\n"
-            "--- Formatos (altura, largura, canais):\n"
-            "Formato redimensionada: {5}\n"
-            "Formato rotacionada 90: {6}\n"
-            "Formato rotacionada 180: {7}\n"
-            "Formato rotacionada 270: {8}\n"
-            "Formato espelhada vertical: {9}\n"
-            "Formato espelhada horizontal: {10}\n"
-            .format(
-                self.nome_imagem,
-                self.altura_original,
-                self.largura_original,
-                self.nova_altura,
-                self.nova_largura,
-                self.imagem_redimensionada.shape,
-                self.imagem_rotacionada_90.shape,
-                self.imagem_rotacionada_180.shape,
-                self.imagem_rotacionada_270.shape,
-                self.imagem_espelhada_vertical.shape,
-                self.imagem_espelhada_horizontal.shape,
-            )
-        )
-
-    def redimensionar(self, imagem: cv2=None,  nova_altura: int=None, nova_largura: int=None):
-        if imagem is None:
-            imagem = self.imagem_original
-
-        if nova_altura is None:
-            nova_altura = self.nova_altura
-
-        if nova_largura is None:
-            nova_largura = self.nova_largura
-
-        return cv2.resize(imagem, (nova_largura, nova_altura), interpolation=cv2.INTER_AREA)
-
-    def rotacionar_90(self, imagem: cv2=None):
-        if imagem is None:
-            imagem = self.imagem_redimensionada
-
-        return cv2.rotate(imagem, cv2.ROTATE_90_CLOCKWISE)
-
-    def rotacionar_180(self, imagem: cv2 = None):
-        if imagem is None:
-            imagem = self.imagem_redimensionada
-
-        return cv2.rotate(imagem, cv2.ROTATE_180)
-
-    def rotacionar_270(self, imagem: cv2 = None):
-        if imagem is None:
-            imagem = self.imagem_redimensionada
-
-        return cv2.rotate(imagem, cv2.ROTATE_90_COUNTERCLOCKWISE)
-
-    def espelhar_horizontal(self, imagem: cv2 = None):
-        if imagem is None:
-            imagem = self.imagem_redimensionada
-
-        return cv2.flip(imagem, flipCode=1)
-
-    def espelhar_vertical(self, imagem: cv2 = None):
-        if imagem is None:
-            imagem = self.imagem_redimensionada
-
-        return cv2.flip(imagem, flipCode=0)
-
-    # Salva as imagens que fazem parte do objeto. Criadas no construtor no momento de instanciar a classe
-    def salvar(self, diretorio: str):
-        nome_arquivo, extensao = os.path.splitext(self.nome_imagem)
-
-        caminho_nova_imagem = os.path.join(
-            diretorio, nome_arquivo + '_{0}x{1}'.format(self.nova_altura, self.nova_largura) + extensao
-        )
-        cv2.imwrite(caminho_nova_imagem, self.imagem_redimensionada)
-
-        caminho_nova_imagem = os.path.join(
-            diretorio, nome_arquivo + '_{0}x{1}_90'.format(self.nova_altura, self.nova_largura) + extensao
-        )
-        cv2.imwrite(caminho_nova_imagem, self.imagem_rotacionada_90)
-
-        caminho_nova_imagem = os.path.join(
-            diretorio, nome_arquivo + '_{0}x{1}_180'.format(self.nova_altura, self.nova_largura) + extensao
-        )
-        cv2.imwrite(caminho_nova_imagem, self.imagem_rotacionada_180)
-
-        caminho_nova_imagem = os.path.join(
-            diretorio, nome_arquivo + '_{0}x{1}_270'.format(self.nova_altura, self.nova_largura) + extensao
-        )
-        cv2.imwrite(caminho_nova_imagem, self.imagem_rotacionada_270)
-
-        caminho_nova_imagem = os.path.join(
-            diretorio, nome_arquivo + '_{0}x{1}_hor'.format(self.nova_altura, self.nova_largura) + extensao
-        )
-        cv2.imwrite(caminho_nova_imagem, self.imagem_espelhada_horizontal)
-
-        caminho_nova_imagem = os.path.join(
-            diretorio, nome_arquivo + '_{0}x{1}_ver'.format(self.nova_altura, self.nova_largura) + extensao
-        )
-        cv2.imwrite(caminho_nova_imagem, self.imagem_espelhada_vertical)
\ No newline at end of file
+import os
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from formatador.manifesto_preparacao import calcular_hash_arquivo, montar_registro_origem
+
+# Fatores de redução da decodificação de JPEG do OpenCV (escala DCT do libjpeg), do maior para o menor
+leituras_reduzidas = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+
+# Lê a imagem para ser redimensionada para lado_minimo píxeis. Um JPEG grande é decodificado já reduzido (1/2, 1/4 ou
+# 1/8), no maior fator que ainda deixa o menor lado da imagem com pelo menos lado_minimo píxeis, sem decodificar a
+# resolução completa apenas para reduzi-la depois. As dimensões vêm do cabeçalho, lido pelo Pillow sem decodificar a
+# imagem. Os demais formatos, ou sem lado_minimo, são lidos por inteiro. Retorna a imagem e a altura e a largura
+# originais, na orientação da imagem lida (o OpenCV aplica a orientação do EXIF).
+def ler_imagem(caminho_imagem: str, lado_minimo: int = None):
+    fator, leitura = 1, cv2.IMREAD_COLOR
+
+    try:
+        with Image.open(caminho_imagem) as imagem_cabecalho:
+            formato = imagem_cabecalho.format
+            largura_original, altura_original = imagem_cabecalho.size
+    except OSError: # O Pillow não reconhece o arquivo, o OpenCV ainda pode conseguir lê-lo
+        formato = None
+
+    if formato == 'JPEG' and lado_minimo:
+        for fator_reducao, leitura_reduzida in leituras_reduzidas:
+            if min(altura_original, largura_original) // fator_reducao >= lado_minimo:
+                fator, leitura = fator_reducao, leitura_reduzida
+                break
+
+    imagem = cv2.imread(caminho_imagem, leitura)
+
+    if imagem is None:
+        return None, None, None
+
+    if fator == 1:
+        return imagem, imagem.shape[0], imagem.shape[1]
+
+    # Imagem girada pela orientação do EXIF
+    if (imagem.shape[0] > imagem.shape[1]) != (altura_original > largura_original):
+        altura_original, largura_original = largura_original, altura_original
+
+    return imagem, altura_original, largura_original
+
+
+# Recebe o caminho de uma imagem para formatá-la conforme o esperado pela rede neural. O construtor já redimensiona a
+# imagem, então não há a necesidade de chamar os métodos. Contudo, é possível utilizar os métodos com novas dimensões
+# que não aquelas que representam as propriedades do objeto.
+#
+# No modo padrão a imagem original e todas as transformações são calculadas no construtor e ficam em memória. No modo
+# preguiçoso a imagem original é descartada logo após o redimensionamento (e lida novamente do disco apenas se for
+# acessada) e cada transformação é calculada no primeiro acesso ao seu atributo, ou uma de cada vez, sem ficar guardada,
+# por gerar_variantes. Assim o pico de memória de cada processo da preparação é pequeno e constante, independente da
+# resolução da imagem original.
+#
+# A imagem já lida pode ser passada no parâmetro imagem, no lugar da leitura do arquivo, como faz gerar_piramide. Com
+# leitura_reduzida um JPEG grande é decodificado já reduzido para perto do tamanho pedido (ver ler_imagem), o
+# redimensionamento final continua com INTER_AREA.
+class FormatadorImagem:
+    __slots__ = (
+        'caminho_imagem',
+        'nome_imagem',
+        'altura_original',
+        'largura_original',
+        'nova_altura',
+        'nova_largura',
+        'preguicoso',
+        '_imagem_original',
+        '_imagem_redimensionada',
+        '_variantes',
+    )
+
+    # Sufixo do arquivo gravado e método de cada transformação, na ordem dos arquivos gravados por salvar
+    variantes = (
+        ('', None),
+        ('_90', 'rotacionar_90'),
+        ('_180', 'rotacionar_180'),
+        ('_270', 'rotacionar_270'),
+        ('_hor', 'espelhar_horizontal'),
+        ('_ver', 'espelhar_vertical'),
+    )
+
+    def __init__(self, caminho_imagem: str, nova_altura: int = 128, nova_largura: int = 128, preguicoso: bool = False,
+                 imagem=None, leitura_reduzida: bool = True):
+        if imagem is None:
+            imagem, altura_original, largura_original = ler_imagem(
+                caminho_imagem, max(nova_altura, nova_largura) if leitura_reduzida else None
+            )
+        else:
+            altura_original, largura_original = imagem.shape[:2]
+
+        self.caminho_imagem = caminho_imagem
+        self.nome_imagem = os.path.basename(caminho_imagem)
+        self.altura_original = altura_original
+        self.largura_original = largura_original
+        self.nova_altura = nova_altura
+        self.nova_largura = nova_largura
+        self.preguicoso = preguicoso
+        self._variantes = {}
+        self._imagem_redimensionada = self.redimensionar(imagem)
+
+        if preguicoso:
+            self._imagem_original = None
+        else:
+            self._imagem_original = imagem
+
+            for _, nome_metodo in self.variantes[1:]:
+                self._variantes[nome_metodo] = getattr(self, nome_metodo)()
+
+    # Gera (tamanho, formatador preguiçoso) para cada tamanho, do maior para o menor, a partir de uma única leitura da
+    # imagem (reduzida para o maior tamanho, ver ler_imagem): o maior tamanho é redimensionado da imagem lida e cada
+    # tamanho seguinte do anterior, sempre com INTER_AREA. A imagem lida é liberada assim que o maior tamanho é criado.
+    @classmethod
+    def gerar_piramide(cls, caminho_imagem: str, tamanhos, leitura_reduzida: bool = True):
+        tamanhos = sorted(set(tamanhos), reverse=True)
+        imagem, altura_original, largura_original = ler_imagem(
+            caminho_imagem, tamanhos[0] if leitura_reduzida else None
+        )
+
+        for tamanho in tamanhos:
+            formatador_imagem = cls(caminho_imagem, tamanho, tamanho, preguicoso=True, imagem=imagem)
+            formatador_imagem.altura_original = altura_original
+            formatador_imagem.largura_original = largura_original
+            imagem = formatador_imagem.imagem_redimensionada
+
+            yield tamanho, formatador_imagem
+
+    # Ao utilizar a função print() para o objeto, imprime os dados e shapes das imagens que compões aquele objeto.
+    def __str__(self):
+        return (
+            "Nome: {0}\n"
+            "Altura original: {1}\n"
+            "Largura original: {2}\n"
+            "Nova altura: {3}\n"
+            "Nova largura: {4}\n"
+            "--- Formatos (altura, largura, canais):\n"
+            "Formato redimensionada: {5}\n"
+            "Formato rotacionada 90: {6}\n"
+            "Formato rotacionada 180: {7}\n"
+            "Formato rotacionada 270: {8}\n"
+            "Formato espelhada vertical: {9}\n"
+            "Formato espelhada horizontal: {10}\n"
+            .format(
+                self.nome_imagem,
+                self.altura_original,
+                self.largura_original,
+                self.nova_altura,
+                self.nova_largura,
+                self.imagem_redimensionada.shape,
+                self.imagem_rotacionada_90.shape,
+                self.imagem_rotacionada_180.shape,
+                self.imagem_rotacionada_270.shape,
+                self.imagem_espelhada_vertical.shape,
+                self.imagem_espelhada_horizontal.shape,
+            )
+        )
+
+    # No modo preguiçoso a imagem original não fica em memória, cada acesso lê o arquivo novamente, por inteiro. No modo
+    # padrão é a imagem lida no construtor, que pode ter sido decodificada reduzida
+    @property
+    def imagem_original(self):
+        if self._imagem_original is not None:
+            return self._imagem_original
+
+        return cv2.imread(self.caminho_imagem)
+
+    @property
+    def imagem_redimensionada(self):
+        return self._imagem_redimensionada
+
+    # Transformação calculada no primeiro acesso e guardada para os acessos seguintes
+    def __recuperar_variante(self, nome_metodo: str):
+        if nome_metodo not in self._variantes:
+            self._variantes[nome_metodo] = getattr(self, nome_metodo)()
+
+        return self._variantes[nome_metodo]
+
+    @property
+    def imagem_rotacionada_90(self):
+        return self.__recuperar_variante('rotacionar_90')
+
+    @property
+    def imagem_rotacionada_180(self):
+        return self.__recuperar_variante('rotacionar_180')
+
+    @property
+    def imagem_rotacionada_270(self):
+        return self.__recuperar_variante('rotacionar_270')
+
+    @property
+    def imagem_espelhada_horizontal(self):
+        return self.__recuperar_variante('espelhar_horizontal')
+
+    @property
+    def imagem_espelhada_vertical(self):
+        return self.__recuperar_variante('espelhar_vertical')
+
+    # Gera (sufixo, imagem) de cada transformação, na ordem dos arquivos gravados por salvar. As transformações que
+    # ainda não foram acessadas são calculadas uma de cada vez e não ficam guardadas no objeto. Com somente_base gera
+    # apenas a imagem redimensionada, para o treinamento que aplica as simetrias no próprio tf.data.
+    def gerar_variantes(self, somente_base: bool = False):
+        for sufixo, nome_metodo in self.variantes[:1] if somente_base else self.variantes:
+            if nome_metodo is None:
+                yield sufixo, self._imagem_redimensionada
+            elif nome_metodo in self._variantes:
+                yield sufixo, self._variantes[nome_metodo]
+            else:
+                yield sufixo, getattr(self, nome_metodo)()
+
+    def redimensionar(self, imagem: cv2=None,  nova_altura: int=None, nova_largura: int=None):
+        if imagem is None:
+            imagem = self.imagem_original
+
+        if nova_altura is None:
+            nova_altura = self.nova_altura
+
+        if nova_largura is None:
+            nova_largura = self.nova_largura
+
+        return cv2.resize(imagem, (nova_largura, nova_altura), interpolation=cv2.INTER_AREA)
+
+    def rotacionar_90(self, imagem: cv2=None):
+        if imagem is None:
+            imagem = self.imagem_redimensionada
+
+        return cv2.rotate(imagem, cv2.ROTATE_90_CLOCKWISE)
+
+    def rotacionar_180(self, imagem: cv2 = None):
+        if imagem is None:
+            imagem = self.imagem_redimensionada
+
+        return cv2.rotate(imagem, cv2.ROTATE_180)
+
+    def rotacionar_270(self, imagem: cv2 = None):
+        if imagem is None:
+            imagem = self.imagem_redimensionada
+
+        return cv2.rotate(imagem, cv2.ROTATE_90_COUNTERCLOCKWISE)
+
+    def espelhar_horizontal(self, imagem: cv2 = None):
+        if imagem is None:
+            imagem = self.imagem_redimensionada
+
+        return cv2.flip(imagem, flipCode=1)
+
+    def espelhar_vertical(self, imagem: cv2 = None):
+        if imagem is None:
+            imagem = self.imagem_redimensionada
+
+        return cv2.flip(imagem, flipCode=0)
+
+
+    # Salva a imagem redimensionada e suas transformações, uma de cada vez: cada transformação é gravada e liberada
+    # antes de a próxima ser calculada. Retorna os nomes dos arquivos gravados
+    def salvar(self, diretorio: str, somente_base: bool = False):
+        nome_arquivo, extensao = os.path.splitext(self.nome_imagem)
+        arquivos_gravados = []
+
+        for sufixo, imagem in self.gerar_variantes(somente_base):
+            caminho_nova_imagem = os.path.join(
+                diretorio, nome_arquivo + '_{0}x{1}{2}'.format(self.nova_altura, self.nova_largura, sufixo) + extensao
+            )
+            cv2.imwrite(caminho_nova_imagem, imagem)
+            arquivos_gravados.append(os.path.basename(caminho_nova_imagem))
+            del imagem
+
+        return arquivos_gravados
+
+
+# Prepara e salva uma única imagem em cada um dos tamanhos pedidos, dicionário tamanho -> diretório de destino, com uma
+# única leitura da imagem (ver gerar_piramide). Função de módulo, e não método, para poder ser enviada aos processos do
+# pool usado na preparação paralela das imagens. Retorna, por tamanho, o registro da imagem para o manifesto da
+# preparação, com o hash calculado uma vez no próprio processo. Com variantes "base" grava apenas a imagem
+# redimensionada, sem as rotações e espelhamentos.
+def preparar_imagem(caminho_imagem: str, destinos, variantes: str = 'todas'):
+    hash_arquivo = calcular_hash_arquivo(caminho_imagem)
+    registros = {}
+
+    for tamanho_imagem, formatador_imagem in FormatadorImagem.gerar_piramide(caminho_imagem, destinos):
+        arquivos_gravados = formatador_imagem.salvar(destinos[tamanho_imagem], somente_base=variantes == 'base')
+        registros[tamanho_imagem] = montar_registro_origem(
+            caminho_imagem, tamanho_imagem, arquivos_gravados, hash_arquivo, variantes
+        )
+
+    return registros
+
+
+# Como preparar_imagem, mas em vez de gravar um arquivo por transformação retorna, por tamanho, todas elas em um único
+# array uint8 [6, altura, largura, 3] ([1, altura, largura, 3] com variantes "base"), na mesma ordem dos arquivos
+# gravados por salvar, para o dataset empacotado.
+def transformar_imagem(caminho_imagem: str, tamanhos, variantes: str = 'todas'):
+    somente_base = variantes == 'base'
+    quantidade = 1 if somente_base else len(FormatadorImagem.variantes)
+    imagens_por_tamanho = {}
+
+    for tamanho_imagem, formatador_imagem in FormatadorImagem.gerar_piramide(caminho_imagem, tamanhos):
+        imagens = np.empty((quantidade, tamanho_imagem, tamanho_imagem, 3), dtype=np.uint8)
+
+        for posicao, (_, imagem) in enumerate(formatador_imagem.gerar_variantes(somente_base)):
+            imagens[posicao] = imagem
+
+        imagens_por_tamanho[tamanho_imagem] = imagens
+
+    return imagens_por_tamanho
+
+
+# Cada processo do pool usa uma única thread do OpenCV, o paralelismo vem da quantidade de processos
+def iniciar_processo_preparacao():
+    cv2.setNumThreads(1)
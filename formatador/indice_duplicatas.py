@@ -0,0 +1,189 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+from formatador.formatador_imagem import ler_imagem
+
+# Índice gravado no diretório de destino da preparação das imagens, ao lado do manifesto
+nome_arquivo_indice_duplicatas = '.indice_duplicatas.json'
+versao_indice_duplicatas = 1
+
+# Lado da imagem em tons de cinza usada no hash e lado do bloco de frequências baixas da DCT que forma os 64 bits
+lado_imagem_hash = 32
+lado_frequencias_hash = 8
+
+
+# Hash perceptual (pHash) de 64 bits: a imagem em tons de cinza é reduzida para 32x32, transformada pela DCT e cada
+# uma das 8x8 frequências mais baixas vira um bit, 1 quando está acima da mediana delas. Fotos da mesma peça com outra
+# compressão, outra resolução ou pequenas diferenças de luz têm hashes a poucos bits de distância.
+def calcular_hash_perceptual(imagem):
+    cinza = cv2.cvtColor(imagem, cv2.COLOR_BGR2GRAY)
+    reduzida = cv2.resize(cinza, (lado_imagem_hash, lado_imagem_hash), interpolation=cv2.INTER_AREA)
+    frequencias = cv2.dct(reduzida.astype(np.float32))[:lado_frequencias_hash, :lado_frequencias_hash].flatten()
+    # A primeira frequência (DC) é o brilho médio da imagem e ficaria fora da escala das demais
+    bits = frequencias > np.median(frequencias[1:])
+
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+# Hash perceptual de um arquivo, com a imagem decodificada já reduzida (ver ler_imagem). Função de módulo para poder ser
+# enviada aos processos do pool. Retorna None quando o arquivo não é uma imagem.
+def calcular_hash_arquivo_imagem(caminho_imagem: str):
+    imagem, _, _ = ler_imagem(caminho_imagem, lado_imagem_hash)
+
+    return None if imagem is None else calcular_hash_perceptual(imagem)
+
+
+def calcular_distancia_hamming(hash_a: int, hash_b: int):
+    return (hash_a ^ hash_b).bit_count()
+
+
+# Árvore BK (Burkhard-Keller) para busca de hashes por distância de Hamming. Cada filho fica pendurado no pai pela
+# distância entre os dois; pela desigualdade triangular, a busca por hashes a até limite bits de um hash só desce nos
+# filhos com distância entre d - limite e d + limite, sem comparar com todos os hashes do índice.
+class ArvoreBK:
+    def __init__(self):
+        # Nó: [hash, nomes com esse hash, {distância: nó filho}]
+        self.raiz = None
+        self.quantidade = 0
+
+    def __len__(self):
+        return self.quantidade
+
+    def adicionar(self, valor_hash: int, nome: str):
+        self.quantidade += 1
+
+        if self.raiz is None:
+            self.raiz = [valor_hash, [nome], {}]
+            return
+
+        no = self.raiz
+
+        while True:
+            distancia = calcular_distancia_hamming(valor_hash, no[0])
+
+            if distancia == 0:
+                no[1].append(nome)
+                return
+
+            filho = no[2].get(distancia)
+
+            if filho is None:
+                no[2][distancia] = [valor_hash, [nome], {}]
+                return
+
+            no = filho
+
+    # Lista (distância, nome) dos itens a até limite bits do hash, da menor para a maior distância
+    def buscar(self, valor_hash: int, limite: int):
+        encontrados = []
+        pendentes = [self.raiz] if self.raiz is not None else []
+
+        while pendentes:
+            no = pendentes.pop()
+            distancia = calcular_distancia_hamming(valor_hash, no[0])
+
+            if distancia <= limite:
+                encontrados.extend((distancia, nome) for nome in no[1])
+
+            pendentes.extend(
+                filho for distancia_filho, filho in no[2].items() if abs(distancia_filho - distancia) <= limite
+            )
+
+        return sorted(encontrados)
+
+
+# Índice de duplicatas da preparação. Guarda o hash perceptual de cada imagem de origem, com o tamanho e a data de
+# modificação do arquivo, para que apenas as imagens novas ou alteradas sejam decodificadas nas execuções seguintes.
+# A classificação é refeita a cada execução, na ordem dos arquivos, sobre a árvore BK montada com os hashes guardados:
+# uma imagem é duplicata quando está a até distancia_maxima bits de uma imagem anterior que não é duplicata. Assim o
+# resultado não depende da ordem em que as imagens foram incluídas nas execuções anteriores.
+class IndiceDuplicatas:
+    def __init__(self, diretorio_destino: str, distancia_maxima: int = 8):
+        self.caminho_indice = os.path.join(diretorio_destino, nome_arquivo_indice_duplicatas)
+        self.distancia_maxima = distancia_maxima
+        self.origens = {}
+        self.duplicatas = {}
+
+        try:
+            with open(self.caminho_indice) as arquivo:
+                indice = json.load(arquivo)
+        except (OSError, ValueError): # Sem índice (ou corrompido) todas as imagens são lidas novamente
+            return
+
+        if indice.get('versao') == versao_indice_duplicatas:
+            self.origens = indice.get('origens', {})
+
+    # Imagens de origem sem hash guardado ou alteradas desde a última execução. As que não existem mais saem do índice.
+    def separar_pendentes(self, diretorio_origem: str, lista_arquivos):
+        for arquivo in set(self.origens) - set(lista_arquivos):
+            del self.origens[arquivo]
+
+        pendentes = []
+
+        for arquivo in lista_arquivos:
+            estatisticas = os.stat(os.path.join(diretorio_origem, arquivo))
+            registro = self.origens.get(arquivo)
+            atual = (estatisticas.st_size, estatisticas.st_mtime_ns)
+
+            if registro is None or (registro['tamanho_bytes'], registro['mtime_ns']) != atual:
+                pendentes.append(arquivo)
+
+        return pendentes
+
+    def registrar(self, diretorio_origem: str, arquivo: str, valor_hash: int):
+        estatisticas = os.stat(os.path.join(diretorio_origem, arquivo))
+        self.origens[arquivo] = {
+            'hash': None if valor_hash is None else f'{valor_hash:016x}',
+            'tamanho_bytes': estatisticas.st_size,
+            'mtime_ns': estatisticas.st_mtime_ns,
+        }
+
+    # Separa as imagens únicas das duplicatas, na ordem da lista. Retorna as únicas e o dicionário duplicata ->
+    # (imagem mantida mais próxima, distância). Arquivos que não são imagens ficam entre as únicas, como antes.
+    def classificar(self, lista_arquivos):
+        arvore = ArvoreBK()
+        unicas = []
+        self.duplicatas = {}
+
+        for arquivo in lista_arquivos:
+            registro = self.origens.get(arquivo)
+
+            if registro is None or registro['hash'] is None:
+                unicas.append(arquivo)
+                continue
+
+            valor_hash = int(registro['hash'], 16)
+            semelhantes = arvore.buscar(valor_hash, self.distancia_maxima)
+
+            if semelhantes:
+                distancia, semelhante = semelhantes[0]
+                self.duplicatas[arquivo] = (semelhante, distancia)
+            else:
+                arvore.adicionar(valor_hash, arquivo)
+                unicas.append(arquivo)
+
+        return unicas, self.duplicatas
+
+    # A gravação é feita em um arquivo temporário renomeado ao final, como o manifesto. As duplicatas da última
+    # classificação também são gravadas, para consulta.
+    def salvar(self):
+        with open(self.caminho_indice + '.tmp', 'w') as arquivo:
+            json.dump(
+                {
+                    'versao': versao_indice_duplicatas,
+                    'distancia_maxima': self.distancia_maxima,
+                    'origens': self.origens,
+                    'duplicatas': {
+                        arquivo: {'semelhante': semelhante, 'distancia': distancia}
+                        for arquivo, (semelhante, distancia) in self.duplicatas.items()
+                    },
+                },
+                arquivo,
+                indent=1,
+                sort_keys=True,
+            )
+
+        os.replace(self.caminho_indice + '.tmp', self.caminho_indice)
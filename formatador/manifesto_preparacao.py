@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+
+# Manifesto gravado no diretório de destino da preparação das imagens. O nome começa com ponto para não ser confundido
+# com as imagens do dataset.
+nome_arquivo_manifesto = '.manifesto_preparacao.json'
+versao_manifesto = 1
+
+
+def calcular_hash_arquivo(caminho_arquivo: str):
+    hash_arquivo = hashlib.sha256()
+
+    with open(caminho_arquivo, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b''):
+            hash_arquivo.update(bloco)
+
+    return hash_arquivo.hexdigest()
+
+
+# Registro de uma imagem de origem no manifesto: hash do conteúdo, tamanho e data de modificação do arquivo, o tamanho
+# e as variantes (todas as transformações ou apenas a base) usados na preparação e os arquivos derivados gravados no
+# destino
+def montar_registro_origem(caminho_imagem: str, tamanho_imagem: int, arquivos_derivados, hash_arquivo: str = None,
+                           variantes: str = 'todas'):
+    estatisticas = os.stat(caminho_imagem)
+
+    return {
+        'hash': hash_arquivo or calcular_hash_arquivo(caminho_imagem),
+        'tamanho_bytes': estatisticas.st_size,
+        'mtime_ns': estatisticas.st_mtime_ns,
+        'tam': tamanho_imagem,
+        'variantes': variantes,
+        'arquivos': list(arquivos_derivados),
+    }
+
+
+def carregar_manifesto(diretorio_destino: str):
+    caminho_manifesto = os.path.join(diretorio_destino, nome_arquivo_manifesto)
+
+    try:
+        with open(caminho_manifesto) as arquivo:
+            manifesto = json.load(arquivo)
+    except (OSError, ValueError): # Sem manifesto (ou corrompido) todas as imagens são preparadas novamente
+        return {}
+
+    if manifesto.get('versao') != versao_manifesto:
+        return {}
+
+    return manifesto.get('origens', {})
+
+
+# A gravação é feita em um arquivo temporário renomeado ao final, uma interrupção nunca deixa o manifesto pela metade
+def salvar_manifesto(diretorio_destino: str, origens):
+    caminho_manifesto = os.path.join(diretorio_destino, nome_arquivo_manifesto)
+    caminho_temporario = caminho_manifesto + '.tmp'
+
+    with open(caminho_temporario, 'w') as arquivo:
+        json.dump({'versao': versao_manifesto, 'origens': origens}, arquivo, indent=1, sort_keys=True)
+
+    os.replace(caminho_temporario, caminho_manifesto)
+
+
+def remover_arquivos_derivados(diretorio_destino: str, arquivos_derivados):
+    for nome_arquivo in arquivos_derivados:
+        try:
+            os.remove(os.path.join(diretorio_destino, nome_arquivo))
+        except FileNotFoundError:
+            pass
+
+
+# Compara as imagens de origem com o manifesto e separa as que precisam ser preparadas (novas, alteradas ou preparadas
+# com outro tamanho ou outras variantes). Uma imagem é considerada inalterada pelo tamanho e pela data de modificação,
+# sem ler o arquivo; apenas quando esses dados mudam o hash do conteúdo é recalculado, assim um arquivo apenas tocado
+# (ou copiado) não é processado novamente. Os arquivos derivados de origens removidas são apagados do destino e saem do
+# manifesto, que é atualizado no lugar.
+def separar_pendentes(diretorio_origem: str, diretorio_destino: str, lista_arquivos, tamanho_imagem: int, origens,
+                      variantes: str = 'todas'):
+    pendentes = []
+
+    for arquivo in set(origens) - set(lista_arquivos):
+        remover_arquivos_derivados(diretorio_destino, origens.pop(arquivo)['arquivos'])
+
+    for arquivo in lista_arquivos:
+        registro = origens.get(arquivo)
+
+        # Manifestos anteriores às variantes sempre gravaram todas as transformações
+        if (
+                registro is None
+                or registro['tam'] != tamanho_imagem
+                or registro.get('variantes', 'todas') != variantes
+        ):
+            pendentes.append(arquivo)
+            continue
+
+        caminho_imagem = os.path.join(diretorio_origem, arquivo)
+        estatisticas = os.stat(caminho_imagem)
+        derivados_existem = all(
+            os.path.exists(os.path.join(diretorio_destino, nome_arquivo)) for nome_arquivo in registro['arquivos']
+        )
+
+        if not derivados_existem:
+            pendentes.append(arquivo)
+        elif (estatisticas.st_size, estatisticas.st_mtime_ns) != (registro['tamanho_bytes'], registro['mtime_ns']):
+            if calcular_hash_arquivo(caminho_imagem) == registro['hash']:
+                registro['tamanho_bytes'] = estatisticas.st_size
+                registro['mtime_ns'] = estatisticas.st_mtime_ns
+            else:
+                pendentes.append(arquivo)
+
+    return pendentes
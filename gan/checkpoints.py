@@ -0,0 +1,130 @@
+import json
+import os
+import random
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Subdiretório do resultado de um treinamento (resultado/<data e hora>) com os checkpoints, e arquivo com os parâmetros
+# que precisam ser os mesmos para retomar o treinamento
+nome_diretorio_checkpoints = 'checkpoints'
+nome_arquivo_parametros_treinamento = 'parametros_treinamento.json'
+padrao_arquivo_checkpoint = re.compile(r'^checkpoint_(\d+)\.npz$')
+
+
+# Semente usada quando o treinamento não informa uma. É gravada nos parâmetros do treinamento para que ele possa ser
+# retomado com o mesmo resultado.
+def sortear_semente():
+    return random.SystemRandom().randrange(2 ** 31)
+
+
+# A gravação é feita em um arquivo temporário renomeado ao final, como o manifesto da preparação
+def salvar_parametros_treinamento(diretorio_resultado: str, parametros: dict):
+    caminho_parametros = os.path.join(diretorio_resultado, nome_arquivo_parametros_treinamento)
+
+    with open(caminho_parametros + '.tmp', 'w') as arquivo:
+        json.dump(parametros, arquivo, indent=1, sort_keys=True)
+
+    os.replace(caminho_parametros + '.tmp', caminho_parametros)
+
+
+def carregar_parametros_treinamento(diretorio_resultado: str):
+    try:
+        with open(os.path.join(diretorio_resultado, nome_arquivo_parametros_treinamento)) as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError): # Treinamento anterior aos checkpoints
+        return {}
+
+
+# Checkpoints periódicos de um treinamento. Cada checkpoint guarda, em um .npz, a época concluída e os valores de
+# grupos de variáveis (pesos do gerador e do discriminador, variáveis dos otimizadores, estado dos geradores de números
+# aleatórios), na ordem de cada lista, além de valores extras do laço de treinamento. Apenas os últimos
+# maximo_mantidos checkpoints ficam no diretório.
+#
+# O laço de treinamento só é interrompido para copiar os valores das variáveis para a memória: a gravação do arquivo
+# acontece em uma thread. Um novo checkpoint aguarda o término da gravação anterior, então no máximo uma cópia fica em
+# memória. Cada arquivo é gravado com outro nome e renomeado ao final, um treinamento interrompido durante a gravação
+# mantém os checkpoints anteriores intactos.
+class GerenciadorCheckpoints:
+    def __init__(self, diretorio_resultado: str, grupos_variaveis: dict, maximo_mantidos: int = 3):
+        self.diretorio = os.path.join(diretorio_resultado, nome_diretorio_checkpoints)
+        self.grupos_variaveis = grupos_variaveis
+        self.maximo_mantidos = max(1, maximo_mantidos)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checkpoint')
+        self.gravacao = None
+
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    # Lista (época, caminho) dos checkpoints do diretório, da época mais antiga para a mais recente
+    def listar(self):
+        checkpoints = []
+
+        for arquivo in os.listdir(self.diretorio):
+            correspondencia = padrao_arquivo_checkpoint.match(arquivo)
+
+            if correspondencia is not None:
+                checkpoints.append((int(correspondencia.group(1)), os.path.join(self.diretorio, arquivo)))
+
+        return sorted(checkpoints)
+
+    def salvar(self, epoca: int, extras: dict = None):
+        self.aguardar()
+
+        conteudo = {'epoca': np.array(epoca, dtype=np.int64)}
+
+        for nome_grupo, variaveis in self.grupos_variaveis.items():
+            for posicao, variavel in enumerate(variaveis):
+                # O numpy() devolve uma cópia do valor, as variáveis continuam sendo atualizadas durante a gravação
+                conteudo[f'{nome_grupo}/{posicao}'] = variavel.numpy()
+
+        for nome, valor in (extras or {}).items():
+            conteudo[f'extra/{nome}'] = np.asarray(valor)
+
+        self.gravacao = self.executor.submit(self.__gravar, epoca, conteudo)
+
+    def __gravar(self, epoca: int, conteudo: dict):
+        caminho_checkpoint = os.path.join(self.diretorio, f'checkpoint_{epoca:06d}.npz')
+
+        with open(caminho_checkpoint + '.tmp', 'wb') as arquivo:
+            np.savez(arquivo, **conteudo)
+
+        os.replace(caminho_checkpoint + '.tmp', caminho_checkpoint)
+
+        for _, caminho_antigo in self.listar()[:-self.maximo_mantidos]:
+            os.remove(caminho_antigo)
+
+    # Aguarda a gravação em andamento. Um erro na gravação é lançado aqui, na thread do treinamento.
+    def aguardar(self):
+        if self.gravacao is not None:
+            gravacao, self.gravacao = self.gravacao, None
+            gravacao.result()
+
+    # Restaura as variáveis do checkpoint mais recente. Retorna a época concluída e os extras, ou None quando ainda não
+    # há checkpoint. Os otimizadores precisam estar construídos (optimizer.build) para que suas variáveis existam.
+    def restaurar(self):
+        checkpoints = self.listar()
+
+        if not checkpoints:
+            return None
+
+        _, caminho_checkpoint = checkpoints[-1]
+
+        with np.load(caminho_checkpoint) as conteudo:
+            for nome_grupo, variaveis in self.grupos_variaveis.items():
+                quantidade = sum(1 for chave in conteudo.files if chave.startswith(nome_grupo + '/'))
+
+                if quantidade != len(variaveis):
+                    raise ValueError(
+                        f'O checkpoint {caminho_checkpoint} tem {quantidade} variáveis em {nome_grupo}, o modelo tem '
+                        f'{len(variaveis)}.'
+                    )
+
+                for posicao, variavel in enumerate(variaveis):
+                    variavel.assign(conteudo[f'{nome_grupo}/{posicao}'])
+
+            extras = {
+                chave[len('extra/'):]: conteudo[chave] for chave in conteudo.files if chave.startswith('extra/')
+            }
+
+            return int(conteudo['epoca']), extras
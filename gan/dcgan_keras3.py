@@ -1,270 +1,381 @@
-import datetime
-import os
-import sys
-
-import keras
-import tensorflow as tf
-from keras import layers
-from keras import ops
-
-# Necessário para conseguir realizar o import dos scripts do módulo "config"
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-
-from config.parametros_dcgan_keras3 import ParametrosDcganKeras3
-
-
-
-caminho_historico_execucao = 'historico_execucao.txt'
-caminho_resultado = 'resultado'
-caminho_imagens_treinamento = 'imgs'
-caminho_modelo_treinado = 'model'
-
-
-
-class GAN(keras.Model):
-    def __init__(self, discriminator, generator, latent_dim=128):
-        super().__init__()
-        self.discriminator = discriminator
-        self.generator = generator
-        self.latent_dim = latent_dim
-        self.seed_generator = keras.random.SeedGenerator(1337)
-
-    def compile(self, d_optimizer, g_optimizer, loss_fn):
-        super().compile()
-        self.d_optimizer = d_optimizer
-        self.g_optimizer = g_optimizer
-        self.loss_fn = loss_fn
-        self.d_loss_metric = keras.metrics.Mean(name="d_loss")
-        self.g_loss_metric = keras.metrics.Mean(name="g_loss")
-
-    @property
-    def metrics(self):
-        return [self.d_loss_metric, self.g_loss_metric]
-
-    def train_step(self, real_images):
-        # Sample random points in the latent space
-        batch_size = ops.shape(real_images)[0]
-        random_latent_vectors = keras.random.normal(
-            shape=(batch_size, self.latent_dim), seed=self.seed_generator
-        )
-
-        # Decode them to fake images
-        generated_images = self.generator(random_latent_vectors)
-
-        # Combine them with real images
-        combined_images = ops.concatenate([generated_images, real_images], axis=0)
-
-        # Assemble labels discriminating real from fake images
-        labels = ops.concatenate(
-            [ops.ones((batch_size, 1)), ops.zeros((batch_size, 1))], axis=0
-        )
-        # Add random noise to the labels - important trick!
-        labels += 0.05 * tf.random.uniform(tf.shape(labels))
-
-        # Train the discriminator
-        with tf.GradientTape() as tape:
-            predictions = self.discriminator(combined_images)
-            d_loss = self.loss_fn(labels, predictions)
-        grads = tape.gradient(d_loss, self.discriminator.trainable_weights)
-        self.d_optimizer.apply_gradients(
-            zip(grads, self.discriminator.trainable_weights)
-        )
-
-        # Sample random points in the latent space
-        random_latent_vectors = keras.random.normal(
-            shape=(batch_size, self.latent_dim), seed=self.seed_generator
-        )
-
-        # Assemble labels that say "all real images"
-        misleading_labels = ops.zeros((batch_size, 1))
-
-        # Train the generator (note that we should *not* update the weights
-        # of the discriminator)!
-        with tf.GradientTape() as tape:
-            predictions = self.discriminator(self.generator(random_latent_vectors))
-            g_loss = self.loss_fn(misleading_labels, predictions)
-        grads = tape.gradient(g_loss, self.generator.trainable_weights)
-        self.g_optimizer.apply_gradients(zip(grads, self.generator.trainable_weights))
-
-        # Update metrics
-        self.d_loss_metric.update_state(d_loss)
-        self.g_loss_metric.update_state(g_loss)
-        return {
-            "d_loss": self.d_loss_metric.result(),
-            "g_loss": self.g_loss_metric.result(),
-        }
-
-
-
-class GANMonitor(keras.callbacks.Callback):
-    def __init__(self, num_img=3, latent_dim=128, save_img_path=None, logger_path=None):
-        super().__init__()
-        self.num_img = num_img
-        self.latent_dim = latent_dim
-        self.seed_generator = keras.random.SeedGenerator(42)
-        self.save_img_path = save_img_path
-        self.logger_path = logger_path
-
-
-    def __logger(self, mensagem):
-        momento = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        mensagem = f'{momento} -> {mensagem}{os.linesep}'
-
-        if self.logger_path is not None:
-            with open(self.logger_path, 'a') as arquivo:
-                arquivo.write(mensagem)
-        else:
-            print(mensagem)
-
-    # def on_train_batch_end(self, batch, logs=None):
-    #     self.__logger("Batch {batch} - Logs: {logs}")
-
-
-    def on_epoch_end(self, epoch, logs=None):
-        # Salva imagens de exemplo, com a progressão do trabalho, apenas nas épocas múltiplas de 10
-        if epoch % 5 == 0:
-            random_latent_vectors = keras.random.normal(
-                shape=(self.num_img, self.latent_dim), seed=self.seed_generator
-            )
-            generated_images = self.model.generator(random_latent_vectors)
-            generated_images *= 255
-            generated_images.numpy()
-
-            for i in range(self.num_img):
-                img = keras.utils.array_to_img(generated_images[i])
-                save_img_path = "generated_img_%03d_%d.png" % (epoch, i)
-
-                if self.save_img_path is not None:
-                    save_img_path = os.path.join(self.save_img_path, save_img_path)
-
-                img.save(save_img_path)
-
-        self.__logger(f'Terminando o processamento da época: {epoch} - Logs: {logs}')
-
-
-
-def logger(mensagem):
-    momento = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    mensagem = f'{momento} -> {mensagem}{os.linesep}'
-
-    if caminho_historico_execucao is not None:
-        with open(caminho_historico_execucao, 'a') as arquivo:
-            arquivo.write(mensagem)
-    else:
-        print(mensagem)
-
-
-
-def funcao_principal(epocas:int=50, diretorio_dataset:str=None, diretorio_resultado:str=None):
-    # O trecho de código abaixo é importante quando tento trabalhar com imagens de 128 pixels. O meu equipeamento não
-    # consegue processar floats32 (padrão) para imagens "grandes". Trabalhando com imagens de 64 pixels é possível usar
-    # a configuração padrão de 32. Interessante que ao usar o float16 a aplicação demora mais e se comportar pior que
-    # ao usar o float32 padrão.
-    # mixed_precision.set_global_policy('mixed_float16')
-
-    global caminho_historico_execucao
-    global caminho_resultado
-    global caminho_imagens_treinamento
-    global caminho_modelo_treinado
-
-    if diretorio_dataset is None or (not os.path.exists(diretorio_dataset)):
-        print("Não foi indicado um dataset para treinamento.")
-        return # Finaliza a execução
-
-    if diretorio_resultado is None:
-        print("Não foi indicado um local para salvar/carregar o modelo.")
-        return # Finaliza a execução
-
-    caminho_resultado = diretorio_resultado
-
-    # Prepara os diretorios para gravar o resultado
-    caminho_resultado = (os.path.join(caminho_resultado, datetime.datetime.now().strftime('%Y%m%d%H%M%S')))
-    os.mkdir(caminho_resultado)
-    caminho_historico_execucao = os.path.join(caminho_resultado, caminho_historico_execucao)
-    caminho_imagens_treinamento = os.path.join(caminho_resultado, caminho_imagens_treinamento)
-    caminho_modelo_treinado = os.path.join(caminho_resultado, caminho_modelo_treinado)
-    os.mkdir(caminho_imagens_treinamento)
-    os.mkdir(caminho_modelo_treinado)
-    caminho_modelo_treinado = os.path.join(caminho_modelo_treinado, 'gerador_azulejos.h5')
-
-    logger('-----> Início treinamento DCGANKera3 <-----')
-    logger('Criando o dataset...')
-    dataset = keras.utils.image_dataset_from_directory(
-        diretorio_dataset, label_mode=None, image_size=(64, 64), batch_size=32
-    )
-    dataset = dataset.map(lambda x: x / 255.0)
-
-    logger('Criando o discriminador...')
-    discriminator = keras.Sequential(
-        [
-            keras.Input(shape=(64, 64, 3)), # Fiz alguns testes com 128
-            layers.Conv2D(64, kernel_size=4, strides=2, padding="same"),
-            layers.LeakyReLU(negative_slope=0.2),
-            layers.Conv2D(128, kernel_size=4, strides=2, padding="same"),
-            layers.LeakyReLU(negative_slope=0.2),
-            layers.Conv2D(128, kernel_size=4, strides=2, padding="same"),
-            layers.LeakyReLU(negative_slope=0.2),
-            layers.Flatten(),
-            layers.Dropout(0.2),
-            layers.Dense(1, activation="sigmoid"),
-        ],
-        name="discriminator",
-    )
-    discriminator.summary(print_fn=logger)
-
-    # 09/08/2025 - Para ficar igual ao modelo dcgan.py, alterei o latent_dim para 100.
-    latent_dim = 100
-
-    logger(f'Criando o gerador com ruido de tamanho: {latent_dim}')
-    generator = keras.Sequential(
-        [
-            keras.Input(shape=(latent_dim,)),
-            layers.Dense(8 * 8 * 128), # Quando trabalhar com 128px a entrada precisa ser 16 e 64px deve ser 8
-            layers.Reshape((8, 8, 128)),
-            layers.Conv2DTranspose(128, kernel_size=4, strides=2, padding="same"),
-            layers.LeakyReLU(negative_slope=0.2),
-            layers.Conv2DTranspose(256, kernel_size=4, strides=2, padding="same"),
-            layers.LeakyReLU(negative_slope=0.2),
-            layers.Conv2DTranspose(512, kernel_size=4, strides=2, padding="same"),
-            layers.LeakyReLU(negative_slope=0.2),
-            layers.Conv2D(3, kernel_size=5, padding="same", activation="sigmoid"),
-        ],
-        name="generator",
-    )
-    generator.summary(print_fn=logger)
-
-    epochs = epocas  # In practice, use ~100 epochs
-    logger(f'Quantidade de épocas: {epochs}')
-
-    gan = GAN(discriminator=discriminator, generator=generator, latent_dim=latent_dim)
-    gan.compile(
-        d_optimizer=keras.optimizers.Adam(learning_rate=0.0001),
-        g_optimizer=keras.optimizers.Adam(learning_rate=0.0001),
-        loss_fn=keras.losses.BinaryCrossentropy(),
-    )
-
-    gan.fit(
-        dataset,
-        epochs=epochs,
-        callbacks=[
-            GANMonitor(
-                num_img=5,
-                latent_dim=latent_dim,
-                save_img_path=caminho_imagens_treinamento,
-                logger_path=caminho_historico_execucao
-            )
-        ]
-    )
-
-    # 09/08/2025 - Antes eu estava salvando o modelo todo e não apenas o gerador. Quando tentava usar o arquivo na API
-    # resultava em um erro, pois tentava carregar todo o modelo
-    gan.generator.save(caminho_modelo_treinado)
-
-
-
-if __name__ == '__main__':
-    parametros_aplicacao = ParametrosDcganKeras3().recuperar_parametros()
-    diretorio_dataset = parametros_aplicacao.diretorio_dataset
-    diretorio_resultado = parametros_aplicacao.diretorio_resultado
-    epocas = parametros_aplicacao.epocas
-    funcao_principal(diretorio_dataset=diretorio_dataset, diretorio_resultado=diretorio_resultado, epocas=epocas)
\ No newline at end of file
+import datetime
+import os
+import sys
+
+import keras
+import tensorflow as tf
+from keras import layers
+from keras import ops
+
+# Necessário para conseguir realizar o import dos scripts do módulo "config"
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config.parametros_dcgan_keras3 import ParametrosDcganKeras3
+from formatador.dataset_arquivos import criar_dataset_arquivos_tf
+from formatador.dataset_empacotado import DatasetEmpacotado, eh_dataset_empacotado
+from gan.checkpoints import (
+    GerenciadorCheckpoints, carregar_parametros_treinamento, salvar_parametros_treinamento, sortear_semente
+)
+from gan.exportacao import exportar_gerador_servico, recuperar_caminho_artefato_servico
+from gan.pos_processamento import gerar_azulejos_uint8
+
+
+
+caminho_historico_execucao = 'historico_execucao.txt'
+caminho_resultado = 'resultado'
+caminho_imagens_treinamento = 'imgs'
+caminho_modelo_treinado = 'model'
+
+
+
+class GAN(keras.Model):
+    def __init__(self, discriminator, generator, latent_dim=128, semente=1337):
+        super().__init__()
+        self.discriminator = discriminator
+        self.generator = generator
+        self.latent_dim = latent_dim
+        self.seed_generator = keras.random.SeedGenerator(semente)
+
+    def compile(self, d_optimizer, g_optimizer, loss_fn):
+        super().compile()
+        self.d_optimizer = d_optimizer
+        self.g_optimizer = g_optimizer
+        self.loss_fn = loss_fn
+        self.d_loss_metric = keras.metrics.Mean(name="d_loss")
+        self.g_loss_metric = keras.metrics.Mean(name="g_loss")
+
+    @property
+    def metrics(self):
+        return [self.d_loss_metric, self.g_loss_metric]
+
+    def train_step(self, real_images):
+        # Sample random points in the latent space
+        batch_size = ops.shape(real_images)[0]
+        random_latent_vectors = keras.random.normal(
+            shape=(batch_size, self.latent_dim), seed=self.seed_generator
+        )
+
+        # Decode them to fake images
+        generated_images = self.generator(random_latent_vectors)
+
+        # Combine them with real images
+        combined_images = ops.concatenate([generated_images, real_images], axis=0)
+
+        # Assemble labels discriminating real from fake images
+        labels = ops.concatenate(
+            [ops.ones((batch_size, 1)), ops.zeros((batch_size, 1))], axis=0
+        )
+        # Add random noise to the labels - important trick!
+        # Sorteado pelo seed_generator, que faz parte dos checkpoints, para que o treinamento retomado seja igual
+        labels += 0.05 * keras.random.uniform(ops.shape(labels), seed=self.seed_generator)
+
+        # Train the discriminator
+        with tf.GradientTape() as tape:
+            predictions = self.discriminator(combined_images)
+            d_loss = self.loss_fn(labels, predictions)
+        grads = tape.gradient(d_loss, self.discriminator.trainable_weights)
+        self.d_optimizer.apply_gradients(
+            zip(grads, self.discriminator.trainable_weights)
+        )
+
+        # Sample random points in the latent space
+        random_latent_vectors = keras.random.normal(
+            shape=(batch_size, self.latent_dim), seed=self.seed_generator
+        )
+
+        # Assemble labels that say "all real images"
+        misleading_labels = ops.zeros((batch_size, 1))
+
+        # Train the generator (note that we should *not* update the weights
+        # of the discriminator)!
+        with tf.GradientTape() as tape:
+            predictions = self.discriminator(self.generator(random_latent_vectors))
+            g_loss = self.loss_fn(misleading_labels, predictions)
+        grads = tape.gradient(g_loss, self.generator.trainable_weights)
+        self.g_optimizer.apply_gradients(zip(grads, self.generator.trainable_weights))
+
+        # Update metrics
+        self.d_loss_metric.update_state(d_loss)
+        self.g_loss_metric.update_state(g_loss)
+        return {
+            "d_loss": self.d_loss_metric.result(),
+            "g_loss": self.g_loss_metric.result(),
+        }
+
+
+
+class GANMonitor(keras.callbacks.Callback):
+    def __init__(self, num_img=3, latent_dim=128, save_img_path=None, logger_path=None, semente=42):
+        super().__init__()
+        self.num_img = num_img
+        self.latent_dim = latent_dim
+        self.seed_generator = keras.random.SeedGenerator(semente)
+        self.save_img_path = save_img_path
+        self.logger_path = logger_path
+
+
+    def __logger(self, mensagem):
+        momento = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        mensagem = f'{momento} -> {mensagem}{os.linesep}'
+
+        if self.logger_path is not None:
+            with open(self.logger_path, 'a') as arquivo:
+                arquivo.write(mensagem)
+        else:
+            print(mensagem)
+
+    # def on_train_batch_end(self, batch, logs=None):
+    #     self.__logger("Batch {batch} - Logs: {logs}")
+
+
+    def on_epoch_end(self, epoch, logs=None):
+        # Salva imagens de exemplo, com a progressão do trabalho, apenas nas épocas múltiplas de 10
+        if epoch % 5 == 0:
+            random_latent_vectors = keras.random.normal(
+                shape=(self.num_img, self.latent_dim), seed=self.seed_generator
+            )
+            # Saída sigmoid [0, 1] convertida para uint8 pelo pós-processamento compartilhado com a API
+            generated_images = gerar_azulejos_uint8(self.model.generator, random_latent_vectors).numpy()
+
+            for i in range(self.num_img):
+                img = keras.utils.array_to_img(generated_images[i], scale=False)
+                save_img_path = "generated_img_%03d_%d.png" % (epoch, i)
+
+                if self.save_img_path is not None:
+                    save_img_path = os.path.join(self.save_img_path, save_img_path)
+
+                img.save(save_img_path)
+
+        self.__logger(f'Terminando o processamento da época: {epoch} - Logs: {logs}')
+
+
+
+# Salva um checkpoint a cada intervalo épocas e na última época e informa ao dataset a época que vai começar. A
+# gravação acontece em uma thread (ver gan/checkpoints.py), durante a época seguinte. Precisa vir depois do GANMonitor
+# na lista de callbacks, para que o checkpoint guarde o estado do seed_generator do monitor depois das imagens da época.
+class CheckpointTreinamento(keras.callbacks.Callback):
+    def __init__(self, gerenciador_checkpoints, epoca_dataset, epocas, intervalo=1):
+        super().__init__()
+        self.gerenciador_checkpoints = gerenciador_checkpoints
+        self.epoca_dataset = epoca_dataset
+        self.epocas = epocas
+        self.intervalo = max(1, intervalo)
+
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoca_dataset.assign(epoch)
+
+
+    def on_epoch_end(self, epoch, logs=None):
+        if (epoch + 1) % self.intervalo == 0 or epoch + 1 == self.epocas:
+            self.gerenciador_checkpoints.salvar(epoch + 1)
+
+
+    def on_train_end(self, logs=None):
+        self.gerenciador_checkpoints.aguardar()
+
+
+
+def logger(mensagem):
+    momento = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    mensagem = f'{momento} -> {mensagem}{os.linesep}'
+
+    if caminho_historico_execucao is not None:
+        with open(caminho_historico_execucao, 'a') as arquivo:
+            arquivo.write(mensagem)
+    else:
+        print(mensagem)
+
+
+
+# Com diretorio_retomar (um resultado/<data e hora> de um treinamento anterior) o treinamento continua, no mesmo
+# diretório, a partir do último checkpoint, com a semente e o aumento_d4 gravados nos parâmetros do treinamento. Com
+# semente ou diretorio_retomar as operações do TensorFlow são determinísticas, mais lentas, para que o treinamento
+# retomado chegue ao mesmo resultado.
+def funcao_principal(epocas:int=50, diretorio_dataset:str=None, diretorio_resultado:str=None, aumento_d4:bool=False,
+                     semente:int=None, diretorio_retomar:str=None, intervalo_checkpoint:int=1,
+                     checkpoints_mantidos:int=3):
+    # O trecho de código abaixo é importante quando tento trabalhar com imagens de 128 pixels. O meu equipeamento não
+    # consegue processar floats32 (padrão) para imagens "grandes". Trabalhando com imagens de 64 pixels é possível usar
+    # a configuração padrão de 32. Interessante que ao usar o float16 a aplicação demora mais e se comportar pior que
+    # ao usar o float32 padrão.
+    # mixed_precision.set_global_policy('mixed_float16')
+
+    global caminho_historico_execucao
+    global caminho_resultado
+    global caminho_imagens_treinamento
+    global caminho_modelo_treinado
+
+    if diretorio_dataset is None or (not os.path.exists(diretorio_dataset)):
+        print("Não foi indicado um dataset para treinamento.")
+        return # Finaliza a execução
+
+    if diretorio_resultado is None and diretorio_retomar is None:
+        print("Não foi indicado um local para salvar/carregar o modelo.")
+        return # Finaliza a execução
+
+    deterministico = semente is not None or diretorio_retomar is not None
+
+    # Prepara os diretorios para gravar o resultado
+    if diretorio_retomar is None:
+        caminho_resultado = (os.path.join(diretorio_resultado, datetime.datetime.now().strftime('%Y%m%d%H%M%S')))
+        os.mkdir(caminho_resultado)
+    else:
+        caminho_resultado = diretorio_retomar
+        parametros_treinamento = carregar_parametros_treinamento(caminho_resultado)
+        semente = parametros_treinamento.get('semente', semente)
+        aumento_d4 = parametros_treinamento.get('aumento_d4', aumento_d4)
+
+    if semente is None:
+        semente = sortear_semente()
+
+    caminho_historico_execucao = os.path.join(caminho_resultado, 'historico_execucao.txt')
+    caminho_imagens_treinamento = os.path.join(caminho_resultado, 'imgs')
+    caminho_modelo_treinado = os.path.join(caminho_resultado, 'model')
+    os.makedirs(caminho_imagens_treinamento, exist_ok=True)
+    os.makedirs(caminho_modelo_treinado, exist_ok=True)
+    caminho_modelo_treinado = os.path.join(caminho_modelo_treinado, 'gerador_azulejos.h5')
+    salvar_parametros_treinamento(caminho_resultado, {'dcgan': 'KERAS3', 'semente': semente, 'aumento_d4': aumento_d4})
+
+    logger('-----> Início treinamento DCGANKera3 <-----')
+    logger(f'Semente: {semente}')
+    logger(f'Operações determinísticas: {deterministico}')
+
+    # Pesos iniciais da semente. As operações determinísticas, para que o treinamento possa ser retomado com o mesmo
+    # resultado, apenas com a semente indicada ou ao retomar, porque deixam o treinamento mais lento.
+    keras.utils.set_random_seed(semente)
+
+    if deterministico:
+        tf.config.experimental.enable_op_determinism()
+
+    logger('Criando o dataset...')
+    # Época lida pelo dataset para embaralhar as imagens, atualizada pelo CheckpointTreinamento
+    epoca_dataset = tf.Variable(0, dtype=tf.int64, trainable=False)
+
+    if eh_dataset_empacotado(diretorio_dataset):
+        # Fragmentos lidos com mmap, convertidos para RGB em [0, 1] e 64x64 no tf.data, sem decodificar imagens
+        dataset = DatasetEmpacotado(diretorio_dataset).criar_dataset_tf(
+            32, faixa_saida='sigmoid', ordem_canais='RGB', tamanho_imagem=64, aumento_d4=aumento_d4, semente=semente,
+            epoca=epoca_dataset,
+        )
+    else:
+        # Imagens lidas dos arquivos pelo tf.data, em RGB e [0, 1], redimensionadas para 64x64 e com a simetria
+        # aleatória (D4) opcional. A ordem de cada época depende apenas da semente, como no dataset empacotado.
+        dataset = criar_dataset_arquivos_tf(
+            diretorio_dataset, 32, faixa_saida='sigmoid', ordem_canais='RGB', tamanho_imagem=64,
+            aumento_d4=aumento_d4, semente=semente, epoca=epoca_dataset,
+        )
+
+    logger('Criando o discriminador...')
+    discriminator = keras.Sequential(
+        [
+            keras.Input(shape=(64, 64, 3)), # Fiz alguns testes com 128
+            layers.Conv2D(64, kernel_size=4, strides=2, padding="same"),
+            layers.LeakyReLU(negative_slope=0.2),
+            layers.Conv2D(128, kernel_size=4, strides=2, padding="same"),
+            layers.LeakyReLU(negative_slope=0.2),
+            layers.Conv2D(128, kernel_size=4, strides=2, padding="same"),
+            layers.LeakyReLU(negative_slope=0.2),
+            layers.Flatten(),
+            layers.Dropout(0.2),
+            layers.Dense(1, activation="sigmoid"),
+        ],
+        name="discriminator",
+    )
+    discriminator.summary(print_fn=logger)
+
+    # 09/08/2025 - Para ficar igual ao modelo dcgan.py, alterei o latent_dim para 100.
+    latent_dim = 100
+
+    logger(f'Criando o gerador com ruido de tamanho: {latent_dim}')
+    generator = keras.Sequential(
+        [
+            keras.Input(shape=(latent_dim,)),
+            layers.Dense(8 * 8 * 128), # Quando trabalhar com 128px a entrada precisa ser 16 e 64px deve ser 8
+            layers.Reshape((8, 8, 128)),
+            layers.Conv2DTranspose(128, kernel_size=4, strides=2, padding="same"),
+            layers.LeakyReLU(negative_slope=0.2),
+            layers.Conv2DTranspose(256, kernel_size=4, strides=2, padding="same"),
+            layers.LeakyReLU(negative_slope=0.2),
+            layers.Conv2DTranspose(512, kernel_size=4, strides=2, padding="same"),
+            layers.LeakyReLU(negative_slope=0.2),
+            layers.Conv2D(3, kernel_size=5, padding="same", activation="sigmoid"),
+        ],
+        name="generator",
+    )
+    generator.summary(print_fn=logger)
+
+    epochs = epocas  # In practice, use ~100 epochs
+    logger(f'Quantidade de épocas: {epochs}')
+
+    # O ruído do treinamento, a variação dos rótulos e o ruído das imagens de exemplo também vêm da semente
+    gan = GAN(discriminator=discriminator, generator=generator, latent_dim=latent_dim, semente=semente)
+    gan.compile(
+        d_optimizer=keras.optimizers.Adam(learning_rate=0.0001),
+        g_optimizer=keras.optimizers.Adam(learning_rate=0.0001),
+        loss_fn=keras.losses.BinaryCrossentropy(),
+    )
+
+    monitor = GANMonitor(
+        num_img=5,
+        latent_dim=latent_dim,
+        save_img_path=caminho_imagens_treinamento,
+        logger_path=caminho_historico_execucao,
+        semente=semente + 1,
+    )
+
+    # Os otimizadores são construídos antes do treinamento para que suas variáveis possam ser restauradas
+    gan.d_optimizer.build(discriminator.trainable_weights)
+    gan.g_optimizer.build(generator.trainable_weights)
+    gerenciador_checkpoints = GerenciadorCheckpoints(
+        caminho_resultado,
+        {
+            'gerador': generator.variables,
+            'discriminador': discriminator.variables,
+            'otimizador_gerador': gan.g_optimizer.variables,
+            'otimizador_discriminador': gan.d_optimizer.variables,
+            'seed_generators': [gan.seed_generator.state, monitor.seed_generator.state],
+        },
+        checkpoints_mantidos,
+    )
+    epoca_inicial = 0
+    checkpoint = gerenciador_checkpoints.restaurar()
+
+    if checkpoint is not None:
+        epoca_inicial, _ = checkpoint
+        logger(f'Treinamento retomado do checkpoint da época {epoca_inicial}')
+
+    gan.fit(
+        dataset,
+        epochs=epochs,
+        initial_epoch=epoca_inicial,
+        callbacks=[
+            monitor,
+            CheckpointTreinamento(gerenciador_checkpoints, epoca_dataset, epochs, intervalo_checkpoint),
+        ]
+    )
+
+    # 09/08/2025 - Antes eu estava salvando o modelo todo e não apenas o gerador. Quando tentava usar o arquivo na API
+    # resultava em um erro, pois tentava carregar todo o modelo
+    gan.generator.save(caminho_modelo_treinado)
+
+    # Artefato apenas de inferência usado pela API, com subida mais rápida que o .h5
+    exportar_gerador_servico(gan.generator, recuperar_caminho_artefato_servico(caminho_modelo_treinado))
+
+
+
+if __name__ == '__main__':
+    parametros_aplicacao = ParametrosDcganKeras3().recuperar_parametros()
+    diretorio_dataset = parametros_aplicacao.diretorio_dataset
+    diretorio_resultado = parametros_aplicacao.diretorio_resultado
+    epocas = parametros_aplicacao.epocas
+    funcao_principal(
+        diretorio_dataset=diretorio_dataset,
+        diretorio_resultado=diretorio_resultado,
+        epocas=epocas,
+        aumento_d4=parametros_aplicacao.aumento_d4,
+        semente=parametros_aplicacao.semente,
+        diretorio_retomar=parametros_aplicacao.retomar,
+        intervalo_checkpoint=parametros_aplicacao.intervalo_checkpoint,
+        checkpoints_mantidos=parametros_aplicacao.checkpoints_mantidos,
+    )
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import time
+
+import keras
+
+from gan.pos_processamento import nome_arquivo_faixa_saida, recuperar_faixa_saida
+
+
+# Sufixo do diretório do artefato de serviço criado ao lado do arquivo .h5 do gerador
+sufixo_artefato_servico = '_servico'
+
+
+def recuperar_caminho_artefato_servico(caminho_modelo: str):
+    nome_arquivo, extensao = os.path.splitext(caminho_modelo)
+
+    return nome_arquivo + sufixo_artefato_servico
+
+
+# Exporta o gerador como um SavedModel apenas de inferência, com assinatura fixa "serve" que recebe um ruído no formato
+# [lote, dimensão do ruído] em float32. Diferente do .h5, o artefato não guarda configuração de treinamento nem
+# precisa do desserializador do Keras para ser carregado, o que reduz o tempo de subida da API e o consumo de memória.
+# A ativação final do gerador é gravada ao lado para que a API saiba converter a saída em imagem.
+def exportar_gerador_servico(gerador, caminho_destino: str):
+    gerador.export(caminho_destino, format='tf_saved_model', verbose=False)
+
+    with open(os.path.join(caminho_destino, nome_arquivo_faixa_saida), 'w') as arquivo:
+        arquivo.write(recuperar_faixa_saida(gerador))
+
+    return caminho_destino
+
+
+# Converte um gerador já treinado (.h5) para o artefato de serviço. Se o destino não for indicado, o artefato é criado
+# ao lado do arquivo original.
+def exportar_arquivo_modelo(caminho_modelo: str, caminho_destino: str = None):
+    inicio = time.time()
+
+    if caminho_destino is None:
+        caminho_destino = recuperar_caminho_artefato_servico(caminho_modelo)
+
+    print('Carregando o modelo: ', caminho_modelo)
+    gerador = keras.models.load_model(caminho_modelo)
+
+    print('Exportando o artefato de serviço: ', caminho_destino)
+    exportar_gerador_servico(gerador, caminho_destino)
+
+    fim = time.time()
+    duracao = fim - inicio
+    print(f'Modelo exportado em {duracao:.2f} segundos.')
+
+    return caminho_destino
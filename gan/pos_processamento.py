@@ -0,0 +1,57 @@
+import tensorflow as tf
+
+
+# Faixa de valores da saída de cada ativação final dos geradores: o DCGAN termina em tanh, [-1, 1], e o gerador do
+# Keras 3 termina em sigmoid, [0, 1]
+faixas_saida = {
+    'tanh': (-1.0, 1.0),
+    'sigmoid': (0.0, 1.0),
+}
+
+# Nome do arquivo, dentro do artefato de serviço, com a ativação final do gerador exportado
+nome_arquivo_faixa_saida = 'faixa_saida.txt'
+
+# Versão do pós-processamento, faz parte da chave do cache de respostas para que imagens geradas por uma versão
+# anterior não sejam reaproveitadas
+versao_pos_processamento = 2
+
+
+# Ativação final do gerador: o atributo faixa_saida (artefato de serviço) ou a ativação da última camada do modelo
+# Keras. Sem nenhuma das duas informações considera tanh, usado pelo DCGAN.
+def recuperar_faixa_saida(gerador):
+    faixa_saida = getattr(gerador, 'faixa_saida', None)
+
+    if faixa_saida is None and getattr(gerador, 'layers', None):
+        ativacao = getattr(gerador.layers[-1], 'activation', None)
+        faixa_saida = getattr(ativacao, '__name__', None)
+
+    return faixa_saida if faixa_saida in faixas_saida else 'tanh'
+
+
+# Converte um lote de saídas do gerador em azulejos uint8 [lote, tamanho, tamanho, 3] com operações do TensorFlow, que
+# podem fazer parte do grafo compilado da inferência: redimensiona (bicúbica) apenas quando o tamanho pedido é diferente
+# do tamanho do modelo, leva a faixa da ativação para [0, 255] e converte para uint8 com saturação, sem as cópias
+# intermediárias em NumPy. Tamanho None ou zero mantém o tamanho do modelo.
+def pos_processar_imagens(imagens, faixa_saida: str = 'tanh', tamanho=None):
+    minimo, maximo = faixas_saida[faixa_saida]
+
+    if tamanho is not None:
+        tamanho = tf.convert_to_tensor(tamanho, dtype=tf.int32)
+        imagens = tf.cond(
+            tf.logical_and(tamanho > 0, tamanho != tf.shape(imagens)[1]),
+            lambda: tf.image.resize(imagens, tf.stack([tamanho, tamanho]), method='bicubic'),
+            lambda: imagens,
+        )
+
+    imagens = (imagens - minimo) * (255.0 / (maximo - minimo))
+
+    return tf.cast(tf.clip_by_value(tf.round(imagens), 0.0, 255.0), tf.uint8)
+
+
+# Executa o gerador e o pós-processamento para um lote de ruídos. O gerador compilado da API já traz o pós-processamento
+# no seu grafo (método gerar); para os demais modelos as operações são executadas sobre o lote inteiro de uma vez.
+def gerar_azulejos_uint8(gerador, ruido, tamanho=None):
+    if hasattr(gerador, 'gerar'):
+        return gerador.gerar(ruido, tamanho)
+
+    return pos_processar_imagens(gerador(ruido, training=False), recuperar_faixa_saida(gerador), tamanho)
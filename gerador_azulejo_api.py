@@ -1,76 +1,761 @@
-import gc
-import io
-import os
-import random
-from pathlib import Path
-
-import cv2
-import keras
-import tensorflow as tf
-from flask import Flask, send_file
-
-from config.parametros_api import ParametrosApi
-
-
-def levantar_api(caminho_arquivo_modelo: str=None):
-    app = Flask(__name__)
-    caminho_modelo = 'modelos'
-    caminho_modelo = caminho_arquivo_modelo if caminho_arquivo_modelo is not None else caminho_modelo
-
-    def recuperar_imagem_modelo(caminho_arquivo: str):
-        caminho_arquivo = Path(caminho_arquivo)
-
-        if caminho_arquivo.is_dir(): # Significa que é uma pasta com vários modelos
-            lista_arquivos = os.listdir(caminho_arquivo)
-            nome_arquivo = random.choice(lista_arquivos)
-            caminho_arquivo = caminho_arquivo.joinpath(nome_arquivo)
-
-        print(caminho_arquivo)
-
-        gerador = keras.models.load_model(str(caminho_arquivo))
-        dimensao_ruido = gerador.input_shape[1]
-        ruido = tf.random.normal([1, dimensao_ruido])
-        imagem_gerada = gerador(ruido)
-
-        imagem_gerada = imagem_gerada.numpy().astype("float32")
-        imagem_gerada = imagem_gerada + 127.5
-        imagem_gerada = imagem_gerada * 127.5
-        imagem_gerada = imagem_gerada.astype("uint8")
-
-        # Aumenta a imagem para 256x256 para melhorar a resposta da API
-        imagem = cv2.resize(imagem_gerada[0], (256, 256), interpolation=cv2.INTER_CUBIC)
-
-        # Detectar tamanho da imagem e ajustar fonte e posição
-        altura, largura = imagem.shape[:2]
-
-        # Adicionar texto na imagem com a data do modelo para identificar qual está sendo o modelo usado
-        cv2.putText(
-            imagem,
-            caminho_arquivo.name.split('_')[0],
-            (0, altura - 2),
-            cv2.FONT_HERSHEY_PLAIN,
-            0.8,
-            (0, 0, 0),
-            1,
-            cv2.LINE_AA
-        )
-        resultado, buffer = cv2.imencode('.png', imagem)
-
-        # Exclusão das variáveis para evitar estouro de memória
-        del gerador
-        del ruido
-        del imagem_gerada
-        gc.collect()
-
-        return io.BytesIO(buffer.tobytes())
-
-    @app.route('/', methods=['GET'])
-    def gerar_azulejo():
-        return send_file(recuperar_imagem_modelo(caminho_modelo), mimetype='image/png')
-
-    return app
-
-
-if __name__ == '__main__':
-    parametros_aplicacao = ParametrosApi().recuperar_parametros()
-    levantar_api(parametros_aplicacao.caminho_arquivo_modelo).run(debug=True)
\ No newline at end of file
+import io
+import math
+import random
+import time
+import zipfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+import tensorflow as tf
+from flask import Flask, Response, abort, g, jsonify, request, send_file, stream_with_context
+
+from api.agendador_inferencia import AgendadorInferencia
+from api.cache_respostas import CacheRespostas
+from api.catalogo_modelos import CatalogoModelos, interpretar_pesos
+from api.codificacao_imagens import CodificadorImagens, formatos_saida
+from api.inferencia_compilada import InferenciaCompilada, gerar_tamanhos_lote
+from api.interpolacao_latente import metodos_interpolacao, montar_ruido_interpolado
+from api.metricas import Metricas, recuperar_rss_bytes
+from api.painel_azulejos import gerar_faixas_painel, padroes_painel
+from api.png_progressivo import CodificadorPngProgressivo
+from api.pool_azulejos import PoolAzulejos
+from api.registro_modelos import RegistroModelos
+from config.parametros_api import ParametrosApi
+from gan.pos_processamento import gerar_azulejos_uint8, versao_pos_processamento
+
+
+# Destino de escrita do zipfile que guarda os bytes apenas até serem enviados ao cliente, permitindo transmitir um ZIP
+# sem montá-lo inteiro em memória. O zipfile só precisa de write, tell e flush quando o destino não aceita seek.
+class BufferTransmissao(io.RawIOBase):
+    def __init__(self):
+        self.partes = []
+        self.posicao = 0
+
+    def writable(self):
+        return True
+
+    def write(self, dados):
+        self.partes.append(bytes(dados))
+        self.posicao += len(dados)
+
+        return len(dados)
+
+    def tell(self):
+        return self.posicao
+
+    def retirar(self):
+        dados = b''.join(self.partes)
+        self.partes = []
+
+        return dados
+
+
+def levantar_api(
+        caminho_arquivo_modelo: str=None,
+        tamanho_cache_modelos: int=4,
+        limite_memoria_modelos: float=None,
+        # Quantidade máxima de imagens geradas em uma única requisição ao /lote
+        maximo_lote: int=64,
+        # Janela, em milissegundos, para agrupar requisições concorrentes. Zero desativa o agendador
+        janela_agendador: float=0,
+        maximo_lote_agendador: int=32,
+        # Reserva de azulejos pré-gerados por modelo. Tamanho zero desativa a reserva
+        tamanho_pool: int=0,
+        lote_pool: int=64,
+        aguardar_pool: bool=False,
+        # Cache das respostas com semente: limite em MB na memória e diretório opcional para a camada em disco
+        limite_cache_respostas: float=64,
+        diretorio_cache_respostas: str=None,
+        # Quantidade máxima de linhas e de colunas de um painel
+        maximo_painel: int=100,
+        # Quantidade de threads usadas para redimensionar e codificar as imagens
+        threads_codificacao: int=4,
+        # Quantidade máxima de quadros de uma animação do /animacao
+        maximo_quadros: int=120,
+        # Inferência em uma tf.function com assinatura fixa e lotes em buckets, aquecida na subida da API. Opcionalmente
+        # compilada com o XLA
+        compilar_inferencia: bool=False,
+        xla: bool=False,
+        # Intervalo, em segundos, entre as verificações da pasta de modelos. Zero desativa a observação
+        intervalo_catalogo: float=5,
+        # Pesos da escolha aleatória entre os modelos, {nome do modelo: peso}. Os modelos não indicados têm peso 1
+        pesos_modelos: dict=None,
+):
+    app = Flask(__name__)
+    caminho_modelo = 'modelos'
+    caminho_modelo = caminho_arquivo_modelo if caminho_arquivo_modelo is not None else caminho_modelo
+
+    # Latência por etapa, contadores de requisições e erros e medidores de memória, exportados no /metrics
+    metricas = Metricas()
+    app.config['METRICAS'] = metricas
+
+    # Compila e aquece cada gerador carregado para todos os tamanhos de lote usados pela API, assim nenhuma requisição
+    # paga pelo traçado do grafo. Os modelos validados pelo catálogo entram no registro já na criação da aplicação (ou
+    # em segundo plano, quando são adicionados depois), então o aquecimento acontece na subida da API. Só os modelos que
+    # não cabem no registro são aquecidos no carregamento pela primeira requisição. As latências da primeira chamada e
+    # estável de cada lote são exibidas no carregamento.
+    def preparar_modelo(modelo):
+        modelo_compilado = InferenciaCompilada(
+            modelo, gerar_tamanhos_lote(max(maximo_lote, maximo_lote_agendador, lote_pool)), xla=xla
+        )
+        modelo_compilado.aquecer(tamanho_saida)
+        print(modelo_compilado)
+
+        return modelo_compilado
+
+    # Os geradores são carregados uma única vez por processo/worker e reaproveitados entre as requisições
+    registro_modelos = RegistroModelos(
+        tamanho_maximo=tamanho_cache_modelos,
+        limite_memoria_mb=limite_memoria_modelos,
+        preparar_modelo=preparar_modelo if compilar_inferencia or xla else None,
+    )
+    app.config['REGISTRO_MODELOS'] = registro_modelos
+
+    # Tamanho, em píxeis, da imagem devolvida pela API
+    tamanho_saida = 256
+
+    # Bytes das respostas determinísticas (com semente), endereçados pelo hash do modelo, semente, tamanho e formato
+    cache_respostas = CacheRespostas(
+        limite_memoria_mb=limite_cache_respostas, diretorio=diretorio_cache_respostas
+    )
+    app.config['CACHE_RESPOSTAS'] = cache_respostas
+
+    # As respostas com semente são determinísticas, mas a URL não fixa a versão do modelo: sem modelo indicado ele é
+    # escolhido pelo catálogo, que muda, e o arquivo do modelo pode ser substituído em disco. O navegador ou a CDN
+    # guardam a resposta e revalidam cada uso pelo ETag, recebendo um 304 sem corpo enquanto nada mudou.
+    cache_control_semente = 'public, no-cache'
+
+    # Catálogo dos modelos disponíveis: o caminho é lido e os modelos são validados uma única vez aqui. Os modelos
+    # validados ficam no registro enquanto couberem no seu limite de quantidade e de memória. Com o gunicorn em modo
+    # preload isso acontece no master, antes do fork, e os workers compartilham as páginas de memória dos pesos
+    # (copy-on-write) em vez de cada um carregar a sua cópia. Com a inferência compilada o aquecimento também acontece
+    # aqui. Modelos adicionados depois são validados e carregados em segundo plano pelo catálogo.
+    catalogo_modelos = CatalogoModelos(
+        caminho_modelo, registro_modelos, intervalo_verificacao=intervalo_catalogo, pesos=pesos_modelos
+    )
+    app.config['CATALOGO_MODELOS'] = catalogo_modelos
+
+    # Usa o modelo indicado pelo nome ou escolhe um aleatoriamente, ponderado pelos pesos. O nome é sempre procurado no
+    # catálogo, o que não permite acesso a outros caminhos do servidor. Com uma semente a escolha "aleatória" também é
+    # determinística.
+    def resolver_caminho_modelo(nome_modelo: str=None, semente: int=None):
+        with metricas.medir('etapa_segundos', etapa='resolucao_modelo'):
+            caminho_arquivo = catalogo_modelos.escolher(nome_modelo, semente)
+
+        if caminho_arquivo is None and nome_modelo is not None:
+            abort(404, description=f'Modelo não encontrado: {nome_modelo}')
+
+        if caminho_arquivo is None:
+            abort(503, description='Nenhum modelo válido disponível.')
+
+        metricas.incrementar('requisicoes_modelo_total', modelo=caminho_arquivo.name, endpoint=request.endpoint)
+
+        return caminho_arquivo
+
+    # O arquivo do modelo pode ter sido removido depois da última verificação do catálogo: a requisição recebe o mesmo
+    # 404 de um modelo fora do catálogo, em vez de um erro interno
+    def acessar_arquivo_modelo(funcao, caminho_arquivo: Path):
+        try:
+            return funcao(caminho_arquivo)
+        except FileNotFoundError:
+            abort(404, description=f'Modelo não encontrado: {caminho_arquivo.name}')
+
+    # Gera a quantidade de imagens indicada com uma única chamada ao gerador, ruído no formato [quantidade, dimensão].
+    # Com uma semente o ruído, e portanto a imagem, é sempre o mesmo. Também aceita um ruído já montado (ex.: quadros de
+    # uma interpolação), nesse caso a quantidade é a do ruído. As imagens saem do gerador já em uint8 e no tamanho
+    # pedido, convertidas pelo pós-processamento de acordo com a ativação final de cada modelo.
+    def inferir_imagens(caminho_arquivo: Path, quantidade: int=1, semente: int=None, ruido=None,
+                        tamanho: int=tamanho_saida):
+        with metricas.medir('etapa_segundos', etapa='carregamento_modelo'):
+            gerador = acessar_arquivo_modelo(registro_modelos.recuperar, caminho_arquivo)
+
+        dimensao_ruido = gerador.input_shape[1]
+
+        with metricas.medir('etapa_segundos', etapa='amostragem_ruido'):
+            if ruido is not None:
+                quantidade = len(ruido)
+            elif semente is None:
+                ruido = tf.random.normal([quantidade, dimensao_ruido])
+            else:
+                ruido = np.random.default_rng(semente).standard_normal((quantidade, dimensao_ruido), dtype=np.float32)
+
+        # A cópia para o NumPy entra no tempo da inferência, pois é ela que aguarda o fim da execução do gerador
+        with metricas.medir('etapa_segundos', etapa='inferencia_gerador'):
+            imagens_geradas = gerar_azulejos_uint8(gerador, ruido, tamanho).numpy()
+
+        metricas.incrementar('imagens_geradas_total', quantidade, modelo=caminho_arquivo.name)
+
+        return imagens_geradas
+
+    # Com o agendador ativo, requisições concorrentes para o mesmo modelo são agrupadas em uma única inferência. A
+    # chave do agendador é apenas o modelo (cada chave tem uma fila e uma thread, e o tamanho é escolhido pelo
+    # cliente): o lote é gerado no tamanho de saída padrão e a fatia de cada requisição com outro tamanho é
+    # redimensionada depois, por formatar_imagem.
+    agendador_inferencia = None
+
+    if janela_agendador > 0:
+        agendador_inferencia = AgendadorInferencia(
+            lambda caminho_arquivo, quantidade: inferir_imagens(caminho_arquivo, quantidade),
+            janela_ms=janela_agendador,
+            tamanho_maximo_lote=maximo_lote_agendador,
+        )
+
+    app.config['AGENDADOR_INFERENCIA'] = agendador_inferencia
+
+    def gerar_imagens(caminho_arquivo: Path, quantidade: int=1, tamanho: int=tamanho_saida):
+        if agendador_inferencia is not None:
+            return agendador_inferencia.solicitar(caminho_arquivo, quantidade)
+
+        return inferir_imagens(caminho_arquivo, quantidade, tamanho=tamanho)
+
+    def formatar_imagem(imagem_gerada, caminho_arquivo: Path, tamanho: int=tamanho_saida):
+        imagem = imagem_gerada
+
+        # As imagens já saem do gerador no tamanho de saída (256x256 por padrão), o resize aqui é apenas para as que não
+        # foram geradas no tamanho pedido
+        if imagem.shape[:2] != (tamanho, tamanho):
+            with metricas.medir('etapa_segundos', etapa='redimensionamento'):
+                imagem = cv2.resize(imagem_gerada, (tamanho, tamanho), interpolation=cv2.INTER_CUBIC)
+
+        # Detectar tamanho da imagem e ajustar fonte e posição
+        altura, largura = imagem.shape[:2]
+
+        # Adicionar texto na imagem com a data do modelo para identificar qual está sendo o modelo usado
+        with metricas.medir('etapa_segundos', etapa='texto'):
+            cv2.putText(
+                imagem,
+                caminho_arquivo.name.split('_')[0],
+                (0, altura - 2),
+                cv2.FONT_HERSHEY_PLAIN,
+                0.8,
+                (0, 0, 0),
+                1,
+                cv2.LINE_AA
+            )
+
+        return imagem
+
+    # O resize e a codificação acontecem nas threads do codificador, em paralelo com a inferência do próximo lote
+    codificador_imagens = CodificadorImagens(maximo_threads=threads_codificacao, metricas=metricas)
+    app.config['CODIFICADOR_IMAGENS'] = codificador_imagens
+
+    # Parâmetros de saída da requisição: formato (png, webp, jpeg ou raw), tamanho em píxeis, compressao do PNG (0 a 9)
+    # e qualidade do WebP/JPEG (1 a 100)
+    def recuperar_parametros_saida():
+        saida = {
+            'formato': request.args.get('formato', default='png', type=str).lower(),
+            'tamanho': request.args.get('tamanho', default=None, type=int),
+            'compressao': request.args.get('compressao', default=None, type=int),
+            'qualidade': request.args.get('qualidade', default=None, type=int),
+        }
+
+        if saida['formato'] not in formatos_saida:
+            abort(400, description=f'O parâmetro formato deve ser um destes: {", ".join(formatos_saida)}.')
+
+        # O type=int devolve o default quando o valor não é um número, então a ausência do parâmetro é tratada à parte
+        if 'tamanho' not in request.args:
+            saida['tamanho'] = tamanho_saida
+
+        if saida['tamanho'] is None or saida['tamanho'] < 16 or saida['tamanho'] > 1024:
+            abort(400, description='O parâmetro tamanho deve estar entre 16 e 1024.')
+
+        if 'compressao' in request.args and (saida['compressao'] is None or not 0 <= saida['compressao'] <= 9):
+            abort(400, description='O parâmetro compressao deve estar entre 0 e 9.')
+
+        if 'qualidade' in request.args and (saida['qualidade'] is None or not 1 <= saida['qualidade'] <= 100):
+            abort(400, description='O parâmetro qualidade deve estar entre 1 e 100.')
+
+        return saida
+
+    # A reserva de azulejos guarda apenas a saída padrão, PNG no tamanho de saída e compressão padrão do OpenCV
+    def eh_saida_padrao(saida):
+        return saida['formato'] == 'png' and saida['tamanho'] == tamanho_saida and saida['compressao'] is None
+
+    def codificar_azulejos(imagens, caminho_arquivo: Path, saida):
+        return codificador_imagens.codificar_lote(
+            lambda imagem: formatar_imagem(imagem, caminho_arquivo, saida['tamanho']),
+            imagens,
+            saida['formato'],
+            saida['compressao'],
+            saida['qualidade'],
+        )
+
+    # No formato raw a resposta leva as dimensões da imagem nos cabeçalhos, os bytes são RGB, 3 canais
+    def responder_imagem(dados: bytes, saida, largura: int, altura: int):
+        resposta = send_file(io.BytesIO(dados), mimetype=CodificadorImagens.recuperar_mimetype(saida['formato']))
+
+        if saida['formato'] == 'raw':
+            resposta.headers['X-Largura'] = str(largura)
+            resposta.headers['X-Altura'] = str(altura)
+            resposta.headers['X-Canais'] = '3'
+
+        return resposta
+
+    # Reposição da reserva de azulejos: lotes grandes gerados diretamente, sem passar pelo agendador. A chave da reserva
+    # é a chave do registro de modelos, (caminho, mtime), assim um modelo sobrescrito em disco ganha uma nova reserva.
+    def gerar_azulejos_codificados(chave_modelo, quantidade: int):
+        caminho_arquivo = Path(chave_modelo[0])
+        imagens = inferir_imagens(caminho_arquivo, quantidade)
+
+        return codificador_imagens.codificar_lote(lambda imagem: formatar_imagem(imagem, caminho_arquivo), imagens)
+
+    pool_azulejos = None
+
+    if tamanho_pool > 0:
+        pool_azulejos = PoolAzulejos(
+            gerar_azulejos_codificados,
+            tamanho=tamanho_pool,
+            tamanho_lote=lote_pool,
+            aguardar_quando_vazio=aguardar_pool,
+        )
+
+    app.config['POOL_AZULEJOS'] = pool_azulejos
+
+    def recuperar_imagem_modelo(nome_modelo: str=None, saida=None):
+        caminho_arquivo = resolver_caminho_modelo(nome_modelo)
+
+        if saida is None:
+            saida = {'formato': 'png', 'tamanho': tamanho_saida, 'compressao': None, 'qualidade': None}
+
+        # A reserva é identificada pela versão do modelo registrada pelo catálogo, sem consultar o disco a cada
+        # requisição
+        chave_modelo = catalogo_modelos.recuperar_chave(caminho_arquivo)
+
+        if pool_azulejos is not None and eh_saida_padrao(saida) and chave_modelo is not None:
+            azulejo = pool_azulejos.retirar(chave_modelo)
+
+            if azulejo is not None:
+                return azulejo
+
+        imagem_gerada = gerar_imagens(caminho_arquivo, tamanho=saida['tamanho'])
+
+        return codificar_azulejos(imagem_gerada, caminho_arquivo, saida)[0]
+
+    # Monta um único arquivo zip com as imagens do lote. Como as imagens já estão codificadas (e comprimidas, exceto no
+    # formato raw), os arquivos são apenas armazenados.
+    def montar_zip(azulejos, formato: str):
+        arquivo_zip = io.BytesIO()
+        extensao = formatos_saida[formato][0] or '.rgb'
+
+        with zipfile.ZipFile(arquivo_zip, 'w', compression=zipfile.ZIP_STORED) as zip_lote:
+            for i, azulejo in enumerate(azulejos):
+                zip_lote.writestr(f'azulejo_{str(i + 1).zfill(len(str(len(azulejos))))}{extensao}', azulejo)
+
+        arquivo_zip.seek(0)
+
+        return arquivo_zip
+
+    # Monta uma única imagem (sprite sheet) com as imagens do lote dispostas em grade, o mais próximo de um quadrado
+    def montar_sprite(imagens):
+        quantidade = len(imagens)
+        altura, largura, canais = imagens[0].shape
+        colunas = math.ceil(math.sqrt(quantidade))
+        linhas = math.ceil(quantidade / colunas)
+        sprite = np.zeros((linhas * altura, colunas * largura, canais), dtype=np.uint8)
+
+        for i, imagem in enumerate(imagens):
+            linha, coluna = divmod(i, colunas)
+            sprite[linha * altura:(linha + 1) * altura, coluna * largura:(coluna + 1) * largura] = imagem
+
+        return sprite
+
+    def recuperar_semente():
+        if 'seed' not in request.args:
+            return None
+
+        semente = request.args.get('seed', type=int)
+
+        if semente is None or semente < 0:
+            abort(400, description='O parâmetro seed deve ser um número inteiro não negativo.')
+
+        return semente
+
+    # Sem semente a imagem é sempre nova e não pode ser guardada em cache. Com semente a resposta é determinística,
+    # então é guardada no cache de respostas e enviada com ETag forte, permitindo que o navegador ou uma CDN revalidem
+    # as repetições com um 304. Parâmetros: modelo (nome do arquivo do modelo), seed e os parâmetros de saída (formato,
+    # tamanho, compressao e qualidade).
+    @app.route('/', methods=['GET'])
+    def gerar_azulejo():
+        nome_modelo = request.args.get('modelo', default=None, type=str)
+        semente = recuperar_semente()
+        saida = recuperar_parametros_saida()
+
+        if semente is None:
+            azulejo = recuperar_imagem_modelo(nome_modelo, saida)
+            resposta = responder_imagem(azulejo, saida, saida['tamanho'], saida['tamanho'])
+            resposta.headers['Cache-Control'] = 'no-store'
+
+            return resposta
+
+        caminho_arquivo = resolver_caminho_modelo(nome_modelo, semente)
+        etag = CacheRespostas.gerar_chave(
+            acessar_arquivo_modelo(registro_modelos.recuperar_hash, caminho_arquivo),
+            versao_pos_processamento,
+            caminho_arquivo.name,
+            semente,
+            saida['tamanho'],
+            saida['formato'],
+            saida['compressao'],
+            saida['qualidade'],
+        )
+
+        if request.if_none_match.contains(etag):
+            resposta = app.response_class(status=304)
+        else:
+            azulejo = cache_respostas.recuperar(etag)
+
+            if azulejo is None:
+                imagem_gerada = inferir_imagens(caminho_arquivo, semente=semente, tamanho=saida['tamanho'])
+                azulejo = codificar_azulejos(imagem_gerada, caminho_arquivo, saida)[0]
+                cache_respostas.guardar(etag, azulejo)
+
+            resposta = responder_imagem(azulejo, saida, saida['tamanho'], saida['tamanho'])
+
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = cache_control_semente
+
+        return resposta
+
+    # Gera "n" azulejos com uma única inferência do gerador. Parâmetros: n (quantidade, limitada por maximo_lote),
+    # modelo (nome do arquivo do modelo), saida (zip ou sprite) e os parâmetros de saída das imagens.
+    @app.route('/lote', methods=['GET'])
+    def gerar_lote_azulejos():
+        quantidade = request.args.get('n', default=16, type=int)
+        nome_modelo = request.args.get('modelo', default=None, type=str)
+        tipo_saida = request.args.get('saida', default='zip', type=str).lower()
+        saida = recuperar_parametros_saida()
+
+        if quantidade is None or quantidade < 1 or quantidade > maximo_lote:
+            abort(400, description=f'O parâmetro n deve estar entre 1 e {maximo_lote}.')
+
+        if tipo_saida not in ('zip', 'sprite'):
+            abort(400, description='O parâmetro saida deve ser zip ou sprite.')
+
+        caminho_arquivo = resolver_caminho_modelo(nome_modelo)
+        imagens = gerar_imagens(caminho_arquivo, quantidade, saida['tamanho'])
+
+        if tipo_saida == 'sprite':
+            def preparar_sprite(imagens_lote):
+                return montar_sprite(
+                    [formatar_imagem(imagem, caminho_arquivo, saida['tamanho']) for imagem in imagens_lote]
+                )
+
+            sprite = codificador_imagens.submeter(
+                preparar_sprite, imagens, saida['formato'], saida['compressao'], saida['qualidade']
+            ).result()
+            colunas = math.ceil(math.sqrt(quantidade))
+            linhas = math.ceil(quantidade / colunas)
+
+            return responder_imagem(sprite, saida, colunas * saida['tamanho'], linhas * saida['tamanho'])
+
+        azulejos = codificar_azulejos(imagens, caminho_arquivo, saida)
+
+        return send_file(
+            montar_zip(azulejos, saida['formato']),
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name='azulejos.zip',
+        )
+
+    # Estado do agendador de inferência: profundidade da fila, distribuição do tamanho dos lotes e tempo de espera
+    @app.route('/agendador', methods=['GET'])
+    def recuperar_estatisticas_agendador():
+        if agendador_inferencia is None:
+            abort(404, description='O agendador de inferência não está ativo.')
+
+        return jsonify(agendador_inferencia.recuperar_estatisticas())
+
+    # Estado da reserva de azulejos pré-gerados: quantidade disponível por modelo, acertos e faltas
+    @app.route('/pool', methods=['GET'])
+    def recuperar_estatisticas_pool():
+        if pool_azulejos is None:
+            abort(404, description='A reserva de azulejos não está ativa.')
+
+        return jsonify(pool_azulejos.recuperar_estatisticas())
+
+    # Gera um painel (mosaico) de azulejos, enviado ao cliente faixa por faixa à medida que é gerado. Parâmetros:
+    # linhas, colunas, padrao (unico, rotacoes, espelhos ou aleatorio), tamanho (píxeis de cada azulejo), modelo e seed.
+    @app.route('/painel', methods=['GET'])
+    def gerar_painel():
+        linhas = request.args.get('linhas', default=4, type=int)
+        colunas = request.args.get('colunas', default=4, type=int)
+        padrao = request.args.get('padrao', default='rotacoes', type=str).lower()
+        tamanho = request.args.get('tamanho', default=128, type=int)
+        nome_modelo = request.args.get('modelo', default=None, type=str)
+        semente = recuperar_semente()
+
+        for nome, valor in (('linhas', linhas), ('colunas', colunas)):
+            if valor is None or valor < 1 or valor > maximo_painel:
+                abort(400, description=f'O parâmetro {nome} deve estar entre 1 e {maximo_painel}.')
+
+        if tamanho is None or tamanho < 16 or tamanho > 512:
+            abort(400, description='O parâmetro tamanho deve estar entre 16 e 512.')
+
+        if padrao not in padroes_painel:
+            abort(400, description=f'O parâmetro padrao deve ser um destes: {", ".join(padroes_painel)}.')
+
+        # Sem semente o painel continua coerente dentro da requisição, mas muda a cada chamada e não tem ETag
+        etag = None
+        deterministico = semente is not None
+
+        if semente is None:
+            semente = random.getrandbits(32)
+
+        caminho_arquivo = resolver_caminho_modelo(nome_modelo, semente)
+
+        if deterministico:
+            etag = CacheRespostas.gerar_chave(
+                acessar_arquivo_modelo(registro_modelos.recuperar_hash, caminho_arquivo),
+                versao_pos_processamento,
+                caminho_arquivo.name,
+                'painel',
+                semente,
+                linhas,
+                colunas,
+                padrao,
+                tamanho,
+            )
+
+            if request.if_none_match.contains(etag):
+                resposta = app.response_class(status=304)
+                resposta.set_etag(etag)
+                resposta.headers['Cache-Control'] = cache_control_semente
+
+                return resposta
+
+        # O modelo é carregado antes da transmissão, que começa com o status 200 já enviado
+        acessar_arquivo_modelo(registro_modelos.recuperar, caminho_arquivo)
+        codificador = CodificadorPngProgressivo(largura=colunas * tamanho, altura=linhas * tamanho)
+
+        def gerar_azulejos_painel(quantidade, semente_azulejos):
+            return inferir_imagens(caminho_arquivo, quantidade, semente_azulejos, tamanho=tamanho)
+
+        def transmitir_painel():
+            yield codificador.cabecalho()
+
+            for faixa in gerar_faixas_painel(gerar_azulejos_painel, linhas, colunas, padrao, semente, tamanho):
+                yield codificador.codificar_faixa(faixa)
+
+            yield codificador.finalizar()
+
+        resposta = Response(stream_with_context(transmitir_painel()), mimetype='image/png')
+
+        if etag is None:
+            resposta.headers['Cache-Control'] = 'no-store'
+        else:
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = cache_control_semente
+
+        return resposta
+
+    # Anima a transição entre dois ou mais azulejos com semente, interpolando os ruídos no espaço latente. Todos os
+    # quadros formam um único lote de ruído, gerado em partes de no máximo maximo_lote quadros. Parâmetros: seeds
+    # (sementes separadas por vírgula), quadros, interpolacao (linear ou esferica), saida (webp, gif ou zip), duracao
+    # (milissegundos por quadro), tamanho, qualidade e modelo.
+    @app.route('/animacao', methods=['GET'])
+    def gerar_animacao():
+        texto_sementes = request.args.get('seeds', default='', type=str)
+        quadros = request.args.get('quadros', default=24, type=int)
+        metodo = request.args.get('interpolacao', default='esferica', type=str).lower()
+        tipo_saida = request.args.get('saida', default='webp', type=str).lower()
+        duracao_quadro = request.args.get('duracao', default=80, type=int)
+        tamanho = request.args.get('tamanho', default=tamanho_saida, type=int)
+        qualidade = request.args.get('qualidade', default=None, type=int)
+        nome_modelo = request.args.get('modelo', default=None, type=str)
+
+        try:
+            sementes = [int(semente) for semente in texto_sementes.split(',') if semente.strip() != '']
+        except ValueError:
+            sementes = []
+
+        if len(sementes) < 2 or min(sementes) < 0:
+            abort(400, description='O parâmetro seeds deve ter ao menos duas sementes inteiras separadas por vírgula.')
+
+        if quadros is None or quadros < len(sementes) or quadros > maximo_quadros:
+            abort(400, description=f'O parâmetro quadros deve estar entre {len(sementes)} e {maximo_quadros}.')
+
+        if metodo not in metodos_interpolacao:
+            abort(400, description=f'O parâmetro interpolacao deve ser um destes: {", ".join(metodos_interpolacao)}.')
+
+        if tipo_saida not in ('webp', 'gif', 'zip'):
+            abort(400, description='O parâmetro saida deve ser webp, gif ou zip.')
+
+        if duracao_quadro is None or duracao_quadro < 10:
+            abort(400, description='O parâmetro duracao deve ser de ao menos 10 milissegundos.')
+
+        if tamanho is None or tamanho < 16 or tamanho > 512:
+            abort(400, description='O parâmetro tamanho deve estar entre 16 e 512.')
+
+        if qualidade is not None and not 1 <= qualidade <= 100:
+            abort(400, description='O parâmetro qualidade deve estar entre 1 e 100.')
+
+        caminho_arquivo = resolver_caminho_modelo(nome_modelo, sementes[0])
+        etag = CacheRespostas.gerar_chave(
+            acessar_arquivo_modelo(registro_modelos.recuperar_hash, caminho_arquivo),
+            versao_pos_processamento,
+            caminho_arquivo.name,
+            'animacao',
+            sementes,
+            quadros,
+            metodo,
+            tipo_saida,
+            duracao_quadro,
+            tamanho,
+            qualidade,
+        )
+
+        if request.if_none_match.contains(etag):
+            resposta = app.response_class(status=304)
+            resposta.set_etag(etag)
+            resposta.headers['Cache-Control'] = cache_control_semente
+
+            return resposta
+
+        dimensao_ruido = acessar_arquivo_modelo(registro_modelos.recuperar, caminho_arquivo).input_shape[1]
+
+        with metricas.medir('etapa_segundos', etapa='interpolacao_ruido'):
+            ruido = montar_ruido_interpolado(sementes, quadros, dimensao_ruido, metodo)
+
+        def gerar_partes_quadros():
+            for inicio in range(0, quadros, maximo_lote):
+                imagens = inferir_imagens(caminho_arquivo, ruido=ruido[inicio:inicio + maximo_lote], tamanho=tamanho)
+
+                yield inicio, imagens
+
+        if tipo_saida == 'zip':
+            # Os quadros são enviados à medida que cada parte do lote é gerada e codificada
+            def transmitir_zip():
+                buffer = BufferTransmissao()
+
+                with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as zip_quadros:
+                    for inicio, imagens in gerar_partes_quadros():
+                        quadros_codificados = codificador_imagens.codificar_lote(lambda quadro: quadro, imagens)
+
+                        for i, quadro in enumerate(quadros_codificados):
+                            zip_quadros.writestr(f'quadro_{str(inicio + i + 1).zfill(len(str(quadros)))}.png', quadro)
+
+                        yield buffer.retirar()
+
+                yield buffer.retirar()
+
+            resposta = Response(stream_with_context(transmitir_zip()), mimetype='application/zip')
+            resposta.headers['Content-Disposition'] = 'attachment; filename=animacao.zip'
+        else:
+            imagens = [imagem for _, parte in gerar_partes_quadros() for imagem in parte]
+            animacao = codificador_imagens.executor.submit(
+                codificador_imagens.codificar_animacao, imagens, tipo_saida, duracao_quadro, qualidade
+            ).result()
+            resposta = send_file(io.BytesIO(animacao), mimetype=f'image/{tipo_saida}')
+
+        resposta.set_etag(etag)
+        resposta.headers['Cache-Control'] = cache_control_semente
+
+        return resposta
+
+    @app.before_request
+    def iniciar_medicao_requisicao():
+        g.inicio_requisicao = time.perf_counter()
+
+    @app.after_request
+    def finalizar_medicao_requisicao(resposta):
+        endpoint = request.endpoint or 'desconhecido'
+
+        if 'inicio_requisicao' in g:
+            metricas.observar('requisicao_segundos', time.perf_counter() - g.inicio_requisicao, endpoint=endpoint)
+
+        metricas.incrementar('requisicoes_total', endpoint=endpoint, status=resposta.status_code)
+
+        if resposta.status_code >= 400:
+            metricas.incrementar('erros_total', endpoint=endpoint, status=resposta.status_code)
+
+        return resposta
+
+    # Medidores lidos no momento da coleta a partir do estado dos componentes da API
+    metricas.registrar_medidor('modelos_carregados', lambda: len(registro_modelos))
+    metricas.registrar_medidor('modelos_catalogo', lambda: len(catalogo_modelos))
+    metricas.registrar_medidor('memoria_modelos_bytes', lambda: registro_modelos.memoria_utilizada)
+    metricas.registrar_medidor('processo_rss_bytes', recuperar_rss_bytes)
+    metricas.descrever('cache_respostas_total', 'counter', 'Consultas ao cache de respostas por resultado.')
+    metricas.registrar_medidor(
+        'cache_respostas_total',
+        lambda: {
+            chave: cache_respostas.recuperar_estatisticas()[chave]
+            for chave in ('acertos_memoria', 'acertos_disco', 'faltas')
+        },
+        nome_rotulo='resultado',
+    )
+
+    if pool_azulejos is not None:
+        metricas.descrever('pool_total', 'counter', 'Retiradas da reserva de azulejos por resultado.')
+        metricas.registrar_medidor(
+            'pool_total',
+            lambda: {chave: pool_azulejos.recuperar_estatisticas()[chave] for chave in ('acertos', 'faltas')},
+            nome_rotulo='resultado',
+        )
+        metricas.registrar_medidor(
+            'pool_disponiveis', lambda: pool_azulejos.recuperar_estatisticas()['reservas'], nome_rotulo='modelo'
+        )
+
+    if agendador_inferencia is not None:
+        metricas.registrar_medidor('agendador_profundidade_fila', agendador_inferencia.profundidade_fila)
+        metricas.descrever('agendador_lotes_total', 'counter', 'Lotes executados pelo agendador por tamanho.')
+        metricas.registrar_medidor(
+            'agendador_lotes_total',
+            lambda: agendador_inferencia.recuperar_estatisticas()['distribuicao_lotes'],
+            nome_rotulo='tamanho',
+        )
+        metricas.descrever('agendador_espera_segundos_total', 'counter', 'Tempo total de espera na fila.')
+        metricas.registrar_medidor('agendador_espera_segundos_total', lambda: agendador_inferencia.tempo_total_espera)
+        metricas.descrever('agendador_pedidos_total', 'counter', 'Pedidos atendidos pelo agendador.')
+        metricas.registrar_medidor('agendador_pedidos_total', lambda: agendador_inferencia.pedidos_atendidos)
+
+    metricas.descrever('etapa_segundos', 'histogram', 'Latência de cada etapa da geração de um azulejo.')
+    metricas.descrever('requisicao_segundos', 'histogram', 'Latência total da requisição por endpoint.')
+    metricas.descrever('requisicoes_modelo_total', 'counter', 'Requisições atendidas por modelo e endpoint.')
+    metricas.descrever('erros_total', 'counter', 'Respostas com erro (status 4xx e 5xx) por endpoint.')
+
+    # Métricas no formato texto do Prometheus
+    @app.route('/metrics', methods=['GET'])
+    def exportar_metricas():
+        return Response(metricas.gerar_texto(), mimetype='text/plain; version=0.0.4')
+
+    # Tempo gasto e tamanho médio das imagens em cada formato de saída
+    @app.route('/codificacao', methods=['GET'])
+    def recuperar_estatisticas_codificacao():
+        return jsonify(codificador_imagens.recuperar_estatisticas())
+
+    # Modelos válidos do catálogo com as suas características e pesos, e os arquivos ignorados com o motivo
+    @app.route('/modelos', methods=['GET'])
+    def listar_modelos():
+        return jsonify(catalogo_modelos.listar())
+
+    @app.route('/cache', methods=['GET'])
+    def recuperar_estatisticas_cache():
+        return jsonify(cache_respostas.recuperar_estatisticas())
+
+    return app
+
+
+if __name__ == '__main__':
+    parametros_aplicacao = ParametrosApi().recuperar_parametros()
+    levantar_api(
+        parametros_aplicacao.caminho_arquivo_modelo,
+        tamanho_cache_modelos=parametros_aplicacao.cache_modelos,
+        limite_memoria_modelos=parametros_aplicacao.memoria_modelos,
+        maximo_lote=parametros_aplicacao.maximo_lote,
+        janela_agendador=parametros_aplicacao.janela_agendador,
+        maximo_lote_agendador=parametros_aplicacao.maximo_lote_agendador,
+        tamanho_pool=parametros_aplicacao.pool,
+        lote_pool=parametros_aplicacao.lote_pool,
+        aguardar_pool=parametros_aplicacao.pool_vazio == 'aguardar',
+        limite_cache_respostas=parametros_aplicacao.cache_respostas,
+        diretorio_cache_respostas=parametros_aplicacao.diretorio_cache,
+        maximo_painel=parametros_aplicacao.maximo_painel,
+        threads_codificacao=parametros_aplicacao.threads_codificacao,
+        maximo_quadros=parametros_aplicacao.maximo_quadros,
+        compilar_inferencia=parametros_aplicacao.compilar,
+        xla=parametros_aplicacao.xla,
+        intervalo_catalogo=parametros_aplicacao.intervalo_catalogo,
+        pesos_modelos=interpretar_pesos(parametros_aplicacao.pesos_modelos),
+    ).run(debug=True)
\ No newline at end of file
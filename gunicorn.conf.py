@@ -0,0 +1,22 @@
+# Configuração do gunicorn para servir a API com os modelos compartilhados entre os workers.
+#
+# Com o preload a aplicação (wsgi:app) é criada uma única vez no master, que já carrega os modelos. Os workers são
+# criados por fork e herdam as páginas de memória dos pesos em copy-on-write: como a inferência só lê os pesos, as
+# páginas continuam compartilhadas e a memória não cresce linearmente com a quantidade de workers.
+#
+# Exemplo:
+# AZULEJOS_MODELO=modelos gunicorn -c gunicorn.conf.py wsgi:app
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+# Os objetos criados no master são movidos para a geração permanente do coletor de lixo. Assim o coletor dos workers
+# não escreve nos cabeçalhos desses objetos, o que copiaria as páginas compartilhadas.
+def pre_fork(server, worker):
+    gc.freeze()
\ No newline at end of file
@@ -1,3 +1,14 @@
-from gerador_azulejo_api import levantar_api
-
-app = levantar_api()
\ No newline at end of file
+import os
+
+from api.catalogo_modelos import interpretar_pesos
+from gerador_azulejo_api import levantar_api
+
+# Quando executada pelo gunicorn, a API é configurada por variáveis de ambiente (ver gunicorn.conf.py)
+app = levantar_api(
+    os.environ.get('AZULEJOS_MODELO'),
+    tamanho_cache_modelos=int(os.environ.get('AZULEJOS_CACHE_MODELOS', 4)),
+    compilar_inferencia=os.environ.get('AZULEJOS_COMPILAR', '0') == '1',
+    xla=os.environ.get('AZULEJOS_XLA', '0') == '1',
+    intervalo_catalogo=float(os.environ.get('AZULEJOS_INTERVALO_CATALOGO', 5)),
+    pesos_modelos=interpretar_pesos(os.environ.get('AZULEJOS_PESOS_MODELOS')),
+)
\ No newline at end of file